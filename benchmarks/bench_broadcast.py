@@ -0,0 +1,65 @@
+"""
+Бенчмарк пропускной способности рассылки /ad_post на подменной сессии Bot.
+
+Подменная сессия ограничивает отправку глобальным лимитом (по умолчанию
+30 сообщений/с, как у Telegram) и отвечает TelegramRetryAfter при
+превышении. Скорость рассылки держит FloodControlMiddleware, как в боте
+(--rate — его общий лимит). Скрипт показывает фактическую скорость и
+сколько раз рассылка упёрлась в flood control.
+
+Запуск:
+    python -m benchmarks.bench_broadcast --users 1000 --rate 25 --workers 8
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from benchmarks.fake_session import make_bot
+from database.broadcast_db import BroadcastDB
+from database.db import ReviewDB
+from services.broadcast import Broadcaster
+from services.flood_control import FloodControlMiddleware
+
+
+async def run(users: int, rate: float, workers: int, latency: float, limit: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = ReviewDB(os.path.join(tmp, "bench.db"))
+        with db.conn:
+            db.conn.executemany(
+                "INSERT INTO reviews (user_id, username, review) VALUES (?, ?, ?)",
+                ((1000 + i, f"user{i}", "отзыв") for i in range(users)),
+            )
+
+        bot = make_bot(latency=latency, global_limit=limit)
+        bot.session.middleware(FloodControlMiddleware(global_rate=rate))
+        broadcaster = Broadcaster(bot, BroadcastDB(db), workers=workers, progress_interval=1.0)
+
+        started = time.perf_counter()
+        broadcast_id, total = await broadcaster.start(from_chat_id=1, message_id=1, admin_id=1)
+        await broadcaster.wait()
+        elapsed = time.perf_counter() - started
+
+        counts = await BroadcastDB(db).get_counts(broadcast_id)
+        await bot.session.close()
+        db.close()
+
+    print(f"recipients={total} rate={rate}/s workers={workers} latency={latency * 1000:.0f}ms")
+    print(f"elapsed={elapsed:.2f}s throughput={total / elapsed:.1f} msg/s")
+    print(f"statuses={counts} retry_after={bot.session.retry_after_count} api_calls={bot.session.calls}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--rate", type=float, default=25)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.05, help="задержка ответа API, с")
+    parser.add_argument("--limit", type=int, default=30, help="глобальный лимит подменного API, сообщений/с")
+    args = parser.parse_args()
+    asyncio.run(run(args.users, args.rate, args.workers, args.latency, args.limit))
+
+
+if __name__ == "__main__":
+    main()
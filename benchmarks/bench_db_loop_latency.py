@@ -0,0 +1,77 @@
+"""
+Бенчмарк задержки event loop во время тяжёлых выборок из ReviewDB.
+
+Параллельно с выгрузкой большого списка отзывов (как в /all_reviews)
+в loop крутится «тикер», который каждые 5 мс замеряет, насколько позже
+срока он проснулся. Если запросы выполняются вне loop, задержка
+остаётся на уровне единиц миллисекунд независимо от размера таблицы.
+
+Запуск:
+    python -m benchmarks.bench_db_loop_latency --rows 200000 --readers 8
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from database.db import ReviewDB
+
+
+TICK = 0.005
+
+
+async def ticker(stop: asyncio.Event, lags: list):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + TICK
+        await asyncio.sleep(TICK)
+        lags.append(max(0.0, loop.time() - expected))
+
+
+def fill(db: ReviewDB, rows: int):
+    text = "Отзыв: " + "очень понравилась выставка " * 8
+    with db.conn:
+        db.conn.executemany(
+            "INSERT INTO reviews (user_id, username, review, answered, admin_answer) VALUES (?, ?, ?, ?, ?)",
+            ((i, f"user{i}", text, i % 2, "спасибо" if i % 2 else None) for i in range(rows)),
+        )
+
+
+async def run(rows: int, readers: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = ReviewDB(os.path.join(tmp, "bench.db"))
+        fill(db, rows)
+
+        stop = asyncio.Event()
+        lags: list = []
+        tick_task = asyncio.create_task(ticker(stop, lags))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            db.get_answered_reviews() if i % 2 else db.get_unanswered_reviews()
+            for i in range(readers)
+        ))
+        elapsed = time.perf_counter() - started
+
+        stop.set()
+        await tick_task
+        db.close()
+
+    lags_ms = sorted(lag * 1000 for lag in lags) or [0.0]
+    p99 = lags_ms[min(len(lags_ms) - 1, int(len(lags_ms) * 0.99))]
+    print(f"rows={rows} readers={readers} total={elapsed:.2f}s ticks={len(lags)}")
+    print(f"loop lag: median={statistics.median(lags_ms):.2f}ms p99={p99:.2f}ms max={lags_ms[-1]:.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--readers", type=int, default=4, help="сколько выгрузок запускать одновременно")
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.readers))
+
+
+if __name__ == "__main__":
+    main()
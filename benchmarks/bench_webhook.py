@@ -0,0 +1,101 @@
+"""
+Бенчмарк webhook-режима полностью офлайн.
+
+Поднимает подменный Bot API (benchmarks.fake_bot_api) и webhook-сервер
+бота с настоящими роутерами, после чего шлёт на webhook обновления так,
+как это делал бы Telegram. Показывает время ответа webhook (Telegram
+ждёт именно его) и общее время, за которое бот обработал все обновления.
+
+Запуск:
+    python -m benchmarks.bench_webhook --updates 2000 --concurrency 50 --text /statistic
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import aiohttp
+
+from benchmarks.common import configure_env, percentile
+
+API_PORT = 18081
+WEBHOOK_PORT = 18080
+SECRET = "benchmark-secret"
+
+
+async def run(updates: int, concurrency: int, text: str, user_id: int, api_latency: float):
+    from aiohttp import web
+    from benchmarks.fake_bot_api import FakeBotAPI, start as start_api
+    from config.create_bot import bot, dp
+    from config.all_routers import all_routers
+    from services.webhook import WebhookHandler, build_webhook_app
+
+    for router in all_routers:
+        dp.include_router(router)
+
+    api = FakeBotAPI(api_latency)
+    api_runner = await start_api(api, "127.0.0.1", API_PORT)
+
+    handler = WebhookHandler(dp, bot, secret=SECRET, max_concurrency=100)
+    runner = web.AppRunner(build_webhook_app(handler, "/webhook"))
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", WEBHOOK_PORT).start()
+
+    url = f"http://127.0.0.1:{WEBHOOK_PORT}/webhook"
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def post(session: aiohttp.ClientSession, update_id: int):
+        payload = {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": int(time.time()),
+                "chat": {"id": user_id or update_id, "type": "private"},
+                "from": {"id": user_id or update_id, "is_bot": False, "first_name": "bench"},
+                "text": text,
+                "entities": [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+                if text.startswith("/") else None,
+            },
+        }
+        async with semaphore:
+            started = time.perf_counter()
+            async with session.post(url, json=payload, headers={"X-Telegram-Bot-Api-Secret-Token": SECRET}) as resp:
+                assert resp.status == 200, resp.status
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*(post(session, i + 1) for i in range(updates)))
+        accepted = time.perf_counter() - started
+        await handler.drain()
+    processed = time.perf_counter() - started
+
+    await runner.cleanup()
+    await api_runner.cleanup()
+    await bot.session.close()
+    await dp.storage.close()
+
+    lat_ms = [x * 1000 for x in latencies]
+    print(f"updates={updates} concurrency={concurrency} text={text!r}")
+    print(f"webhook response: p50={statistics.median(lat_ms):.2f}ms p99={percentile(lat_ms, 0.99):.2f}ms")
+    print(f"accepted in {accepted:.2f}s ({updates / accepted:.0f} upd/s), "
+          f"processed in {processed:.2f}s ({updates / processed:.0f} upd/s)")
+    print(f"bot api calls: {api.calls}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--text", default="/statistic")
+    parser.add_argument("--user-id", type=int, default=1, help="отправитель (0 — у каждого обновления свой)")
+    parser.add_argument("--api-latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    configure_env(bot_api_url=f"http://127.0.0.1:{API_PORT}")
+    asyncio.run(run(args.updates, args.concurrency, args.text, args.user_id, args.api_latency))
+
+
+if __name__ == "__main__":
+    main()
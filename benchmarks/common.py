@@ -0,0 +1,44 @@
+"""Общие помощники бенчмарков, которым нужен полностью собранный бот."""
+import os
+import sys
+import tempfile
+from typing import Optional, Sequence
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Отправители в синтетических обновлениях: первые три id — админы
+ADMIN_IDS = (1, 2, 3)
+# Лимит flood control в бенчмарках, сообщений в секунду: заведомо не достигается
+BENCH_FLOOD_LIMIT = 1_000_000
+
+
+def configure_env(bot_api_url: Optional[str] = None) -> str:
+    """
+    Готовит окружение для импорта config.create_bot: фиктивный токен, админы
+    и отдельная временная база, чтобы не трогать reviews.db. Лимиты
+    FloodControlMiddleware поднимаются так, чтобы бенчмарк измерял бота,
+    а не паузы между отправками (заданные в окружении FLOOD_* не меняются).
+    Должна вызываться до первого импорта модулей бота. Возвращает путь к базе.
+    """
+    db_path = os.path.join(tempfile.mkdtemp(prefix="bot-bench-"), "bench.db")
+    os.environ.update({
+        "BOT_TOKEN": "42:BENCHMARK",
+        "ADMIN": str(ADMIN_IDS[0]),
+        "ADMINISTRATOR": str(ADMIN_IDS[1]),
+        "ADMINISTRATOR2": str(ADMIN_IDS[2]),
+        "DB_PATH": db_path,
+    })
+    for name in ("FLOOD_GLOBAL_RATE", "FLOOD_CHAT_RATE", "FLOOD_CHAT_BURST"):
+        os.environ.setdefault(name, str(BENCH_FLOOD_LIMIT))
+    if bot_api_url:
+        os.environ["BOT_API_URL"] = bot_api_url
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    return db_path
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
@@ -0,0 +1,92 @@
+"""
+Локальный подменный Telegram Bot API для офлайн-бенчмарков.
+
+Отвечает на запросы вида /bot<token>/<method> так, как ответил бы
+настоящий API, с настраиваемой задержкой. Бот подключается к нему
+через переменную окружения BOT_API_URL.
+
+Запуск отдельно:
+    python -m benchmarks.fake_bot_api --port 8081 --latency 0.03
+"""
+import argparse
+import asyncio
+import itertools
+import time
+
+from aiohttp import web
+
+
+class FakeBotAPI:
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls: dict = {}
+        self._ids = itertools.count(1)
+
+    def _message(self, params: dict) -> dict:
+        chat_id = int(params.get("chat_id") or 0)
+        message = {
+            "message_id": next(self._ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+        }
+        if "text" in params:
+            message["text"] = params["text"]
+        return message
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls[method] = self.calls.get(method, 0) + 1
+        if request.content_type.startswith("multipart/"):
+            params = {k: v for k, v in (await request.post()).items() if isinstance(v, str)}
+        else:
+            params = dict(await request.post())
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        name = method.lower()
+        if name == "getme":
+            result = {"id": 42, "is_bot": True, "first_name": "fake", "username": "fake_bot"}
+        elif name == "copymessage":
+            result = {"message_id": next(self._ids)}
+        elif name == "sendphoto":
+            result = self._message(params)
+            file_id = params.get("photo") if isinstance(params.get("photo"), str) else None
+            result["photo"] = [{
+                "file_id": file_id if file_id and not file_id.startswith("attach://") else f"fake-{next(self._ids)}",
+                "file_unique_id": "fake", "width": 1, "height": 1,
+            }]
+        elif name.startswith("send") or name.startswith("edit"):
+            result = self._message(params)
+        elif name == "getupdates":
+            result = []
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+
+def build_app(api: FakeBotAPI) -> web.Application:
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", api.handle)
+    return app
+
+
+async def start(api: FakeBotAPI, host: str, port: int) -> web.AppRunner:
+    runner = web.AppRunner(build_app(api))
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+    web.run_app(build_app(FakeBotAPI(args.latency)), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
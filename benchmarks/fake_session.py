@@ -0,0 +1,75 @@
+"""
+Подменная сессия aiogram для бенчмарков: вместо запросов к Telegram
+отвечает сразу, с заданной задержкой, и имитирует глобальный лимит
+отправки — при превышении бросает TelegramRetryAfter, как настоящий API.
+"""
+import asyncio
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Optional
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import TelegramMethod
+from aiogram.types import Chat, Message, MessageId, PhotoSize, User
+
+
+class FakeSession(BaseSession):
+
+    def __init__(self, latency: float = 0.02, global_limit: Optional[int] = 30):
+        super().__init__()
+        self.latency = latency
+        self.global_limit = global_limit
+        self.calls = 0
+        self.retry_after_count = 0
+        self._window: deque = deque()
+        self._message_id = 0
+
+    async def close(self) -> None:
+        pass
+
+    async def stream_content(self, *args: Any, **kwargs: Any):
+        yield b""
+
+    def _check_limit(self, method: TelegramMethod):
+        if self.global_limit is None:
+            return
+        now = time.monotonic()
+        while self._window and now - self._window[0] > 1.0:
+            self._window.popleft()
+        if len(self._window) >= self.global_limit:
+            self.retry_after_count += 1
+            raise TelegramRetryAfter(method=method, message="Flood control exceeded", retry_after=1)
+        self._window.append(now)
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: Optional[int] = None) -> Any:
+        self.calls += 1
+        self._check_limit(method)
+        await asyncio.sleep(self.latency)
+
+        name = type(method).__name__
+        self._message_id += 1
+        if name == "CopyMessage":
+            return MessageId(message_id=self._message_id)
+        if name == "GetMe":
+            return User(id=42, is_bot=True, first_name="bench")
+        if name.startswith("Send") or name.startswith("Edit"):
+            chat_id = getattr(method, "chat_id", None) or 0
+            photo = None
+            if name == "SendPhoto":
+                file_id = method.photo if isinstance(method.photo, str) else f"fake-{self._message_id}"
+                photo = [PhotoSize(file_id=file_id, file_unique_id="fake", width=1, height=1)]
+            return Message(
+                message_id=self._message_id,
+                date=datetime.now(),
+                chat=Chat(id=int(chat_id), type="private"),
+                text=getattr(method, "text", None),
+                photo=photo,
+            ).as_(bot)
+        return True
+
+
+def make_bot(latency: float = 0.02, global_limit: Optional[int] = 30) -> Bot:
+    return Bot("42:BENCHMARK", session=FakeSession(latency=latency, global_limit=global_limit))
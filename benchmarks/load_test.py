@@ -0,0 +1,254 @@
+"""
+Нагрузочный тест бота без сети.
+
+Синтетические обновления подаются прямо в dp.feed_update, Bot работает
+на подменной сессии (benchmarks.fake_session), база — временная.
+Тысячи посетителей параллельно проходят весь опрос (/start → выбор
+источника → отзыв → темы выставок), а админы в это время смотрят
+/reviews, /all_reviews, /statistic и отвечают через /answer.
+
+Результат — пропускная способность, p50/p99 времени обработки по шагам
+и время запросов к базе. Он сохраняется в JSON, и прогон можно сравнить
+с предыдущим через --compare, чтобы увидеть регрессии между версиями.
+
+Запуск:
+    python -m benchmarks.load_test --visitors 2000 --concurrency 200
+    python -m benchmarks.load_test --compare benchmarks/results/<старый>.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import subprocess
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List
+
+from benchmarks.common import ADMIN_IDS, ROOT, configure_env, percentile
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+
+class Recorder:
+    """Собирает длительности по именам; можно вызывать из потоков базы."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float):
+        with self._lock:
+            self.samples[name].append(seconds)
+
+    def summary(self) -> Dict[str, dict]:
+        return {
+            name: {
+                "count": len(values),
+                "total_ms": round(sum(values) * 1000, 3),
+                "mean_ms": round(sum(values) / len(values) * 1000, 3),
+                "p50_ms": round(percentile(values, 0.5) * 1000, 3),
+                "p99_ms": round(percentile(values, 0.99) * 1000, 3),
+            }
+            for name, values in sorted(self.samples.items())
+        }
+
+
+class UpdateFactory:
+    """Строит Update в том виде, в каком их присылает Telegram."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._ids = itertools.count(1)
+
+    def _user(self, user_id: int) -> dict:
+        return {"id": user_id, "is_bot": False, "first_name": f"user{user_id}", "username": f"user{user_id}"}
+
+    def _message(self, user_id: int, text: str) -> dict:
+        message = {
+            "message_id": next(self._ids),
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": self._user(user_id),
+            "text": text,
+        }
+        if text.startswith("/"):
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        return message
+
+    def message(self, user_id: int, text: str):
+        from aiogram.types import Update
+        return Update.model_validate(
+            {"update_id": next(self._ids), "message": self._message(user_id, text)},
+            context={"bot": self.bot},
+        )
+
+    def callback(self, user_id: int, data: str):
+        from aiogram.types import Update
+        message = self._message(user_id, "…")
+        message["from"] = {"id": 42, "is_bot": True, "first_name": "bot"}
+        return Update.model_validate(
+            {
+                "update_id": next(self._ids),
+                "callback_query": {
+                    "id": str(next(self._ids)),
+                    "from": self._user(user_id),
+                    "chat_instance": str(user_id),
+                    "message": message,
+                    "data": data,
+                },
+            },
+            context={"bot": self.bot},
+        )
+
+
+async def run(args) -> dict:
+    from benchmarks.fake_session import FakeSession
+    from config.create_bot import bot, dp, review_db
+    from config.all_routers import all_routers
+
+    for router in all_routers:
+        dp.include_router(router)
+
+    session = FakeSession(latency=args.api_latency, global_limit=None)
+    bot.session = session
+    factory = UpdateFactory(bot)
+    steps = Recorder()
+    db_times = Recorder()
+    review_db.add_query_listener(db_times.add)
+    errors = 0
+
+    async def feed(step: str, update):
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            await dp.feed_update(bot, update)
+        except Exception:
+            errors += 1
+        steps.add(step, time.perf_counter() - started)
+
+    visitors_done = asyncio.Event()
+    reviews_created = 0
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def visitor(n: int):
+        user_id = 10_000 + n
+        async with semaphore:
+            await feed("start", factory.message(user_id, "/start"))
+            await feed("source_choice", factory.callback(user_id, f"source_{random.randint(1, 4)}"))
+            await feed("free_review", factory.message(user_id, f"Очень понравилась выставка, посетитель {n}"))
+            await feed("subject", factory.message(user_id, random.choice(["импрессионизм", "фотография", "скульптура"])))
+        nonlocal reviews_created
+        reviews_created += 1
+
+    async def admin(admin_id: int):
+        while not visitors_done.is_set():
+            if not reviews_created:
+                await asyncio.sleep(args.admin_pause)
+                continue
+            await feed("admin_reviews", factory.message(admin_id, "/reviews"))
+            await feed("admin_all_reviews", factory.message(admin_id, "/all_reviews"))
+            await feed("admin_statistic", factory.message(admin_id, "/statistic"))
+            await feed("admin_answer_cmd", factory.message(admin_id, f"/answer {random.randint(1, reviews_created)}"))
+            await feed("admin_answer_text", factory.message(admin_id, "Спасибо за отзыв!"))
+            await asyncio.sleep(args.admin_pause)
+
+    started = time.perf_counter()
+    admins = [asyncio.create_task(admin(admin_id)) for admin_id in ADMIN_IDS[:args.admins]]
+    await asyncio.gather(*(visitor(n) for n in range(args.visitors)))
+    visitors_done.set()
+    await asyncio.gather(*admins)
+    elapsed = time.perf_counter() - started
+
+    await dp.storage.close()
+    total_updates = sum(len(v) for v in steps.samples.values())
+
+    return {
+        "version": _git_version(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "params": {
+            "visitors": args.visitors,
+            "concurrency": args.concurrency,
+            "admins": args.admins,
+            "api_latency": args.api_latency,
+        },
+        "elapsed_s": round(elapsed, 3),
+        "updates": total_updates,
+        "throughput_updates_per_s": round(total_updates / elapsed, 1),
+        "errors": errors,
+        "api_calls": session.calls,
+        "steps": steps.summary(),
+        "db": db_times.summary(),
+    }
+
+
+def _git_version() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "describe", "--always", "--dirty"], cwd=ROOT, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def print_report(result: dict, baseline: dict | None = None):
+    print(f"version={result['version']} elapsed={result['elapsed_s']}s updates={result['updates']} "
+          f"throughput={result['throughput_updates_per_s']} upd/s errors={result['errors']} "
+          f"api_calls={result['api_calls']}")
+
+    def delta(section: str, name: str, key: str) -> str:
+        if not baseline or name not in baseline.get(section, {}):
+            return ""
+        old = baseline[section][name][key]
+        new = result[section][name][key]
+        return f" ({(new - old) / old * 100:+.0f}%)" if old else ""
+
+    for section, title in (("steps", "handler latency"), ("db", "db time")):
+        print(f"\n{title}:")
+        for name, s in result[section].items():
+            print(f"  {name:<22} n={s['count']:<7} p50={s['p50_ms']:.2f}ms{delta(section, name, 'p50_ms')}"
+                  f"  p99={s['p99_ms']:.2f}ms{delta(section, name, 'p99_ms')}  total={s['total_ms']:.0f}ms")
+
+    if baseline:
+        old = baseline["throughput_updates_per_s"]
+        print(f"\nthroughput vs {baseline['version']}: {old} -> {result['throughput_updates_per_s']} upd/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--visitors", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=200, help="сколько посетителей проходят опрос одновременно")
+    parser.add_argument("--admins", type=int, default=3, choices=range(0, len(ADMIN_IDS) + 1))
+    parser.add_argument("--admin-pause", type=float, default=0.05, help="пауза между циклами команд админа, с")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="задержка ответа подменного Bot API, с")
+    parser.add_argument("--output", help="куда сохранить JSON (по умолчанию benchmarks/results/<версия>.json)")
+    parser.add_argument("--compare", help="JSON предыдущего прогона для сравнения")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--quiet", action="store_true", help="не выводить логи бота вовсе")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    configure_env()
+    import logging
+    logging.disable(logging.CRITICAL if args.quiet else logging.INFO)
+
+    result = asyncio.run(run(args))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"load_test-{result['version']}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"\nsaved to {output}")
+
+
+if __name__ == "__main__":
+    main()
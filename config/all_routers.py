@@ -1,5 +1,6 @@
-from routers.start_router.start_r import start_router
+from routers.admin_router.admin_r import admin_router
 from routers.review_router.review_router import review_router
 
 
-all_routers = (start_router, review_router)
+# Админские роутеры (start_router, broadcast_router) вложены в admin_router
+all_routers = (admin_router, review_router)
@@ -2,11 +2,21 @@ import logging
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
 import os
 from dotenv import load_dotenv
 
+from config.logging_setup import parse_sampling, setup_log_context, setup_logging
+from database.admin_db import AdminDB
+from database.db import ReviewDB
+from database.fsm_storage import SQLiteStorage
+from services.admins import AdminRegistry
+from services.flood_control import FloodControlMiddleware
+from services.metrics import setup_metrics
+from services.surveys import load_surveys
+
 load_dotenv()
 
 TOKEN = os.getenv('BOT_TOKEN')
@@ -15,11 +25,105 @@ ADMINISTRATOR = os.getenv("ADMINISTRATOR")
 ADMINISTRATOR2 = os.getenv("ADMINISTRATOR2")
 # CHAT_ADMIN = os.getenv('CHAT_ADMIN')
 
+DB_PATH = os.getenv("DB_PATH", "reviews.db")
+DB_WRITE_BATCH_SIZE = int(os.getenv("DB_WRITE_BATCH_SIZE", "64"))
+DB_WRITE_BATCH_DELAY = float(os.getenv("DB_WRITE_BATCH_DELAY", "0.005"))
 
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+BROADCAST_WORKERS = int(os.getenv("BROADCAST_WORKERS", "8"))
+
+FSM_CACHE_SIZE = int(os.getenv("FSM_CACHE_SIZE", "10000"))
+FSM_TTL_HOURS = float(os.getenv("FSM_TTL_HOURS", "24"))
+
+# Обслуживание базы (см. services/retention.py): обработанные отзывы старше
+# ARCHIVE_AFTER_DAYS переносятся в архив (0 — не переносить), VACUUM раз в
+# VACUUM_INTERVAL_DAYS (0 — никогда)
+ARCHIVE_AFTER_DAYS = float(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+MAINTENANCE_INTERVAL_HOURS = float(os.getenv("MAINTENANCE_INTERVAL_HOURS", "6"))
+VACUUM_INTERVAL_DAYS = float(os.getenv("VACUUM_INTERVAL_DAYS", "7"))
+
+# Как часто дополнять таблицы тем для /topics новыми отзывами (см. services/topics.py)
+TOPICS_INTERVAL_MINUTES = float(os.getenv("TOPICS_INTERVAL_MINUTES", "10"))
+
+# Новые отзывы назначаются одному из админов: least_loaded — самому свободному,
+# round_robin — по очереди, off — уведомляются все админы, как раньше
+REVIEW_ASSIGNMENT = os.getenv("REVIEW_ASSIGNMENT", "least_loaded")
+# Сколько минут отзыв закреплён за админом, нажавшим «Ответить»
+ANSWER_LEASE_MINUTES = float(os.getenv("ANSWER_LEASE_MINUTES", "15"))
+
+# Сколько отрисованных карточек отзывов держать в памяти (см. services/render_cache.py)
+RENDER_CACHE_SIZE = int(os.getenv("RENDER_CACHE_SIZE", "2000"))
+
+# Антифлуд посетителей (см. services/throttling.py): не больше THROTTLE_LIMIT
+# единиц стоимости за THROTTLE_WINDOW секунд; /start стоит 5, остальное — 1
+THROTTLE_LIMIT = float(os.getenv("THROTTLE_LIMIT", "20"))
+THROTTLE_WINDOW = float(os.getenv("THROTTLE_WINDOW", "60"))
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# Описание опросов посетителей (см. services/surveys.py)
+SURVEYS_PATH = os.getenv("SURVEYS_PATH", os.path.join(BASE_DIR, "config", "surveys.json"))
+
+# Режим получения обновлений: polling (по умолчанию) или webhook
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL", "")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+WEBHOOK_MAX_CONCURRENCY = int(os.getenv("WEBHOOK_MAX_CONCURRENCY", "100"))
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+# Что делать с обновлениями, накопившимися пока бот был выключен:
+# catch_up — обработать (см. services/catch_up.py), drop — выбросить
+PENDING_UPDATES = os.getenv("PENDING_UPDATES", "catch_up")
+CATCH_UP_CONCURRENCY = int(os.getenv("CATCH_UP_CONCURRENCY", "50"))
+CATCH_UP_MAX_AGE_HOURS = float(os.getenv("CATCH_UP_MAX_AGE_HOURS", "24"))
+# Адрес Bot API, если используется локальный сервер (или подменный в бенчмарках)
+BOT_API_URL = os.getenv("BOT_API_URL")
+
+# Лимиты исходящих сообщений (см. services/flood_control.py)
+FLOOD_GLOBAL_RATE = float(os.getenv("FLOOD_GLOBAL_RATE", "28"))
+FLOOD_CHAT_RATE = float(os.getenv("FLOOD_CHAT_RATE", "1"))
+FLOOD_CHAT_BURST = float(os.getenv("FLOOD_CHAT_BURST", "3"))
+FLOOD_MAX_RETRIES = int(os.getenv("FLOOD_MAX_RETRIES", "3"))
+
+# Метрики в формате Prometheus: GET http://METRICS_HOST:METRICS_PORT/metrics (0 — не поднимать сервер)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+
+# Логи: уровень, формат (text или json), доля сохраняемых INFO-записей
+# по логгерам ("aiogram.event=0.1,routers=0.5") и показ текста отзывов
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+LOG_SAMPLING = os.getenv("LOG_SAMPLING", "aiogram.event=0.1")
+LOG_USER_TEXT = os.getenv("LOG_USER_TEXT", "0") == "1"
+
+setup_logging(LOG_LEVEL, LOG_FORMAT, parse_sampling(LOG_SAMPLING), show_user_text=LOG_USER_TEXT)
 logger = logging.getLogger(__name__)
 
-bot = Bot(TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
-dp = Dispatcher(storage=MemoryStorage())
+# Единый на весь процесс экземпляр базы, общий для всех роутеров
+review_db = ReviewDB(
+    DB_PATH,
+    write_batch_size=DB_WRITE_BATCH_SIZE,
+    write_batch_delay=DB_WRITE_BATCH_DELAY,
+)
+
+# Админы из переменных окружения — владельцы: они всегда в списке,
+# остальных добавляют и удаляют командами без перезапуска
+OWNER_IDS = [int(admin) for admin in (ADMIN, ADMINISTRATOR, ADMINISTRATOR2) if admin]
+admin_registry = AdminRegistry(AdminDB(review_db), owners=OWNER_IDS)
+
+# Опросы компилируются один раз при старте; ошибка в файле не даст боту запуститься
+survey_catalog = load_surveys(SURVEYS_PATH, BASE_DIR)
+
+session = AiohttpSession(api=TelegramAPIServer.from_base(BOT_API_URL)) if BOT_API_URL else None
+bot = Bot(TOKEN, session=session, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+# Все исходящие сообщения идут через общий flood control
+bot.session.middleware(FloodControlMiddleware(
+    global_rate=FLOOD_GLOBAL_RATE,
+    chat_rate=FLOOD_CHAT_RATE,
+    chat_burst=FLOOD_CHAT_BURST,
+    max_retries=FLOOD_MAX_RETRIES,
+))
+# Состояния опросов хранятся в базе и переживают перезапуск бота
+dp = Dispatcher(storage=SQLiteStorage(review_db, max_entries=FSM_CACHE_SIZE, ttl=FSM_TTL_HOURS * 3600))
+setup_log_context(dp)
+setup_metrics(dp, bot, review_db)
@@ -0,0 +1,223 @@
+"""
+Настройка логирования бота.
+
+Обработчики пишут в очередь (QueueHandler), а форматирование и вывод
+в stderr выполняет отдельный поток QueueListener — event loop не ждёт
+ввода-вывода. К каждой записи добавляются update_id, user_id и имя
+хендлера текущего обновления (contextvars, их заполняет
+LogContextMiddleware). INFO-записи можно выборочно сэмплировать, а текст
+отзывов скрывается функцией redact().
+"""
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import queue
+import random
+import sys
+import time
+import zlib
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.types import TelegramObject, Update
+
+update_id_var: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar("log_update_id", default=None)
+user_id_var: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar("log_user_id", default=None)
+handler_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("log_handler", default=None)
+
+# Показывать ли текст отзывов в логах (по умолчанию — только длину)
+_show_user_text = False
+
+_listener: Optional[QueueListener] = None
+
+
+def redact(text: Optional[str]) -> str:
+    """Текст посетителя для лога: сам текст только при LOG_USER_TEXT=1, иначе его длина."""
+    if text is None:
+        return "<нет текста>"
+    if _show_user_text:
+        return text
+    return f"<скрыто, {len(text)} симв.>"
+
+
+class ContextFilter(logging.Filter):
+    """Добавляет к записи контекст обновления, в котором она сделана."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.update_id = update_id_var.get()
+        record.user_id = user_id_var.get()
+        record.handler = handler_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Пропускает только долю rate записей уровня INFO и ниже от указанных
+    логгеров (и их потомков); предупреждения и ошибки проходят всегда.
+    Решение принимается по update_id, поэтому у попавшего в выборку
+    обновления сохраняются все строки.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def _rate(self, name: str) -> Optional[float]:
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition(".")[0]
+        return None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO:
+            return True
+        rate = self._rate(record.name)
+        if rate is None or rate >= 1:
+            return True
+        update_id = getattr(record, "update_id", None)
+        if update_id is None:
+            return random.random() < rate
+        return (zlib.crc32(str(update_id).encode()) % 10_000) < rate * 10_000
+
+
+class _QueueHandler(QueueHandler):
+    """
+    QueueHandler без форматирования в вызывающем потоке.
+
+    Стандартный prepare() вызывает format() прямо в event loop, вклеивает
+    traceback в msg и обнуляет exc_info — тогда JsonFormatter не видит
+    исключение. Здесь запись только копируется с подставленными args,
+    а исключение остаётся в exc_info и форматируется потоком вывода.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        # args подставляются сейчас: изменяемые объекты могут поменяться, пока запись в очереди
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key in ("update_id", "user_id", "handler"):
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+
+    def __init__(self):
+        super().__init__("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        if getattr(record, "update_id", None) is not None:
+            text += f" [update={record.update_id} user={record.user_id} handler={record.handler}]"
+        return text
+
+
+def parse_sampling(value: str) -> Dict[str, float]:
+    """'aiogram.event=0.01,routers=0.1' -> {'aiogram.event': 0.01, 'routers': 0.1}"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, rate = item.partition("=")
+        rates[name.strip()] = float(rate)
+    return rates
+
+
+def setup_logging(
+        level: str = "INFO",
+        fmt: str = "text",
+        sampling: Optional[Dict[str, float]] = None,
+        show_user_text: bool = False
+    ) -> None:
+    """
+    Направляет все логи через очередь в отдельный поток вывода.
+    Повторный вызов перенастраивает логирование.
+    """
+    global _listener, _show_user_text
+    _show_user_text = show_user_text
+
+    if _listener is not None:
+        _listener.stop()
+
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+
+    # Неограниченная очередь: запись в неё не блокирует event loop
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    # Контекст и сэмплирование — до постановки в очередь, пока contextvars доступны
+    queue_handler.addFilter(ContextFilter())
+    if sampling:
+        queue_handler.addFilter(SamplingFilter(sampling))
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level.upper())
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """Дописывает оставшиеся в очереди записи и останавливает поток вывода."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
+
+
+class LogContextMiddleware(BaseMiddleware):
+    """
+    Заполняет контекст логов: на dp.update — update_id и user_id,
+    на наблюдателях сообщений и callback — имя хендлера.
+    """
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+        ) -> Any:
+        tokens = []
+        if isinstance(event, Update):
+            user = data.get("event_from_user")
+            tokens.append((update_id_var, update_id_var.set(event.update_id)))
+            tokens.append((user_id_var, user_id_var.set(user.id if user else None)))
+        handler_object = data.get("handler")
+        if handler_object is not None:
+            tokens.append((handler_var, handler_var.set(getattr(handler_object.callback, "__name__", None))))
+        try:
+            return await handler(event, data)
+        finally:
+            for var, token in reversed(tokens):
+                var.reset(token)
+
+
+def setup_log_context(dp: Dispatcher) -> None:
+    middleware = LogContextMiddleware()
+    dp.update.outer_middleware(middleware)
+    for observer in (dp.message, dp.callback_query):
+        observer.middleware(middleware)
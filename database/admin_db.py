@@ -0,0 +1,33 @@
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional
+
+from database.db import ReviewDB
+
+
+class AdminDB:
+    """Список администраторов бота (таблица admins)."""
+
+    def __init__(self, db: ReviewDB):
+        self.db = db
+
+
+    async def get_admin_ids(self) -> List[int]:
+        rows = await self.db.read(lambda conn: conn.execute(
+            "SELECT user_id FROM admins ORDER BY user_id"
+        ).fetchall())
+        return [row[0] for row in rows]
+
+
+    async def add_admins(self, user_ids: Iterable[int], added_by: Optional[int] = None) -> int:
+        """Добавляет админов, которых ещё нет в списке. Возвращает число добавленных."""
+        added_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        params = [(user_id, added_by, added_at) for user_id in user_ids]
+        return await self.db.write(lambda conn: conn.executemany(
+            "INSERT OR IGNORE INTO admins (user_id, added_by, added_at) VALUES (?, ?, ?)", params
+        ).rowcount)
+
+
+    async def remove_admin(self, user_id: int) -> bool:
+        return await self.db.write(lambda conn: conn.execute(
+            "DELETE FROM admins WHERE user_id = ?", (user_id,)
+        ).rowcount) > 0
@@ -0,0 +1,102 @@
+import sqlite3
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from database.db import ReviewDB
+
+
+class BroadcastDB:
+    """
+    Хранилище рассылок: снимок аудитории и статус доставки каждому получателю.
+    Работает поверх общего ReviewDB, поэтому пишет через тот же групповой commit.
+    """
+
+    def __init__(self, db: ReviewDB):
+        self.db = db
+
+
+    async def create_broadcast(self, from_chat_id: int, message_id: int, created_by: int) -> Tuple[int, int]:
+        """
+        Создаёт рассылку и в той же транзакции снимает аудиторию — всех,
+        кто когда-либо оставлял отзыв. Возвращает (id рассылки, число получателей).
+        """
+        created_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+        def query(conn: sqlite3.Connection) -> Tuple[int, int]:
+            broadcast_id = conn.execute(
+                "INSERT INTO broadcasts (from_chat_id, message_id, created_by, created_at) VALUES (?, ?, ?, ?)",
+                (from_chat_id, message_id, created_by, created_at)
+            ).lastrowid
+            total = conn.execute(
+                "INSERT INTO broadcast_recipients (broadcast_id, user_id) "
+                "SELECT DISTINCT ?, user_id FROM reviews_all",
+                (broadcast_id,)
+            ).rowcount
+            conn.execute("UPDATE broadcasts SET total = ? WHERE id = ?", (total, broadcast_id))
+            return broadcast_id, total
+
+        return await self.db.write(query)
+
+
+    async def set_progress_message(self, broadcast_id: int, chat_id: int, message_id: int) -> None:
+        """Запоминает сообщение, в котором админу показывается прогресс рассылки."""
+        await self.db.write(lambda conn: conn.execute(
+            "UPDATE broadcasts SET progress_chat_id = ?, progress_message_id = ? WHERE id = ?",
+            (chat_id, message_id, broadcast_id)
+        ))
+
+
+    async def get_broadcast(self, broadcast_id: int) -> Optional[Tuple[int, int, int, str, int, Optional[int], Optional[int]]]:
+        """(id, from_chat_id, message_id, status, total, progress_chat_id, progress_message_id)"""
+        return await self.db.read(lambda conn: conn.execute(
+            "SELECT id, from_chat_id, message_id, status, total, progress_chat_id, progress_message_id "
+            "FROM broadcasts WHERE id = ?",
+            (broadcast_id,)
+        ).fetchone())
+
+
+    async def get_running_broadcasts(self) -> List[int]:
+        """id рассылок, которые не были доведены до конца (например, из-за перезапуска)."""
+        rows = await self.db.read(lambda conn: conn.execute(
+            "SELECT id FROM broadcasts WHERE status = 'running' ORDER BY id"
+        ).fetchall())
+        return [row[0] for row in rows]
+
+
+    async def get_pending_recipients(self, broadcast_id: int, after_user_id: int, limit: int) -> List[Tuple[int, int]]:
+        """Следующая порция получателей, которым ещё не доставлено: (user_id, attempts)."""
+        return await self.db.read(lambda conn: conn.execute(
+            "SELECT user_id, attempts FROM broadcast_recipients "
+            "WHERE broadcast_id = ? AND status = 'pending' AND user_id > ? "
+            "ORDER BY user_id LIMIT ?",
+            (broadcast_id, after_user_id, limit)
+        ).fetchall())
+
+
+    async def mark_recipients(self, broadcast_id: int, results: Iterable[Tuple[int, str, int, Optional[str]]]) -> None:
+        """
+        Сохраняет результаты доставки пачкой.
+
+        :param results: кортежи (user_id, status, attempts, error), status — 'sent', 'failed' или 'pending'
+        """
+        rows = [(status, attempts, error, broadcast_id, user_id) for user_id, status, attempts, error in results]
+        await self.db.write(lambda conn: conn.executemany(
+            "UPDATE broadcast_recipients SET status = ?, attempts = ?, error = ? "
+            "WHERE broadcast_id = ? AND user_id = ?",
+            rows
+        ))
+
+
+    async def get_counts(self, broadcast_id: int) -> Dict[str, int]:
+        """Количество получателей в каждом статусе."""
+        rows = await self.db.read(lambda conn: conn.execute(
+            "SELECT status, COUNT(*) FROM broadcast_recipients WHERE broadcast_id = ? GROUP BY status",
+            (broadcast_id,)
+        ).fetchall())
+        return dict(rows)
+
+
+    async def finish_broadcast(self, broadcast_id: int, status: str = "done") -> None:
+        await self.db.write(lambda conn: conn.execute(
+            "UPDATE broadcasts SET status = ? WHERE id = ?", (status, broadcast_id)
+        ))
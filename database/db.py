@@ -1,74 +1,678 @@
+import asyncio
+import re
 import sqlite3
-from typing import List, Tuple, Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterable, List, Tuple, Optional
+
+from database.migrations import ARCHIVE_COLUMNS, migrate, rebuild_search_index
+
+# Способы назначения новых отзывов администраторам (ReviewDB.add_review)
+ASSIGN_LEAST_LOADED = "least_loaded"
+ASSIGN_ROUND_ROBIN = "round_robin"
+
+# Результаты ReviewDB.claim_review
+CLAIM_OK = "claimed"
+CLAIM_BUSY = "busy"
+CLAIM_ANSWERED = "answered"
+CLAIM_NOT_FOUND = "not_found"
+
+# Колонки выгрузки /export в порядке следования
+EXPORT_COLUMNS = (
+    "id", "user_id", "username", "source", "free_review", "subject",
+    "created_at", "answered", "admin_answer", "answered_at", "survey",
+)
+
+
+def pick_assignee(conn: sqlite3.Connection, candidates: List[int], policy: str) -> int:
+    """
+    Выбирает, кому из candidates назначить новый отзыв.
+
+    least_loaded — админу с наименьшим числом назначенных необработанных
+    отзывов, при равенстве — тому, кому отзыв назначали давнее всего;
+    round_robin — следующему по списку после получившего предыдущий отзыв.
+    """
+    candidates = sorted(set(candidates))
+    if policy == ASSIGN_ROUND_ROBIN:
+        row = conn.execute(
+            "SELECT assigned_to FROM reviews WHERE assigned_to IS NOT NULL ORDER BY id DESC LIMIT 1"
+        ).fetchone()
+        later = [admin_id for admin_id in candidates if row is not None and admin_id > row[0]]
+        return later[0] if later else candidates[0]
+
+    placeholders = ", ".join("?" * len(candidates))
+    loads = dict(conn.execute(
+        f"SELECT assigned_to, COUNT(*) FROM reviews WHERE assigned_to IN ({placeholders}) AND answered = 0 "
+        "GROUP BY assigned_to",
+        candidates
+    ).fetchall())
+    last_assigned = dict(conn.execute(
+        f"SELECT assigned_to, MAX(id) FROM reviews WHERE assigned_to IN ({placeholders}) GROUP BY assigned_to",
+        candidates
+    ).fetchall())
+    return min(candidates, key=lambda admin_id: (loads.get(admin_id, 0), last_assigned.get(admin_id, 0)))
+
+
+def build_fts_query(text: str) -> str:
+    """
+    Превращает запрос администратора в безопасный запрос FTS5: каждое слово
+    берётся в кавычки (спецсимволы FTS не сработают) и ищется по префиксу,
+    чтобы «Малевич» находил и «Малевича».
+    """
+    words = re.findall(r"\w+", text.lower())
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def _query_name(func: Callable) -> str:
+    """Имя метода репозитория, из которого пришёл запрос: 'ReviewDB.get_review.<locals>.<lambda>' -> 'get_review'."""
+    return func.__qualname__.split(".<locals>")[0].rsplit(".", 1)[-1]
+
 
 class ReviewDB:
+    """
+    Асинхронный репозиторий отзывов.
+
+    Все запросы к sqlite выполняются вне event loop: запись идёт через
+    отдельный поток с собственным соединением, чтение — через небольшой
+    пул потоков, у каждого из которых своё соединение. База работает
+    в режиме WAL, поэтому чтение не блокируется записью.
+
+    Одновременные операции записи объединяются в групповой commit: всё,
+    что накопилось за write_batch_delay (но не больше write_batch_size
+    операций), выполняется в одной транзакции, а каждый вызывающий
+    получает свой результат.
+    """
+
+    def __init__(
+            self,
+            db_path: str = "reviews.db",
+            read_pool_size: int = 2,
+            write_batch_size: int = 64,
+            write_batch_delay: float = 0.005
+        ):
+        """
+        :param db_path: Путь к файлу базы
+        :param read_pool_size: Количество потоков (и соединений) для чтения
+        :param write_batch_size: Максимум операций записи в одной транзакции
+        :param write_batch_delay: Сколько секунд ждать попутные записи, прежде чем делать commit
+        """
+        self.db_path = db_path
+        self.write_batch_size = max(1, write_batch_size)
+        self.write_batch_delay = max(0.0, write_batch_delay)
+        self._pending: Optional[asyncio.Queue] = None
+        self._batch_task: Optional[asyncio.Task] = None
+        self._batch_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._local = threading.local()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+        self._readers = ThreadPoolExecutor(max_workers=read_pool_size, thread_name_prefix="db-reader")
+        self._read_conns: List[sqlite3.Connection] = []
+        self._read_conns_lock = threading.Lock()
+        self._query_listeners: List[Callable[[str, float], None]] = []
+        self._answer_listeners: List[Callable[[int], None]] = []
+
+        # Соединение для записи создаётся сразу, чтобы схема была
+        # обновлена до первого запроса на чтение.
+        self.conn = self._connect()
+        migrate(self.conn)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    def _read_conn(self) -> sqlite3.Connection:
+        """Соединение для чтения, своё у каждого потока пула."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            conn.execute("PRAGMA query_only=ON")
+            self._local.conn = conn
+            with self._read_conns_lock:
+                self._read_conns.append(conn)
+        return conn
+
+    def add_query_listener(self, listener: Callable[[str, float], None]):
+        """
+        Подписывает listener(name, seconds) на время выполнения запросов: name — имя
+        метода репозитория, для группового commit — 'write_batch'. Вызывается из потоков базы.
+        """
+        self._query_listeners.append(listener)
+
+    def add_answer_listener(self, listener: Callable[[int], None]):
+        """
+        Подписывает listener(review_id) на ответ администратора на отзыв —
+        например, чтобы сбросить кэш отрисованных карточек. Вызывается в event loop
+        после того, как ответ записан.
+        """
+        self._answer_listeners.append(listener)
 
+    def _notify(self, name: str, seconds: float):
+        for listener in self._query_listeners:
+            try:
+                listener(name, seconds)
+            except Exception:
+                pass
 
-    def __init__(self, db_path: str = "reviews.db"):
-        self.conn = sqlite3.connect(db_path, check_same_thread=False)
-        self._create_table()
-
-    def _create_table(self):
-        with self.conn:
-            self.conn.execute('''
-                CREATE TABLE IF NOT EXISTS reviews (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    username TEXT,
-                    review TEXT NOT NULL,
-                    answered INTEGER DEFAULT 0,
-                    admin_answer TEXT DEFAULT NULL
+    def _timed(self, func: Callable[[sqlite3.Connection], Any]) -> Callable[[sqlite3.Connection], Any]:
+        if not self._query_listeners:
+            return func
+        name = _query_name(func)
+
+        def run(conn: sqlite3.Connection) -> Any:
+            started = time.perf_counter()
+            try:
+                return func(conn)
+            finally:
+                self._notify(name, time.perf_counter() - started)
+
+        return run
+
+    async def read(self, func: Callable[[sqlite3.Connection], Any]) -> Any:
+        """
+        Выполняет func(conn) в потоке чтения. Используется методами репозитория
+        и другими модулями, которым нужны собственные запросы к той же базе.
+        """
+        func = self._timed(func)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._readers, lambda: func(self._read_conn()))
+
+    async def write(self, func: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Ставит операцию записи в очередь группового commit и ждёт её результат."""
+        loop = asyncio.get_running_loop()
+        if self._batch_loop is not loop or self._batch_task is None or self._batch_task.done():
+            self._pending = asyncio.Queue()
+            self._batch_loop = loop
+            self._batch_task = loop.create_task(self._batch_worker(self._pending))
+
+        future = loop.create_future()
+        self._pending.put_nowait((self._timed(func), future))
+        return await future
+
+    async def _batch_worker(self, queue: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.write_batch_delay
+            while len(batch) < self.write_batch_size:
+                if not queue.empty():
+                    batch.append(queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                results = await loop.run_in_executor(
+                    self._writer, self._run_batch, [func for func, _ in batch]
                 )
-            ''')
+            except Exception as e:
+                results = [(False, e)] * len(batch)
+
+            for (_, future), (ok, value) in zip(batch, results):
+                if future.done():
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+    def _run_batch(self, funcs: List[Callable[[sqlite3.Connection], Any]]) -> List[Tuple[bool, Any]]:
+        """
+        Выполняет пачку операций в одной транзакции. Если какая-то из них
+        упала, транзакция откатывается и операции повторяются по одной,
+        чтобы ошибка досталась только своему вызывающему.
+        """
+        started = time.perf_counter()
+        try:
+            with self.conn:
+                results = [(True, func(self.conn)) for func in funcs]
+            if self._query_listeners:
+                self._notify("write_batch", time.perf_counter() - started)
+            return results
+        except Exception:
+            if len(funcs) == 1:
+                raise
+
+        results = []
+        for func in funcs:
+            try:
+                with self.conn:
+                    results.append((True, func(self.conn)))
+            except Exception as e:
+                results.append((False, e))
+        return results
 
 
-    def add_review(self, user_id: int, username: Optional[str], review: str) -> int:
-        """Добавить отзыв, возвращает id добавленной записи"""
-        with self.conn:
-            cursor = self.conn.execute(
-                "INSERT INTO reviews (user_id, username, review) VALUES (?, ?, ?)",
-                (user_id, username, review)
+    async def add_review(
+            self,
+            user_id: int,
+            username: Optional[str],
+            source: str,
+            free_review: str,
+            subject: str,
+            notify_admins: Iterable[int] = (),
+            survey: Optional[str] = None,
+            assignment: Optional[str] = None
+        ) -> int:
+        """
+        Добавить отзыв, возвращает id добавленной записи.
+        survey — id опроса, через который оставлен отзыв.
+
+        Для каждого id из notify_admins в той же транзакции создаётся запись
+        в notification_outbox — уведомление разошлёт AdminNotifier.
+        Если задан assignment (ASSIGN_LEAST_LOADED или ASSIGN_ROUND_ROBIN),
+        отзыв назначается одному из notify_admins (pick_assignee), и уведомление
+        получает только он.
+        """
+        notify_admins = list(notify_admins)
+        created_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+        def query(conn: sqlite3.Connection) -> int:
+            # Колонка review оставлена для совместимости со старыми записями,
+            # у новых в ней хранится только свободный отзыв.
+            cursor = conn.execute(
+                "INSERT INTO reviews (user_id, username, review, source, free_review, subject, created_at, survey) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (user_id, username, free_review, source, free_review, subject, created_at, survey)
+            )
+            conn.execute(
+                "INSERT INTO reviews_fts (rowid, source, free_review, subject) VALUES (?, ?, ?, ?)",
+                (cursor.lastrowid, source, free_review, subject)
+            )
+            recipients = notify_admins
+            if assignment and notify_admins:
+                # Выбор и назначение в одной транзакции с вставкой: два отзыва,
+                # пришедшие одновременно, видят нагрузку друг друга
+                assignee = pick_assignee(conn, notify_admins, assignment)
+                conn.execute("UPDATE reviews SET assigned_to = ? WHERE id = ?", (assignee, cursor.lastrowid))
+                recipients = [assignee]
+            conn.executemany(
+                "INSERT INTO notification_outbox (review_id, admin_id) VALUES (?, ?)",
+                ((cursor.lastrowid, admin_id) for admin_id in recipients)
             )
             return cursor.lastrowid
 
+        return await self.write(query)
+
+
+    async def get_unanswered_reviews(self) -> List[Tuple[int, int, Optional[str], str, str, str]]:
+        """Получить список необработанных отзывов (id, user_id, username, source, free_review, subject)"""
+        return await self.read(lambda conn: conn.execute(
+            "SELECT id, user_id, username, source, free_review, subject FROM reviews WHERE answered = 0"
+        ).fetchall())
+
+
+    async def claim_review(self, review_id: int, admin_id: int, lease: float) -> Tuple[str, Optional[int], Optional[float]]:
+        """
+        Захватывает отзыв для ответа на lease секунд (или продлевает свой захват).
+
+        Захват — одно условное UPDATE: он удаётся, только если отзыв не обработан
+        и не захвачен другим админом либо чужой захват истёк, поэтому двое
+        не могут одновременно отвечать на один отзыв.
+
+        :return: (CLAIM_OK | CLAIM_BUSY | CLAIM_ANSWERED | CLAIM_NOT_FOUND,
+                  кто держит захват, до какого времени (unix time))
+        """
+        def query(conn: sqlite3.Connection):
+            now = time.time()
+            cursor = conn.execute(
+                "UPDATE reviews SET claimed_by = ?, claim_expires_at = ? "
+                "WHERE id = ? AND answered = 0 "
+                "AND (claimed_by IS NULL OR claimed_by = ? OR claim_expires_at < ?)",
+                (admin_id, now + lease, review_id, admin_id, now)
+            )
+            if cursor.rowcount:
+                return CLAIM_OK, admin_id, now + lease
+            row = conn.execute(
+                "SELECT answered, claimed_by, claim_expires_at FROM reviews WHERE id = ?", (review_id,)
+            ).fetchone()
+            if row is None:
+                archived = conn.execute("SELECT 1 FROM reviews_archive WHERE id = ?", (review_id,)).fetchone()
+                return (CLAIM_ANSWERED if archived else CLAIM_NOT_FOUND), None, None
+            if row[0]:
+                return CLAIM_ANSWERED, None, None
+            return CLAIM_BUSY, row[1], row[2]
+
+        return await self.write(query)
+
 
-    def get_unanswered_reviews(self) -> List[Tuple[int, int, Optional[str], str]]:
-        """Получить список необработанных отзывов (id, user_id, username, review)"""
-        cursor = self.conn.execute(
-            "SELECT id, user_id, username, review FROM reviews WHERE answered = 0"
-        )
-        return cursor.fetchall()
+    async def release_claim(self, review_id: int, admin_id: int) -> None:
+        """Снимает захват, если его держит admin_id."""
+        await self.write(lambda conn: conn.execute(
+            "UPDATE reviews SET claimed_by = NULL, claim_expires_at = NULL WHERE id = ? AND claimed_by = ?",
+            (review_id, admin_id)
+        ))
 
 
-    def mark_review_answered(self, review_id: int, answer_text: str) -> None:
-        """Пометить отзыв как отвеченный"""
-        with self.conn:
-            self.conn.execute(
-                "UPDATE reviews SET answered = 1, admin_answer = ? WHERE id = ?",
-                (answer_text, review_id)
+    async def mark_review_answered(self, review_id: int, answer_text: str, admin_id: Optional[int] = None) -> bool:
+        """
+        Пометить отзыв как отвеченный. Если указан admin_id, обновление условное:
+        отзыв ещё не обработан и не захвачен другим админом (или его захват истёк).
+        Возвращает False, если ответ не записан.
+        """
+        answered_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+        def query(conn: sqlite3.Connection) -> bool:
+            if admin_id is None:
+                cursor = conn.execute(
+                    "UPDATE reviews SET answered = 1, admin_answer = ?, answered_at = ? WHERE id = ?",
+                    (answer_text, answered_at, review_id)
+                )
+            else:
+                cursor = conn.execute(
+                    "UPDATE reviews SET answered = 1, admin_answer = ?, answered_at = ?, answered_by = ?, "
+                    "claimed_by = NULL, claim_expires_at = NULL "
+                    "WHERE id = ? AND answered = 0 "
+                    "AND (claimed_by IS NULL OR claimed_by = ? OR claim_expires_at < ?)",
+                    (answer_text, answered_at, admin_id, review_id, admin_id, time.time())
                 )
+            if not cursor.rowcount:
+                return False
+            conn.execute("UPDATE reviews_fts SET admin_answer = ? WHERE rowid = ?", (answer_text, review_id))
+            return True
+
+        answered = await self.write(query)
+        if answered:
+            for listener in self._answer_listeners:
+                listener(review_id)
+        return answered
+
+
+    async def get_answered_reviews(self) -> List[Tuple[int, int, Optional[str], str, str, str, Optional[str]]]:
+        """Получить список обработанных отзывов (id, user_id, username, source, free_review, subject, admin_answer)"""
+        return await self.read(lambda conn: conn.execute(
+            "SELECT id, user_id, username, source, free_review, subject, admin_answer FROM reviews WHERE answered = 1"
+        ).fetchall())
+
+
+    async def get_reviews_page(
+            self,
+            answered: Optional[int] = None,
+            after_id: Optional[int] = None,
+            before_id: Optional[int] = None,
+            limit: int = 5
+        ) -> Tuple[List[tuple], bool, bool]:
+        """
+        Страница отзывов с курсором по id (keyset pagination).
+
+        :param answered: 0 — только необработанные, 1 — только обработанные, None — все
+        :param after_id: вернуть отзывы с id больше указанного (страница «вперёд»)
+        :param before_id: вернуть отзывы с id меньше указанного (страница «назад»)
+        :param limit: размер страницы
+        :return: (строки (id, user_id, username, source, free_review, subject, created_at,
+                  answered, admin_answer) по возрастанию id,
+                  есть ли предыдущая страница, есть ли следующая страница)
+        """
+        where = "answered = ?" if answered is not None else "1 = 1"
+        base_args: tuple = (answered,) if answered is not None else ()
+        columns = "id, user_id, username, source, free_review, subject, created_at, answered, admin_answer"
+
+        def query(conn: sqlite3.Connection):
+            if before_id is not None:
+                rows = conn.execute(
+                    f"SELECT {columns} FROM reviews WHERE {where} AND id < ? ORDER BY id DESC LIMIT ?",
+                    base_args + (before_id, limit + 1)
+                ).fetchall()
+                has_prev = len(rows) > limit
+                rows = rows[:limit][::-1]
+                has_next = conn.execute(
+                    f"SELECT 1 FROM reviews WHERE {where} AND id >= ? LIMIT 1",
+                    base_args + (before_id,)
+                ).fetchone() is not None
+            else:
+                rows = conn.execute(
+                    f"SELECT {columns} FROM reviews WHERE {where} AND id > ? ORDER BY id LIMIT ?",
+                    base_args + (after_id or 0, limit + 1)
+                ).fetchall()
+                has_next = len(rows) > limit
+                rows = rows[:limit]
+                has_prev = after_id is not None and conn.execute(
+                    f"SELECT 1 FROM reviews WHERE {where} AND id <= ? LIMIT 1",
+                    base_args + (after_id,)
+                ).fetchone() is not None
+            return rows, has_prev, has_next
+
+        return await self.read(query)
+
+
+    async def get_review(self, review_id: int) -> Optional[tuple]:
+        """
+        Отзыв целиком (в том числе из архива): (id, user_id, username, source,
+        free_review, subject, created_at, answered, admin_answer) или None.
+        """
+        return await self.read(lambda conn: conn.execute(
+            "SELECT id, user_id, username, source, free_review, subject, created_at, answered, admin_answer "
+            "FROM reviews_all WHERE id = ?",
+            (review_id,)
+        ).fetchone())
+
+
+    async def search_reviews(self, text: str, offset: int = 0, limit: int = 5) -> Tuple[List[tuple], bool]:
+        """
+        Полнотекстовый поиск по отзывам (включая архив) и ответам админов,
+        лучшие совпадения первыми.
+
+        :return: (строки в формате get_reviews_page, есть ли следующая страница)
+        """
+        fts_query = build_fts_query(text)
+        if not fts_query:
+            return [], False
+
+        def query(conn: sqlite3.Connection):
+            # Индекс общий для reviews и reviews_archive: сначала страница
+            # совпадений по индексу, затем строки из той таблицы, где отзыв лежит
+            rows = conn.execute(
+                "WITH matches AS ("
+                "SELECT rowid, rank FROM reviews_fts WHERE reviews_fts MATCH ? ORDER BY rank LIMIT ? OFFSET ?) "
+                "SELECT r.id, r.user_id, r.username, r.source, r.free_review, r.subject, r.created_at, "
+                "r.answered, r.admin_answer, matches.rank "
+                "FROM matches JOIN reviews r ON r.id = matches.rowid "
+                "UNION ALL "
+                "SELECT a.id, a.user_id, a.username, a.source, a.free_review, a.subject, a.created_at, "
+                "a.answered, a.admin_answer, matches.rank "
+                "FROM matches JOIN reviews_archive a ON a.id = matches.rowid "
+                "ORDER BY 10",
+                (fts_query, limit + 1, offset)
+            ).fetchall()
+            rows = [row[:-1] for row in rows]
+            return rows[:limit], len(rows) > limit
+
+        return await self.read(query)
+
 
-    
-    def get_answered_reviews(self) -> List[Tuple[int, int, Optional[str], str, Optional[str]]]:
-        """Получить список обработанных отзывов (id, user_id, username, review, admin_answer)"""
-        cursor = self.conn.execute(
-            "SELECT id, user_id, username, review, admin_answer FROM reviews WHERE answered = 1"
+    async def export_reviews(
+            self,
+            sink: Callable[[List[tuple]], None],
+            date_from: Optional[str] = None,
+            date_to: Optional[str] = None,
+            answered: Optional[int] = None,
+            chunk_size: int = 500
+        ) -> int:
+        """
+        Выгрузка отзывов по частям: sink(rows) вызывается в потоке чтения для
+        каждых chunk_size строк (колонки EXPORT_COLUMNS, по возрастанию id),
+        поэтому в памяти никогда не лежит больше одной порции. Архивные
+        отзывы выгружаются вместе с остальными.
+
+        :param date_from: 'YYYY-MM-DD' — отзывы, оставленные с этого дня (UTC)
+        :param date_to: 'YYYY-MM-DD' — отзывы, оставленные по этот день включительно
+        :param answered: 0 — только необработанные, 1 — только обработанные, None — все
+        :return: число выгруженных отзывов
+        """
+        conditions, args = [], []
+        if date_from:
+            conditions.append("created_at >= ?")
+            args.append(date_from)
+        if date_to:
+            conditions.append("created_at < date(?, '+1 day')")
+            args.append(date_to)
+        if answered is not None:
+            conditions.append("answered = ?")
+            args.append(answered)
+        where = " AND ".join(conditions) or "1 = 1"
+
+        def query(conn: sqlite3.Connection) -> int:
+            cursor = conn.execute(
+                f"SELECT {', '.join(EXPORT_COLUMNS)} FROM reviews_all WHERE {where} ORDER BY id", args
+            )
+            total = 0
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return total
+                sink(rows)
+                total += len(rows)
+
+        return await self.read(query)
+
+
+    async def archive_answered(self, answered_before: str, limit: int = 500) -> int:
+        """
+        Переносит в reviews_archive до limit отзывов, на которые ответили
+        раньше answered_before ('YYYY-MM-DD HH:MM:SS', UTC); отзывы без дат
+        остаются в рабочей таблице. Перенос — одна
+        транзакция: отзыв всегда лежит ровно в одной из таблиц. Возвращает
+        число перенесённых отзывов.
+        """
+        archived_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        columns = ", ".join(ARCHIVE_COLUMNS)
+
+        def query(conn: sqlite3.Connection) -> int:
+            # У отзывов, обработанных до появления answered_at, берётся дата создания.
+            # Старые отзывы без обеих дат не архивируются: их возраст неизвестен.
+            ids = [row[0] for row in conn.execute(
+                "SELECT id FROM reviews WHERE answered = 1 AND COALESCE(answered_at, created_at) < ? "
+                "ORDER BY id LIMIT ?",
+                (answered_before, limit)
+            )]
+            if not ids:
+                return 0
+            placeholders = ", ".join("?" * len(ids))
+            conn.execute(
+                f"INSERT INTO reviews_archive ({columns}, archived_at) "
+                f"SELECT {columns}, ? FROM reviews WHERE id IN ({placeholders})",
+                (archived_at, *ids)
             )
-        return cursor.fetchall()
-    
+            conn.execute(f"DELETE FROM reviews WHERE id IN ({placeholders})", ids)
+            return len(ids)
+
+        return await self.write(query)
+
+
+    async def maintenance(self, vacuum: bool = False) -> dict:
+        """
+        Обслуживание базы: ANALYZE, checkpoint WAL с усечением файла и, если
+        vacuum=True, VACUUM. Выполняется в потоке записи между транзакциями
+        группового commit (VACUUM нельзя выполнить внутри транзакции), так что
+        event loop не блокируется, а запись просто ждёт окончания.
+        Возвращает время каждого шага в секундах и результат checkpoint.
+        """
+        def run() -> dict:
+            report = {}
+            started = time.perf_counter()
+            # analysis_limit ограничивает ANALYZE выборкой строк — быстро и на большой таблице
+            self.conn.execute("PRAGMA analysis_limit=1000")
+            self.conn.execute("ANALYZE")
+            report["analyze"] = time.perf_counter() - started
+            if vacuum:
+                started = time.perf_counter()
+                self.conn.execute("VACUUM")
+                report["vacuum"] = time.perf_counter() - started
+            started = time.perf_counter()
+            busy, log_pages, checkpointed = self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+            report["checkpoint"] = time.perf_counter() - started
+            report["checkpoint_busy"] = busy
+            for name in ("analyze", "vacuum", "checkpoint"):
+                if name in report and self._query_listeners:
+                    self._notify(f"maintenance_{name}", report[name])
+            return report
 
-    def count_users(self) -> int:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._writer, run)
+
+
+    async def rebuild_search_index(self) -> None:
+        """Пересобирает полнотекстовый индекс по всем отзывам."""
+        await self.write(rebuild_search_index)
+
+
+    async def get_review_status(self, review_id: int) -> Optional[Tuple[int, int]]:
+        """Возвращает (user_id, answered) отзыва (в том числе архивного) или None, если отзыв не найден."""
+        return await self.read(lambda conn: conn.execute(
+            "SELECT user_id, answered FROM reviews_all WHERE id = ?", (review_id,)
+        ).fetchone())
+
+
+    async def count_users(self) -> int:
         """Возвращает количество уникальных пользователей, которые воспользовались ботом (например, оставили отзывы)."""
-        cursor = self.conn.execute("SELECT COUNT(DISTINCT user_id) FROM reviews")
-        result = cursor.fetchone()
+        result = await self.read(lambda conn: conn.execute(
+            "SELECT value FROM stats_totals WHERE name = 'users'"
+        ).fetchone())
         return result[0] if result else 0
 
-    def count_reviews(self) -> int:
+    async def count_reviews(self) -> int:
         """Возвращает общее количество отзывов."""
-        cursor = self.conn.execute("SELECT COUNT(*) FROM reviews")
-        result = cursor.fetchone()
+        result = await self.read(lambda conn: conn.execute(
+            "SELECT value FROM stats_totals WHERE name = 'reviews'"
+        ).fetchone())
         return result[0] if result else 0
 
 
+    async def get_statistics(self, days: int = 7, top_sources: int = 10) -> dict:
+        """
+        Статистика из предрасчитанных таблиц stats_* (их ведут триггеры, см. миграцию 7).
+
+        Возвращает dict с ключами: users, reviews, answered, unanswered,
+        sources [(источник, отзывов)], daily [(день, отзывов, ответов)],
+        median_response_seconds (None, если ответов ещё не было).
+        """
+        def query(conn: sqlite3.Connection) -> dict:
+            totals = dict(conn.execute("SELECT name, value FROM stats_totals").fetchall())
+            sources = conn.execute(
+                "SELECT source, reviews FROM stats_sources ORDER BY reviews DESC LIMIT ?", (top_sources,)
+            ).fetchall()
+            daily = conn.execute(
+                "SELECT day, reviews, answered FROM stats_daily ORDER BY day DESC LIMIT ?", (days,)
+            ).fetchall()
+            # Число строк stats_response_times ведут триггеры (миграция 14), а сама
+            # медиана берётся по индексу idx_stats_response_times_seconds
+            answered_count = totals.get("response_times", 0)
+            median = None
+            if answered_count:
+                median = conn.execute(
+                    "SELECT seconds FROM stats_response_times ORDER BY seconds LIMIT 1 OFFSET ?",
+                    (answered_count // 2,)
+                ).fetchone()[0]
+            reviews = totals.get("reviews", 0)
+            answered = totals.get("answered", 0)
+            return {
+                "users": totals.get("users", 0),
+                "reviews": reviews,
+                "answered": answered,
+                "unanswered": reviews - answered,
+                "sources": sources,
+                "daily": daily,
+                "median_response_seconds": median,
+            }
+
+        return await self.read(query)
+
+
     def close(self):
+        if self._batch_task is not None:
+            self._batch_task.cancel()
+        self._writer.shutdown(wait=True)
+        self._readers.shutdown(wait=True)
+        with self._read_conns_lock:
+            for conn in self._read_conns:
+                conn.close()
+            self._read_conns.clear()
         self.conn.close()
@@ -0,0 +1,196 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, StateType, StorageKey
+
+from database.db import ReviewDB
+
+logger = logging.getLogger(__name__)
+
+
+class _Record:
+    __slots__ = ("state", "data", "updated_at")
+
+    def __init__(self, state: Optional[str], data: Dict[str, Any], updated_at: float):
+        self.state = state
+        self.data = data
+        self.updated_at = updated_at
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    FSM-хранилище aiogram поверх общей sqlite-базы.
+
+    Состояния держатся в LRU-кэше ограниченного размера и сбрасываются
+    в таблицу fsm_storage в фоне (write-behind) раз в flush_interval
+    секунд. Записи, которые не менялись дольше ttl (брошенные опросы),
+    удаляются и из памяти, и из базы при периодической чистке. После
+    перезапуска состояние читается из базы, поэтому посетитель
+    продолжает опрос с того же вопроса.
+    """
+
+    def __init__(
+            self,
+            db: ReviewDB,
+            max_entries: int = 10_000,
+            ttl: float = 24 * 60 * 60,
+            flush_interval: float = 1.0,
+            compaction_interval: float = 10 * 60
+        ):
+        self.db = db
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.compaction_interval = compaction_interval
+        self.key_builder = DefaultKeyBuilder(with_bot_id=True, with_business_connection_id=True, with_destiny=True)
+        self._cache: "OrderedDict[str, _Record]" = OrderedDict()
+        self._dirty: set = set()
+        # Ключи, чья запись в базу ещё не завершилась
+        self._flushing: set = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def _ensure_background(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._background())
+
+    async def _background(self):
+        last_compaction = time.monotonic()
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                if time.monotonic() - last_compaction >= self.compaction_interval:
+                    await self.compact()
+                    last_compaction = time.monotonic()
+            except Exception as e:
+                logger.error(f"Ошибка фоновой записи FSM: {e}")
+
+    async def _load(self, key: str) -> _Record:
+        record = self._cache.get(key)
+        if record is not None:
+            self._cache.move_to_end(key)
+            return record
+
+        row = await self.db.read(lambda conn: conn.execute(
+            "SELECT state, data, updated_at FROM fsm_storage WHERE key = ?", (key,)
+        ).fetchone())
+        # Пока шло чтение, запись могла появиться в кэше
+        record = self._cache.get(key)
+        if record is not None:
+            return record
+
+        now = time.time()
+        if row is not None and now - row[2] < self.ttl:
+            record = _Record(row[0], json.loads(row[1]), row[2])
+        else:
+            record = _Record(None, {}, now)
+        self._cache[key] = record
+        await self._evict()
+        return record
+
+    async def _evict(self):
+        """Выгружает из памяти самые давно использованные записи сверх max_entries."""
+        if len(self._cache) <= self.max_entries:
+            return
+        if self._dirty:
+            await self.flush()
+        # Несохранённые записи не выгружаем, чтобы не потерять изменения
+        for key in list(self._cache):
+            if len(self._cache) <= self.max_entries:
+                break
+            if key not in self._dirty and key not in self._flushing:
+                del self._cache[key]
+
+    def _touch(self, key: str, record: _Record):
+        record.updated_at = time.time()
+        self._dirty.add(key)
+        self._ensure_background()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        skey = self.key_builder.build(key)
+        record = await self._load(skey)
+        record.state = state.state if isinstance(state, State) else state
+        self._touch(skey, record)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._load(self.key_builder.build(key))).state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        skey = self.key_builder.build(key)
+        record = await self._load(skey)
+        record.data = data.copy()
+        self._touch(skey, record)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return (await self._load(self.key_builder.build(key))).data.copy()
+
+    async def flush(self):
+        """Записывает в базу все изменённые с прошлого раза состояния."""
+        if not self._dirty:
+            return
+        keys = list(self._dirty)
+        self._dirty.clear()
+        upserts: List[Tuple[str, Optional[str], str, float]] = []
+        deletes: List[Tuple[str]] = []
+        for key in keys:
+            record = self._cache.get(key)
+            if record is None:
+                continue
+            if record.state is None and not record.data:
+                deletes.append((key,))
+            else:
+                upserts.append((key, record.state, json.dumps(record.data, ensure_ascii=False), record.updated_at))
+
+        def query(conn):
+            conn.executemany(
+                "INSERT INTO fsm_storage (key, state, data, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET state = excluded.state, data = excluded.data, "
+                "updated_at = excluded.updated_at",
+                upserts
+            )
+            conn.executemany("DELETE FROM fsm_storage WHERE key = ?", deletes)
+
+        self._flushing.update(keys)
+        try:
+            await self.db.write(query)
+        except Exception:
+            # Попробуем ещё раз при следующем сбросе
+            self._dirty.update(keys)
+            raise
+        finally:
+            self._flushing.difference_update(keys)
+
+    async def compact(self):
+        """Удаляет брошенные состояния старше ttl из памяти и из базы."""
+        expire_before = time.time() - self.ttl
+        for key in [k for k, r in self._cache.items() if r.updated_at < expire_before and k not in self._dirty]:
+            del self._cache[key]
+        removed = await self.db.write(lambda conn: conn.execute(
+            "DELETE FROM fsm_storage WHERE updated_at < ?", (expire_before,)
+        ).rowcount)
+        if removed:
+            logger.info(f"Удалено {removed} устаревших состояний FSM")
+
+    def state_counts(self) -> Dict[str, int]:
+        """Сколько записей в кэше находится в каждом состоянии (записи без состояния не считаются)."""
+        counts: Dict[str, int] = {}
+        for record in self._cache.values():
+            if record.state is not None:
+                counts[record.state] = counts.get(record.state, 0) + 1
+        return counts
+
+    def stats(self) -> Dict[str, int]:
+        """Размер кэша и число ещё не записанных в базу состояний."""
+        return {"cached": len(self._cache), "dirty": len(self._dirty)}
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
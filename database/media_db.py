@@ -0,0 +1,33 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from database.db import ReviewDB
+
+
+class MediaDB:
+    """Постоянное хранилище file_id статических файлов (таблица media_cache)."""
+
+    def __init__(self, db: ReviewDB):
+        self.db = db
+
+
+    async def get_file_id(self, sha256: str) -> Optional[str]:
+        row = await self.db.read(lambda conn: conn.execute(
+            "SELECT file_id FROM media_cache WHERE sha256 = ?", (sha256,)
+        ).fetchone())
+        return row[0] if row else None
+
+
+    async def set_file_id(self, sha256: str, file_id: str) -> None:
+        updated_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        await self.db.write(lambda conn: conn.execute(
+            "INSERT INTO media_cache (sha256, file_id, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(sha256) DO UPDATE SET file_id = excluded.file_id, updated_at = excluded.updated_at",
+            (sha256, file_id, updated_at)
+        ))
+
+
+    async def delete_file_id(self, sha256: str) -> None:
+        await self.db.write(lambda conn: conn.execute(
+            "DELETE FROM media_cache WHERE sha256 = ?", (sha256,)
+        ))
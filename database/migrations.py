@@ -0,0 +1,493 @@
+import logging
+import sqlite3
+from typing import Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+LEGACY_SOURCE_MARKER = "\n\nОткуда узнал(а): "
+LEGACY_SUBJECT_MARKER = "\nТемы выставок, которые хотел(а) бы видеть: "
+LEGACY_REVIEW_PREFIX = "Отзыв: "
+
+
+def parse_legacy_review(text: str) -> Dict[str, str]:
+    """
+    Разбирает отзыв, сохранённый старой версией бота одним текстом:
+
+    Отзыв: <текст отзыва>
+
+    Откуда узнал(а): <источник>
+    Темы выставок, которые хотел(а) бы видеть: <темы>
+
+    Маркеры ищутся с конца текста, поэтому их упоминание внутри самого
+    отзыва не ломает разбор. Возвращает dict с ключами 'free_review', 'source', 'subject'.
+    """
+    rest, marker, subject = text.rpartition(LEGACY_SUBJECT_MARKER)
+    if not marker:
+        rest, subject = text, ""
+
+    free_review, marker, source = rest.rpartition(LEGACY_SOURCE_MARKER)
+    if not marker:
+        free_review, source = rest, ""
+
+    if free_review.startswith(LEGACY_REVIEW_PREFIX):
+        free_review = free_review[len(LEGACY_REVIEW_PREFIX):]
+
+    return {
+        "free_review": free_review.strip(),
+        "source": source.strip(),
+        "subject": subject.strip(),
+    }
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _v1_reviews_table(conn: sqlite3.Connection):
+    """Исходная таблица отзывов и индекс для постраничных выборок."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS reviews (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            username TEXT,
+            review TEXT NOT NULL,
+            answered INTEGER DEFAULT 0,
+            admin_answer TEXT DEFAULT NULL
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_reviews_answered_id ON reviews (answered, id)")
+
+
+def _v2_structured_columns(conn: sqlite3.Connection):
+    """
+    Отдельные колонки source, free_review, subject и created_at.
+    Существующие отзывы один раз разбираются из текста и заполняются.
+    """
+    existing = _columns(conn, "reviews")
+    for column in ("source", "free_review", "subject", "created_at"):
+        if column not in existing:
+            conn.execute(f"ALTER TABLE reviews ADD COLUMN {column} TEXT")
+
+    rows = conn.execute("SELECT id, review FROM reviews WHERE free_review IS NULL").fetchall()
+    conn.executemany(
+        "UPDATE reviews SET source = ?, free_review = ?, subject = ? WHERE id = ?",
+        (
+            (parts["source"], parts["free_review"], parts["subject"], review_id)
+            for review_id, parts in ((review_id, parse_legacy_review(text or "")) for review_id, text in rows)
+        )
+    )
+    logger.info(f"Миграция 2: разобрано {len(rows)} старых отзывов")
+
+
+def _v3_broadcasts(conn: sqlite3.Connection):
+    """Рассылки /ad_post и очередь доставки по каждому получателю."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS broadcasts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            from_chat_id INTEGER NOT NULL,
+            message_id INTEGER NOT NULL,
+            created_by INTEGER NOT NULL,
+            created_at TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'running',
+            total INTEGER NOT NULL DEFAULT 0,
+            progress_chat_id INTEGER,
+            progress_message_id INTEGER
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS broadcast_recipients (
+            broadcast_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            error TEXT,
+            PRIMARY KEY (broadcast_id, user_id)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_broadcast_recipients_status "
+        "ON broadcast_recipients (broadcast_id, status, user_id)"
+    )
+
+
+def _v4_notification_outbox(conn: sqlite3.Connection):
+    """Outbox уведомлений админам о новых отзывах."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS notification_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            review_id INTEGER NOT NULL,
+            admin_id INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL DEFAULT 0,
+            last_error TEXT
+        )
+    ''')
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_notification_outbox_due "
+        "ON notification_outbox (status, next_attempt_at)"
+    )
+
+
+def _v5_media_cache(conn: sqlite3.Connection):
+    """file_id загруженных в Telegram статических файлов по хэшу содержимого."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS media_cache (
+            sha256 TEXT PRIMARY KEY,
+            file_id TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+    ''')
+
+
+def _v6_fsm_storage(conn: sqlite3.Connection):
+    """Состояния FSM (незавершённые опросы, ответы админов), переживающие перезапуск."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS fsm_storage (
+            key TEXT PRIMARY KEY,
+            state TEXT,
+            data TEXT NOT NULL DEFAULT '{}',
+            updated_at REAL NOT NULL
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_fsm_storage_updated_at ON fsm_storage (updated_at)")
+
+
+def _v7_statistics(conn: sqlite3.Connection):
+    """
+    Предрасчитанная статистика для /statistic. Таблицы stats_* обновляются
+    триггерами при добавлении отзыва и при ответе на него, поэтому
+    /statistic не сканирует reviews.
+
+    Время ответа на отзывы, на которые ответили до этой миграции, не
+    сохранялось (answered_at появляется только здесь): в stats_daily.answered
+    они учитываются днём создания отзыва, а отзывы без created_at не
+    попадают в дневную статистику и в stats_response_times.
+    """
+    if "answered_at" not in _columns(conn, "reviews"):
+        conn.execute("ALTER TABLE reviews ADD COLUMN answered_at TEXT")
+
+    # executescript() неявно делает COMMIT, поэтому выражения выполняются по одному
+    for statement in (
+        '''
+        CREATE TABLE IF NOT EXISTS stats_totals (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS stats_users (
+            user_id INTEGER PRIMARY KEY
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS stats_sources (
+            source TEXT PRIMARY KEY,
+            reviews INTEGER NOT NULL DEFAULT 0
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS stats_daily (
+            day TEXT PRIMARY KEY,
+            reviews INTEGER NOT NULL DEFAULT 0,
+            answered INTEGER NOT NULL DEFAULT 0
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS stats_response_times (
+            review_id INTEGER PRIMARY KEY,
+            seconds INTEGER NOT NULL
+        )
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_stats_response_times_seconds ON stats_response_times (seconds)
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_reviews_stats_insert AFTER INSERT ON reviews
+        BEGIN
+            UPDATE stats_totals SET value = value + 1 WHERE name = 'reviews';
+            UPDATE stats_totals SET value = value + 1
+                WHERE name = 'users' AND NOT EXISTS (SELECT 1 FROM stats_users WHERE user_id = NEW.user_id);
+            INSERT OR IGNORE INTO stats_users (user_id) VALUES (NEW.user_id);
+            INSERT INTO stats_sources (source, reviews) VALUES (COALESCE(NEW.source, ''), 1)
+                ON CONFLICT(source) DO UPDATE SET reviews = reviews + 1;
+            INSERT INTO stats_daily (day, reviews) VALUES (substr(COALESCE(NEW.created_at, datetime('now')), 1, 10), 1)
+                ON CONFLICT(day) DO UPDATE SET reviews = reviews + 1;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_reviews_stats_answer AFTER UPDATE OF answered ON reviews
+        WHEN OLD.answered = 0 AND NEW.answered = 1
+        BEGIN
+            UPDATE stats_totals SET value = value + 1 WHERE name = 'answered';
+            INSERT INTO stats_daily (day, answered) VALUES (substr(COALESCE(NEW.answered_at, datetime('now')), 1, 10), 1)
+                ON CONFLICT(day) DO UPDATE SET answered = answered + 1;
+            INSERT OR REPLACE INTO stats_response_times (review_id, seconds)
+                SELECT NEW.id, CAST(strftime('%s', NEW.answered_at) AS INTEGER) - CAST(strftime('%s', NEW.created_at) AS INTEGER)
+                WHERE NEW.created_at IS NOT NULL AND NEW.answered_at IS NOT NULL;
+        END
+        ''',
+    ):
+        conn.execute(statement)
+
+    # Начальные значения по уже накопленным отзывам
+    conn.executemany(
+        "INSERT OR REPLACE INTO stats_totals (name, value) VALUES (?, ?)",
+        [
+            ("reviews", conn.execute("SELECT COUNT(*) FROM reviews").fetchone()[0]),
+            ("answered", conn.execute("SELECT COUNT(*) FROM reviews WHERE answered = 1").fetchone()[0]),
+            ("users", conn.execute("SELECT COUNT(DISTINCT user_id) FROM reviews").fetchone()[0]),
+        ]
+    )
+    conn.execute("INSERT OR IGNORE INTO stats_users (user_id) SELECT DISTINCT user_id FROM reviews")
+    conn.execute(
+        "INSERT OR REPLACE INTO stats_sources (source, reviews) "
+        "SELECT COALESCE(source, ''), COUNT(*) FROM reviews GROUP BY COALESCE(source, '')"
+    )
+    conn.execute(
+        "INSERT OR REPLACE INTO stats_daily (day, reviews) "
+        "SELECT substr(created_at, 1, 10), COUNT(*) FROM reviews WHERE created_at IS NOT NULL "
+        "GROUP BY substr(created_at, 1, 10)"
+    )
+    conn.execute(
+        "INSERT INTO stats_daily (day, answered) "
+        "SELECT substr(COALESCE(answered_at, created_at), 1, 10), COUNT(*) FROM reviews "
+        "WHERE answered = 1 AND COALESCE(answered_at, created_at) IS NOT NULL "
+        "GROUP BY substr(COALESCE(answered_at, created_at), 1, 10) "
+        "ON CONFLICT(day) DO UPDATE SET answered = excluded.answered"
+    )
+
+
+def _v8_search_index(conn: sqlite3.Connection):
+    """
+    Полнотекстовый индекс FTS5 для /search. rowid записи индекса равен id отзыва,
+    индекс ведёт ReviewDB.add_review/mark_review_answered.
+    """
+    conn.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS reviews_fts USING fts5("
+        "source, free_review, subject, admin_answer, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    rebuild_search_index(conn)
+
+
+def rebuild_search_index(conn: sqlite3.Connection):
+    """Заново заполняет reviews_fts по таблице reviews и архиву, если он уже есть."""
+    conn.execute("DELETE FROM reviews_fts")
+    conn.execute(
+        "INSERT INTO reviews_fts (rowid, source, free_review, subject, admin_answer) "
+        "SELECT id, source, free_review, subject, admin_answer FROM reviews"
+    )
+    if _columns(conn, "reviews_archive"):
+        conn.execute(
+            "INSERT INTO reviews_fts (rowid, source, free_review, subject, admin_answer) "
+            "SELECT id, source, free_review, subject, admin_answer FROM reviews_archive"
+        )
+
+
+def _v9_admins(conn: sqlite3.Connection):
+    """
+    Список администраторов. Админы из переменных окружения добавляются
+    в таблицу при старте бота, остальные — командой /add_admin.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS admins (
+            user_id INTEGER PRIMARY KEY,
+            added_by INTEGER,
+            added_at TEXT NOT NULL
+        )
+    ''')
+
+
+def _v10_review_survey(conn: sqlite3.Connection):
+    """
+    Опрос, через который оставлен отзыв (id из config/surveys.json).
+    У отзывов, оставленных до появления нескольких опросов, — NULL.
+    """
+    if "survey" not in _columns(conn, "reviews"):
+        conn.execute("ALTER TABLE reviews ADD COLUMN survey TEXT")
+
+
+def _v11_review_claims(conn: sqlite3.Connection):
+    """
+    Назначение и захват отзывов администраторами:
+    assigned_to — кому отзыв назначен при создании (самому свободному админу),
+    claimed_by/claim_expires_at — кто сейчас пишет ответ и до какого времени
+    (unix time) действует захват, answered_by — кто ответил.
+    """
+    columns = _columns(conn, "reviews")
+    for column, definition in (
+        ("assigned_to", "INTEGER"),
+        ("claimed_by", "INTEGER"),
+        ("claim_expires_at", "REAL"),
+        ("answered_by", "INTEGER"),
+    ):
+        if column not in columns:
+            conn.execute(f"ALTER TABLE reviews ADD COLUMN {column} {definition}")
+    # Нагрузка админа — число назначенных ему необработанных отзывов
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_reviews_assigned ON reviews (assigned_to, answered)")
+
+
+# Колонки отзыва, которые переносятся в архив (claimed_by/claim_expires_at
+# у обработанного отзыва пусты и не нужны)
+ARCHIVE_COLUMNS = (
+    "id", "user_id", "username", "review", "source", "free_review", "subject", "created_at",
+    "answered", "admin_answer", "answered_at", "survey", "assigned_to", "answered_by",
+)
+
+
+def _v12_reviews_archive(conn: sqlite3.Connection):
+    """
+    Архив старых обработанных отзывов (их переносит services/retention.py),
+    чтобы рабочие выборки /reviews и /all_reviews шли по небольшой таблице
+    reviews. Представление reviews_all объединяет обе таблицы для поиска,
+    выгрузки и рассылок; полнотекстовый индекс reviews_fts общий.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS reviews_archive (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            username TEXT,
+            review TEXT,
+            source TEXT,
+            free_review TEXT,
+            subject TEXT,
+            created_at TEXT,
+            answered INTEGER,
+            admin_answer TEXT,
+            answered_at TEXT,
+            survey TEXT,
+            assigned_to INTEGER,
+            answered_by INTEGER,
+            archived_at TEXT NOT NULL
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_reviews_archive_created_at ON reviews_archive (created_at)")
+    columns = ", ".join(ARCHIVE_COLUMNS)
+    conn.execute(
+        f"CREATE VIEW IF NOT EXISTS reviews_all AS "
+        f"SELECT {columns} FROM reviews UNION ALL SELECT {columns} FROM reviews_archive"
+    )
+
+
+def _v13_topics(conn: sqlite3.Connection):
+    """
+    Частотные таблицы тем, которые посетители хотят видеть на выставках
+    (ответ subject), — их пополняет services/topics.py только новыми
+    отзывами. Счётчики — число ответов, где встретилась основа слова
+    (topic_terms) или пара основ (topic_bigrams); topic_forms хранит
+    словоформы для показа, topic_term_sources — разбивку по источникам.
+    topic_state.last_review_id — последний учтённый отзыв.
+    """
+    for statement in (
+        "CREATE TABLE IF NOT EXISTS topic_terms (term TEXT PRIMARY KEY, reviews INTEGER NOT NULL DEFAULT 0) WITHOUT ROWID",
+        "CREATE TABLE IF NOT EXISTS topic_bigrams (bigram TEXT PRIMARY KEY, reviews INTEGER NOT NULL DEFAULT 0) WITHOUT ROWID",
+        "CREATE INDEX IF NOT EXISTS idx_topic_terms_reviews ON topic_terms (reviews)",
+        "CREATE INDEX IF NOT EXISTS idx_topic_bigrams_reviews ON topic_bigrams (reviews)",
+        '''
+        CREATE TABLE IF NOT EXISTS topic_forms (
+            term TEXT NOT NULL,
+            form TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (term, form)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS topic_term_sources (
+            term TEXT NOT NULL,
+            source TEXT NOT NULL,
+            reviews INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (term, source)
+        ) WITHOUT ROWID
+        ''',
+        "CREATE TABLE IF NOT EXISTS topic_state (name TEXT PRIMARY KEY, value INTEGER NOT NULL DEFAULT 0)",
+    ):
+        conn.execute(statement)
+    conn.executemany(
+        "INSERT OR IGNORE INTO topic_state (name, value) VALUES (?, 0)",
+        [("last_review_id",), ("reviews",)]
+    )
+
+
+def _v14_response_time_count(conn: sqlite3.Connection):
+    """
+    Число записей stats_response_times хранится в stats_totals ('response_times')
+    и ведётся триггерами, чтобы медиана времени ответа в /statistic не
+    требовала COUNT(*) по всей таблице. Триггер ответа пересоздаётся с
+    INSERT OR IGNORE: REPLACE удалял бы строку без срабатывания триггера удаления.
+    """
+    conn.execute("DROP TRIGGER IF EXISTS trg_reviews_stats_answer")
+    for statement in (
+        '''
+        CREATE TRIGGER trg_reviews_stats_answer AFTER UPDATE OF answered ON reviews
+        WHEN OLD.answered = 0 AND NEW.answered = 1
+        BEGIN
+            UPDATE stats_totals SET value = value + 1 WHERE name = 'answered';
+            INSERT INTO stats_daily (day, answered) VALUES (substr(COALESCE(NEW.answered_at, datetime('now')), 1, 10), 1)
+                ON CONFLICT(day) DO UPDATE SET answered = answered + 1;
+            INSERT OR IGNORE INTO stats_response_times (review_id, seconds)
+                SELECT NEW.id, CAST(strftime('%s', NEW.answered_at) AS INTEGER) - CAST(strftime('%s', NEW.created_at) AS INTEGER)
+                WHERE NEW.created_at IS NOT NULL AND NEW.answered_at IS NOT NULL;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_stats_response_times_insert AFTER INSERT ON stats_response_times
+        BEGIN
+            UPDATE stats_totals SET value = value + 1 WHERE name = 'response_times';
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_stats_response_times_delete AFTER DELETE ON stats_response_times
+        BEGIN
+            UPDATE stats_totals SET value = value - 1 WHERE name = 'response_times';
+        END
+        ''',
+    ):
+        conn.execute(statement)
+    conn.execute(
+        "INSERT OR REPLACE INTO stats_totals (name, value) "
+        "SELECT 'response_times', COUNT(*) FROM stats_response_times"
+    )
+
+
+# Версия схемы хранится в PRAGMA user_version. Новые миграции
+# добавляются только в конец списка, уже выпущенные не меняются.
+MIGRATIONS: List[Tuple[int, Callable[[sqlite3.Connection], None]]] = [
+    (1, _v1_reviews_table),
+    (2, _v2_structured_columns),
+    (3, _v3_broadcasts),
+    (4, _v4_notification_outbox),
+    (5, _v5_media_cache),
+    (6, _v6_fsm_storage),
+    (7, _v7_statistics),
+    (8, _v8_search_index),
+    (9, _v9_admins),
+    (10, _v10_review_survey),
+    (11, _v11_review_claims),
+    (12, _v12_reviews_archive),
+    (13, _v13_topics),
+    (14, _v14_response_time_count),
+]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """
+    Применяет к базе все ещё не применённые миграции, каждую в своей транзакции.
+    Возвращает итоговую версию схемы.
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for target, migration in MIGRATIONS:
+        if target <= version:
+            continue
+        conn.execute("BEGIN")
+        try:
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {target}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logger.exception(f"Не удалось применить миграцию {target}")
+            raise
+        logger.info(f"Схема базы обновлена до версии {target}")
+        version = target
+    return version
@@ -0,0 +1,55 @@
+import time
+from typing import List, Optional, Tuple
+
+from database.db import ReviewDB
+
+
+class OutboxDB:
+    """
+    Очередь уведомлений админам (таблица notification_outbox).
+    Записи создаются в ReviewDB.add_review и удаляются после успешной отправки.
+    """
+
+    def __init__(self, db: ReviewDB):
+        self.db = db
+
+
+    async def get_due(self, limit: int = 50) -> List[Tuple[int, int, int, int]]:
+        """Уведомления, которые пора отправить: (id, review_id, admin_id, attempts)."""
+        now = time.time()
+        return await self.db.read(lambda conn: conn.execute(
+            "SELECT id, review_id, admin_id, attempts FROM notification_outbox "
+            "WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY next_attempt_at, id LIMIT ?",
+            (now, limit)
+        ).fetchall())
+
+
+    async def next_due_at(self) -> Optional[float]:
+        """Время ближайшей запланированной попытки или None, если очередь пуста."""
+        row = await self.db.read(lambda conn: conn.execute(
+            "SELECT MIN(next_attempt_at) FROM notification_outbox WHERE status = 'pending'"
+        ).fetchone())
+        return row[0] if row else None
+
+
+    async def mark_sent(self, outbox_id: int) -> None:
+        await self.db.write(lambda conn: conn.execute(
+            "DELETE FROM notification_outbox WHERE id = ?", (outbox_id,)
+        ))
+
+
+    async def reschedule(self, outbox_id: int, attempts: int, delay: float, error: str) -> None:
+        """Откладывает повторную попытку на delay секунд."""
+        next_attempt_at = time.time() + delay
+        await self.db.write(lambda conn: conn.execute(
+            "UPDATE notification_outbox SET attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+            (attempts, next_attempt_at, error, outbox_id)
+        ))
+
+
+    async def mark_failed(self, outbox_id: int, attempts: int, error: str) -> None:
+        """Ошибка, которую повтор не исправит: запись остаётся в таблице со статусом failed."""
+        await self.db.write(lambda conn: conn.execute(
+            "UPDATE notification_outbox SET status = 'failed', attempts = ?, last_error = ? WHERE id = ?",
+            (attempts, error, outbox_id)
+        ))
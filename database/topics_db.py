@@ -0,0 +1,131 @@
+import sqlite3
+from typing import Dict, List, Tuple
+
+from database.db import ReviewDB
+
+# Сколько источников показывать у одной темы
+TOP_SOURCES = 3
+
+
+class TopicsDB:
+    """
+    Частотные таблицы тем (topic_*, миграция 13). Пополняются
+    services/topics.py порциями новых отзывов, читаются командой /topics.
+    """
+
+    def __init__(self, db: ReviewDB):
+        self.db = db
+
+
+    async def get_last_review_id(self) -> int:
+        row = await self.db.read(lambda conn: conn.execute(
+            "SELECT value FROM topic_state WHERE name = 'last_review_id'"
+        ).fetchone())
+        return row[0] if row else 0
+
+
+    async def get_new_answers(self, after_id: int, limit: int = 1000) -> List[Tuple[int, str, str]]:
+        """
+        Отзывы с id больше after_id: (id, источник, темы). Читается и архив:
+        отзыв мог уйти туда раньше, чем его учли (например, после обновления бота).
+        """
+        return await self.db.read(lambda conn: conn.execute(
+            "SELECT id, COALESCE(source, ''), COALESCE(subject, '') FROM reviews_all "
+            "WHERE id > ? ORDER BY id LIMIT ?",
+            (after_id, limit)
+        ).fetchall())
+
+
+    async def apply(
+            self,
+            after_id: int,
+            last_id: int,
+            answers: int,
+            terms: Dict[str, int],
+            bigrams: Dict[str, int],
+            forms: Dict[Tuple[str, str], int],
+            term_sources: Dict[Tuple[str, str], int]
+        ) -> bool:
+        """
+        Добавляет к таблицам счётчики порции отзывов (after_id, last_id] и
+        сдвигает last_review_id — одной транзакцией, поэтому отзыв
+        учитывается ровно один раз. Если last_review_id уже не after_id
+        (порцию параллельно учёл другой процесс), ничего не меняет и
+        возвращает False.
+        """
+        def query(conn: sqlite3.Connection) -> bool:
+            moved = conn.execute(
+                "UPDATE topic_state SET value = ? WHERE name = 'last_review_id' AND value = ?",
+                (last_id, after_id)
+            ).rowcount
+            if not moved:
+                return False
+            conn.execute("UPDATE topic_state SET value = value + ? WHERE name = 'reviews'", (answers,))
+            conn.executemany(
+                "INSERT INTO topic_terms (term, reviews) VALUES (?, ?) "
+                "ON CONFLICT(term) DO UPDATE SET reviews = reviews + excluded.reviews",
+                terms.items()
+            )
+            conn.executemany(
+                "INSERT INTO topic_bigrams (bigram, reviews) VALUES (?, ?) "
+                "ON CONFLICT(bigram) DO UPDATE SET reviews = reviews + excluded.reviews",
+                bigrams.items()
+            )
+            conn.executemany(
+                "INSERT INTO topic_forms (term, form, count) VALUES (?, ?, ?) "
+                "ON CONFLICT(term, form) DO UPDATE SET count = count + excluded.count",
+                ((term, form, count) for (term, form), count in forms.items())
+            )
+            conn.executemany(
+                "INSERT INTO topic_term_sources (term, source, reviews) VALUES (?, ?, ?) "
+                "ON CONFLICT(term, source) DO UPDATE SET reviews = reviews + excluded.reviews",
+                ((term, source, count) for (term, source), count in term_sources.items())
+            )
+            return True
+
+        return await self.db.write(query)
+
+
+    async def reset(self) -> None:
+        """Очищает таблицы тем — следующий проход пересчитает их по всем отзывам."""
+        def query(conn: sqlite3.Connection):
+            for table in ("topic_terms", "topic_bigrams", "topic_forms", "topic_term_sources"):
+                conn.execute(f"DELETE FROM {table}")
+            conn.execute("UPDATE topic_state SET value = 0")
+
+        await self.db.write(query)
+
+
+    async def get_topics(self, limit: int = 15) -> dict:
+        """
+        Самые частые темы. Возвращает dict с ключами: answers (сколько ответов
+        учтено), last_review_id, terms и bigrams — списки
+        (словоформа, ответов, [(источник, ответов)]), по убыванию частоты.
+        """
+        def top(conn: sqlite3.Connection, table: str, column: str) -> List[tuple]:
+            rows = conn.execute(
+                f"SELECT {column}, reviews FROM {table} ORDER BY reviews DESC, {column} LIMIT ?", (limit,)
+            ).fetchall()
+            result = []
+            for term, reviews in rows:
+                form = conn.execute(
+                    "SELECT form FROM topic_forms WHERE term = ? ORDER BY count DESC, form LIMIT 1", (term,)
+                ).fetchone()
+                sources = conn.execute(
+                    "SELECT source, reviews FROM topic_term_sources WHERE term = ? "
+                    "ORDER BY reviews DESC, source LIMIT ?",
+                    (term, TOP_SOURCES)
+                ).fetchall()
+                result.append((form[0] if form else term, reviews, sources))
+            return result
+
+        def query(conn: sqlite3.Connection) -> dict:
+            state = dict(conn.execute("SELECT name, value FROM topic_state").fetchall())
+            return {
+                "answers": state.get("reviews", 0),
+                "last_review_id": state.get("last_review_id", 0),
+                "terms": top(conn, "topic_terms", "term"),
+                "bigrams": top(conn, "topic_bigrams", "bigram"),
+            }
+
+        return await self.db.read(query)
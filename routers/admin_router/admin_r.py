@@ -0,0 +1,69 @@
+import logging
+from aiogram import Router, types
+from aiogram.filters import Command, CommandObject
+
+from config.create_bot import admin_registry
+from routers.start_router.start_r import start_router
+from routers.broadcast_router.broadcast_r import broadcast_router
+from services.admins import AdminMiddleware
+
+# Все админские роутеры вложены в admin_router: права проверяет один
+# middleware до запуска любого хендлера, сами хендлеры их не проверяют.
+admin_router = Router(name="admin_router")
+admin_router.message.middleware(AdminMiddleware(admin_registry))
+admin_router.callback_query.middleware(AdminMiddleware(admin_registry))
+admin_router.include_routers(start_router, broadcast_router)
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_user_id(command: CommandObject) -> int | None:
+    args = (command.args or "").strip()
+    return int(args) if args.lstrip("-").isdigit() else None
+
+
+@admin_router.message(Command('admins'))
+async def cmd_admins(message: types.Message):
+    """
+    Обрабатывает команду /admins — выводит список администраторов.
+    """
+    ids = sorted(await admin_registry.ids())
+    lines = [f"{user_id}{' (владелец)' if user_id in admin_registry.owners else ''}" for user_id in ids]
+    await message.answer("👮 <b>Администраторы:</b>\n" + "\n".join(lines), parse_mode="HTML")
+
+
+@admin_router.message(Command('add_admin'))
+async def cmd_add_admin(message: types.Message, command: CommandObject):
+    """
+    Обрабатывает команду /add_admin <id> — добавляет администратора без перезапуска бота.
+    """
+    user_id = _parse_user_id(command)
+    if user_id is None:
+        await message.answer("Укажите Telegram ID пользователя. Пример: /add_admin 123456789")
+        return
+
+    if await admin_registry.add(user_id, added_by=message.from_user.id):
+        await message.answer(f"Пользователь {user_id} назначен администратором.")
+        logger.info(f"Администратор {message.from_user.id} добавил администратора {user_id}")
+    else:
+        await message.answer(f"Пользователь {user_id} уже администратор.")
+
+
+@admin_router.message(Command('remove_admin'))
+async def cmd_remove_admin(message: types.Message, command: CommandObject):
+    """
+    Обрабатывает команду /remove_admin <id> — снимает права администратора.
+    """
+    user_id = _parse_user_id(command)
+    if user_id is None:
+        await message.answer("Укажите Telegram ID администратора. Пример: /remove_admin 123456789")
+        return
+    if user_id in admin_registry.owners:
+        await message.answer("Администратора из настроек бота удалить нельзя.")
+        return
+
+    if await admin_registry.remove(user_id):
+        await message.answer(f"Пользователь {user_id} больше не администратор.")
+        logger.info(f"Администратор {message.from_user.id} удалил администратора {user_id}")
+    else:
+        await message.answer(f"Пользователь {user_id} не был администратором.")
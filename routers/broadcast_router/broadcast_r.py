@@ -0,0 +1,68 @@
+import logging
+from aiogram import Router, types
+from aiogram.filters import Command
+from aiogram.fsm.context import FSMContext
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
+
+from config.create_bot import bot, review_db, BROADCAST_WORKERS
+from database.broadcast_db import BroadcastDB
+from routers.states import AdPost
+from services.broadcast import Broadcaster
+
+broadcast_router = Router(name="broadcast_router")
+broadcaster = Broadcaster(bot, BroadcastDB(review_db), workers=BROADCAST_WORKERS)
+
+logger = logging.getLogger(__name__)
+
+
+def get_ad_post_confirm_kb() -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [
+            InlineKeyboardButton(text="Отправить всем", callback_data="adpost_send"),
+            InlineKeyboardButton(text="Отмена", callback_data="adpost_cancel"),
+        ]
+    ])
+
+
+@broadcast_router.message(Command('ad_post'))
+async def cmd_ad_post(message: types.Message, state: FSMContext):
+    """
+    Обрабатывает команду /ad_post — просит администратора прислать сообщение для рассылки.
+    """
+    user_id = message.from_user.id
+    logger.info(f"Пользователь {user_id} вызвал /ad_post")
+    await message.answer(
+        "Пришлите сообщение для рассылки всем пользователям бота "
+        "(текст, фото, видео — оно будет скопировано как есть)."
+    )
+    await state.set_state(AdPost.waiting_for_post)
+
+
+@broadcast_router.message(AdPost.waiting_for_post)
+async def process_ad_post(message: types.Message, state: FSMContext):
+    """
+    Запоминает сообщение для рассылки и просит подтверждение.
+    """
+    await state.update_data(from_chat_id=message.chat.id, message_id=message.message_id)
+    await message.answer("Разослать это сообщение всем пользователям бота?", reply_markup=get_ad_post_confirm_kb())
+    await state.set_state(AdPost.waiting_for_confirm)
+
+
+@broadcast_router.callback_query(AdPost.waiting_for_confirm, lambda c: c.data in ("adpost_send", "adpost_cancel"))
+async def callback_ad_post_confirm(callback: CallbackQuery, state: FSMContext):
+    """
+    Запускает рассылку или отменяет её.
+    """
+    user_id = callback.from_user.id
+    data = await state.get_data()
+    await state.clear()
+    await callback.message.edit_reply_markup(reply_markup=None)
+
+    if callback.data == "adpost_cancel":
+        await callback.message.answer("Рассылка отменена.")
+        await callback.answer()
+        return
+
+    broadcast_id, total = await broadcaster.start(data["from_chat_id"], data["message_id"], user_id)
+    await callback.answer(f"Рассылка #{broadcast_id} запущена")
+    logger.info(f"Администратор {user_id} запустил рассылку #{broadcast_id} на {total} получателей")
@@ -8,12 +8,59 @@ def get_start_review_kb() -> InlineKeyboardMarkup:
     return kb
 
 
-def get_source_kb() -> InlineKeyboardMarkup:
-    kb = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="Увидел(а)/услышал(а) информацию в Граде", callback_data="source_1")],
-        [InlineKeyboardButton(text="В соцсетях Града (Telegram, ВК и др.)", callback_data="source_2")],
-        [InlineKeyboardButton(text="В сторонних каналах и СМИ", callback_data="source_3")],
-        [InlineKeyboardButton(text="Через афишный сервис", callback_data="source_4")],
-        [InlineKeyboardButton(text="Свой вариант", callback_data="source_5")]
-    ])
-    return kb
+# Сколько кнопок «Ответить» в одном ряду сетки
+ANSWER_GRID_WIDTH = 4
+
+
+def get_answer_button(review_id: int, user_id: int) -> InlineKeyboardButton:
+    return InlineKeyboardButton(text=f"✍️ #{review_id}", callback_data=f"answer_{review_id}_{user_id}")
+
+
+def get_answer_grid(answer_buttons: list) -> list:
+    """
+    Компактная сетка кнопок «✍️ #id» для необработанных отзывов страницы —
+    на странице-дайджесте их может быть несколько десятков.
+    """
+    return [answer_buttons[i:i + ANSWER_GRID_WIDTH] for i in range(0, len(answer_buttons), ANSWER_GRID_WIDTH)]
+
+
+def get_reviews_page_kb(
+        scope: str,
+        rows: list,
+        answer_buttons: list,
+        has_prev: bool,
+        has_next: bool
+    ) -> InlineKeyboardMarkup:
+    """
+    Клавиатура страницы отзывов: сетка готовых кнопок «Ответить» для необработанных
+    отзывов и навигация «назад/вперёд». Курсор — id первого/последнего отзыва на странице.
+    """
+    buttons = get_answer_grid(answer_buttons)
+
+    nav = []
+    if has_prev and rows:
+        nav.append(InlineKeyboardButton(text="◀️ Назад", callback_data=f"page_{scope}_prev_{rows[0][0]}"))
+    if has_next and rows:
+        nav.append(InlineKeyboardButton(text="Вперёд ▶️", callback_data=f"page_{scope}_next_{rows[-1][0]}"))
+    if nav:
+        buttons.append(nav)
+
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+def get_search_page_kb(answer_buttons: list, offset: int, page_size: int, has_next: bool) -> InlineKeyboardMarkup:
+    """
+    Клавиатура страницы результатов /search: «Ответить» для необработанных
+    отзывов и навигация по смещению (результаты отсортированы по релевантности).
+    """
+    buttons = get_answer_grid(answer_buttons)
+
+    nav = []
+    if offset > 0:
+        nav.append(InlineKeyboardButton(text="◀️ Назад", callback_data=f"search_{max(0, offset - page_size)}"))
+    if has_next:
+        nav.append(InlineKeyboardButton(text="Вперёд ▶️", callback_data=f"search_{offset + page_size}"))
+    if nav:
+        buttons.append(nav)
+
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
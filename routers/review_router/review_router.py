@@ -1,149 +1,173 @@
 import logging
+from typing import Dict, Optional
+
 from aiogram import Router, types
-from aiogram.filters import Command
+from aiogram.filters import CommandObject, CommandStart, StateFilter
 from aiogram.fsm.context import FSMContext
-from aiogram.types import CallbackQuery, FSInputFile
-
-from database.db import ReviewDB
-from config.create_bot import bot, ADMIN, ADMINISTRATOR, ADMINISTRATOR2
-from routers.states import ReviewStates
-from routers.review_router.review_keyboards import get_source_kb
+from aiogram.types import CallbackQuery
+
+from config.create_bot import (
+    bot, review_db, admin_registry, survey_catalog, REVIEW_ASSIGNMENT, THROTTLE_LIMIT, THROTTLE_WINDOW,
+)
+from config.logging_setup import redact
+from routers.start_router.start_r import admin_notifier
+from database.media_db import MediaDB
+from services.media_cache import MediaCache
+from services.surveys import SurveyStep
+from services.throttling import ThrottlingMiddleware
 
-import os
 import asyncio
 
-review_router = Router()
-review_db = ReviewDB()
+review_router = Router(name="review_router")
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-ADMINS = [int(ADMIN), int(ADMINISTRATOR), int(ADMINISTRATOR2)]
+# Антифлуд на всех хендлерах опроса; стоимость — флаг throttling_cost хендлера
+throttling = ThrottlingMiddleware(limit=THROTTLE_LIMIT, window=THROTTLE_WINDOW)
+review_router.message.middleware(throttling)
+review_router.callback_query.middleware(throttling)
+
+# Приветственные фото загружаются в Telegram один раз, дальше отправляются по file_id
+media_cache = MediaCache(MediaDB(review_db))
+
+# Пауза между приветственным фото и первым вопросом
+WELCOME_DELAY = 1.5
+# Запланированные первые вопросы: chat_id -> задача отправки
+_follow_ups: Dict[int, asyncio.Task] = {}
+
+
+async def ask(message: types.Message, state: FSMContext, step: SurveyStep):
+    """Задаёт вопрос step: текст и клавиатура собраны заранее при компиляции опроса."""
+    await message.answer(step.text, reply_markup=step.reply_markup)
+    await state.set_state(step.state)
+
+
+async def _send_later(chat_id: int, state: FSMContext, step: SurveyStep, delay: float):
+    await asyncio.sleep(delay)
+    try:
+        await bot.send_message(chat_id, step.text, reply_markup=step.reply_markup)
+    except Exception as e:
+        logger.error(f"Не удалось отправить первый вопрос пользователю {chat_id}: {e}")
+        return
+    # Состояние — только после отправки: вопрос, которого посетитель не видел, не ждёт ответа
+    await state.set_state(step.state)
 
 
-@review_router.message(Command("start"))
-async def start_survey(message: types.Message, state: FSMContext, bot: bot):
+def schedule_question(chat_id: int, state: FSMContext, step: SurveyStep, delay: float):
     """
-    Начинает опрос, отправляет приветственное фото и спрашивает источник информации.
+    Отправляет вопрос step через delay секунд, не задерживая хендлер, и после
+    отправки переводит посетителя в состояние вопроса. Повторный /start до
+    отправки отменяет предыдущий запланированный вопрос.
     """
-    logger.info(f"Пользователь {message.from_user.id} начал опрос")
-    await state.clear()
+    previous = _follow_ups.pop(chat_id, None)
+    if previous is not None:
+        previous.cancel()
+    task = asyncio.create_task(_send_later(chat_id, state, step, delay))
+    _follow_ups[chat_id] = task
 
-    caption_text = (
-        "Спасибо, что посетили выставку современного искусства «Зачем родился?» в Сити-парке «Град»! "
-        "Будем признательны, если вы поделитесь впечатлениями о событии и ответите на несколько вопросов. "
-        "Это займёт пару минут."
-    )
+    def forget(done: asyncio.Task):
+        if _follow_ups.get(chat_id) is done:
+            del _follow_ups[chat_id]
 
-    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
-    photo_path = os.path.join(base_dir, 'database', 'photo.jpg')
+    task.add_done_callback(forget)
 
-    if not os.path.exists(photo_path):
-        logger.error(f"Фото не найдено по пути {photo_path}")
-        await message.answer("Извините, изображение временно недоступно.")
-        return
 
-    photo = FSInputFile(path=photo_path)
+async def cancel_follow_ups():
+    """Отменяет запланированные вопросы при остановке бота, пока сессия бота ещё открыта."""
+    tasks = list(_follow_ups.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _follow_ups.clear()
+
+
+async def next_question(message: types.Message, state: FSMContext, step: SurveyStep, user_id: int, username: Optional[str]):
+    """Переходит к вопросу после step или завершает опрос."""
+    following = step.survey.next_step(step)
+    if following is None:
+        await finish_survey(message, state, user_id, username, step.survey.id)
+    else:
+        await ask(message, state, following)
+
+
+@review_router.message(CommandStart(), flags={"throttling_cost": 5, "throttling_merge": True})
+async def start_survey(message: types.Message, state: FSMContext, command: CommandObject, bot: bot):
+    """
+    Начинает опрос, отправляет приветственное фото и задаёт первый вопрос.
+    Опрос выбирается параметром ссылки (t.me/<бот>?start=<id опроса>).
+    Вопрос после фото отправляется отложенно, хендлер его не ждёт.
+    """
+    survey = survey_catalog.get(command.args)
+    logger.info(f"Пользователь {message.from_user.id} начал опрос {survey.id}")
+    await state.clear()
 
     try:
-        await bot.send_photo(chat_id=message.chat.id, photo=photo, caption=caption_text)
-        await asyncio.sleep(1.5)
-        await message.answer("Откуда вы узнали о выставке?", reply_markup=get_source_kb())
-        await state.set_state(ReviewStates.waiting_for_source_choice)
+        first = survey.steps[0]
+        if survey.welcome_photo:
+            await media_cache.send_photo(bot, message.chat.id, survey.welcome_photo, caption=survey.welcome_text)
+            schedule_question(message.chat.id, state, first, WELCOME_DELAY)
+        else:
+            await message.answer(survey.welcome_text)
+            await ask(message, state, first)
         logger.info(f"Отправлено приветственное сообщение пользователю {message.from_user.id}")
+    except FileNotFoundError:
+        logger.error(f"Фото не найдено по пути {survey.welcome_photo}")
+        await message.answer("Извините, изображение временно недоступно.")
     except Exception as e:
         logger.error(f"Ошибка отправки приветственного сообщения: {e}")
         await message.answer("Произошла ошибка при отправке сообщения.")
 
 
-@review_router.callback_query(lambda c: c.data and c.data.startswith("source_"))
-async def process_source_choice(callback: CallbackQuery, state: FSMContext):
+@review_router.callback_query(lambda c: survey_catalog.is_option(c.data), flags={"throttling_merge": True})
+async def process_option_choice(callback: CallbackQuery, state: FSMContext):
     user_id = callback.from_user.id
-    source_option = callback.data.split("_")[1]
-    logger.info(f"Пользователь {user_id} выбрал источник {source_option}")
+    option = survey_catalog.option(callback.data)
+    step = option.step
+    logger.info(f"Пользователь {user_id} выбрал вариант {callback.data} в опросе {step.survey.id}")
 
-    if source_option == "5":
-        await callback.message.answer("Пожалуйста, напишите, откуда вы узнали о выставке:")
-        await state.set_state(ReviewStates.waiting_for_custom_source)
+    if option.custom is not None:
+        await ask(callback.message, state, option.custom)
     else:
-        sources = {
-            "1": "Увидел(а)/услышал(а) информацию в Граде",
-            "2": "В соцсетях Града (Telegram, ВК и др.)",
-            "3": "В сторонних каналах и СМИ",
-            "4": "Через афишный сервис"
-        }
-        source_text = sources.get(source_option, "Неизвестно")
-        await state.update_data(source=source_text)
-        await callback.message.answer(
-            "В свободной форме расскажите, как вам выставка? Какие произведения понравились больше всего?"
-        )
-        await state.set_state(ReviewStates.waiting_for_free_review)
+        await state.update_data({step.field: option.value})
+        await next_question(callback.message, state, step, user_id, callback.from_user.username)
     await callback.answer()
 
 
-@review_router.message(ReviewStates.waiting_for_custom_source)
-async def process_custom_source(message: types.Message, state: FSMContext):
-    user_id = message.from_user.id
-    logger.info(f"Пользователь {user_id} ввёл собственный источник: {message.text}")
-    await state.update_data(source=message.text)
-    await message.answer(
-        "В свободной форме расскажите, как вам выставка? Какие произведения понравились больше всего?"
-    )
-    await state.set_state(ReviewStates.waiting_for_free_review)
-
-
-@review_router.message(ReviewStates.waiting_for_free_review)
-async def process_free_review(message: types.Message, state: FSMContext):
+@review_router.message(StateFilter(*survey_catalog.text_states))
+async def process_text_answer(message: types.Message, state: FSMContext, raw_state: Optional[str]):
     user_id = message.from_user.id
-    logger.info(f"Пользователь {user_id} оставил отзыв")
-    await state.update_data(free_review=message.text)
-
-    await message.answer(
-        "Выставки на какие темы вы бы хотели увидеть в будущем?"
-    )
-    await state.set_state(ReviewStates.waiting_for_source_subject)
-
-
-@review_router.message(ReviewStates.waiting_for_source_subject)
-async def process_custom_subject(message: types.Message, state: FSMContext):
-    user_id = message.from_user.id
-    logger.info(f"Пользователь {user_id} ввёл тему выставок: {message.text}")
-    await state.update_data(subject=message.text)
-
-    # Завершаем опрос
-    await finish_survey(message, state, user_id, message.from_user.username)
-
-
-async def finish_survey(message: types.Message, state: FSMContext, user_id: int, username: str | None):
-    logger.info(f"Завершение опроса пользователя {user_id}")
+    step = survey_catalog.step(raw_state)
+    logger.info(f"Пользователь {user_id} ответил на вопрос {step.field} опроса {step.survey.id}: {redact(message.text)}")
+    await state.update_data({step.field: message.text})
+    await next_question(message, state, step, user_id, message.from_user.username)
+
+
+async def finish_survey(
+        message: types.Message,
+        state: FSMContext,
+        user_id: int,
+        username: str | None,
+        survey_id: str
+    ):
+    logger.info(f"Завершение опроса {survey_id} пользователя {user_id}")
     data = await state.get_data()
     free_review = data.get("free_review", "")
     source = data.get("source", "")
     subject = data.get("subject", "")
 
-    full_review = (
-        f"Отзыв: {free_review}\n\n"
-        f"Откуда узнал(а): {source}\n"
-        f"Темы выставок, которые хотел(а) бы видеть: {subject}"
+    # Уведомления админам пишутся в outbox в той же транзакции, что и отзыв,
+    # и рассылаются в фоне — пользователю не нужно ждать отправки. Отзыв
+    # назначается одному из админов, уведомление получает только он.
+    admins = sorted(await admin_registry.ids())
+    review_id = await review_db.add_review(
+        user_id, username, source, free_review, subject, notify_admins=admins, survey=survey_id,
+        assignment=None if REVIEW_ASSIGNMENT == "off" else REVIEW_ASSIGNMENT
     )
-    review_id = review_db.add_review(user_id, username, full_review)
+    admin_notifier.wake()
 
-    await message.answer(
-        "Спасибо за обратную связь! Мы очень ценим мнение каждого посетителя ❤️\n"
-        "Ваш отзыв поможет нам стать лучше."
-    )
+    await message.answer(survey_catalog.surveys[survey_id].finish_text)
     logger.info(f"Сохранён отзыв #{review_id} пользователя {user_id}")
 
-    from ..start_router.start_r import send_admin_new_review_notification
-
-    for admin_id in ADMINS:
-        try:
-            await send_admin_new_review_notification(
-                review_id, user_id, username, free_review, source, subject, int(admin_id)
-            )
-        except Exception as e:
-            logger.error(f"Ошибка уведомления админа {admin_id}: {e}")
-
     await state.clear()
     logger.info(f"Состояние пользователя {user_id} очищено после завершения опроса")
 
@@ -1,74 +1,247 @@
 import re
+import os
+import html
 import logging
+import tempfile
+import time
 from aiogram import Router, types
-from aiogram.filters import CommandStart, Command
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters import CommandStart, Command, CommandObject
 from aiogram.fsm.context import FSMContext
-from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery, FSInputFile
 
-from database.db import ReviewDB
-from config.create_bot import bot, ADMIN, ADMINISTRATOR, ADMINISTRATOR2
+from config.create_bot import bot, review_db, ANSWER_LEASE_MINUTES, RENDER_CACHE_SIZE, TOPICS_INTERVAL_MINUTES
 
-from routers.review_router.review_keyboards import get_start_review_kb
-from routers.states import ReviewStates, AdminAnswer
+from routers.review_router.review_keyboards import (
+    get_answer_button, get_start_review_kb, get_reviews_page_kb, get_search_page_kb,
+)
+from routers.states import AdminAnswer
+from database.db import CLAIM_ANSWERED, CLAIM_BUSY, CLAIM_NOT_FOUND
+from database.outbox_db import OutboxDB
+from database.topics_db import TopicsDB
+from services.export import export_filename, export_to_file
+from services.notifier import AdminNotifier
+from services.render_cache import RenderCache
+from services.topics import TopicAnalyzer
 
-start_router = Router()
-review_db = ReviewDB()
+start_router = Router(name="start_router")
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def is_admin(user_id: int) -> bool:
+REVIEWS_PAGE_SIZE = 5
+# Списки /reviews и /all_reviews упаковывают в одно сообщение столько
+# карточек, сколько влезает в лимит Telegram, но не больше REVIEWS_DIGEST_MAX.
+REVIEWS_DIGEST_MAX = 40
+MESSAGE_LIMIT = 4096
+CARD_SEPARATOR = "\n\n"
+# Ограничение на длину каждого поля карточки, чтобы даже самая длинная
+# карточка помещалась в одно сообщение Telegram.
+CARD_FIELD_LIMIT = 500
+HTML_TAG_RE = re.compile(r"<[^>]+>")
+
+PAGE_TITLES = {
+    "new": "📋 <b>Необработанные отзывы:</b>",
+    "all": "📋 <b>Все отзывы:</b>",
+}
+EMPTY_PAGE_TEXTS = {
+    "new": "Нет новых отзывов.",
+    "all": "Отзывов пока нет.",
+}
+
+
+def _short(text: str | None, placeholder: str) -> str:
+    """Экранирует пользовательский текст для HTML и обрезает слишком длинный."""
+    if not text:
+        return f"<i>{placeholder}</i>"
+    if len(text) > CARD_FIELD_LIMIT:
+        text = text[:CARD_FIELD_LIMIT] + "…"
+    return html.escape(text)
+
+
+def render_review_card(review_id: int, user_id: int, username: str | None, source: str | None,
+                       free_review: str | None, subject: str | None, created_at: str | None,
+                       answered: int, admin_answer: str | None) -> str:
     """
-    Проверяет, является ли пользователь администратором.
+    Формирует текст карточки отзыва для списков администратора.
     """
-    return user_id in {int(ADMINISTRATOR), int(ADMIN), int(ADMINISTRATOR2)}
+    status = "✅" if answered else "🆕"
+    date = f" {created_at[:16]}" if created_at else ""
+    text = (
+        f"{status} <b>Отзыв #{review_id}</b> от @{html.escape(username or 'неизвестно')} (id: {user_id}){date}\n"
+        f"📢 <b>Откуда узнали:</b> {_short(source, 'не указано')}\n"
+        f"📝 <b>Отзыв:</b> {_short(free_review, 'пустой')}\n"
+        f"🎨 <b>Темы выставок:</b> {_short(subject, 'не указано')}"
+    )
+    if answered:
+        text += f"\n💬 <b>Ответ администратора:</b> {_short(admin_answer, 'нет')}"
+    return text
+
+
+def message_length(text: str) -> int:
+    """
+    Длина HTML-текста так, как её считает Telegram: без тегов, с раскрытыми
+    сущностями (&lt; — один символ) и в UTF-16 (эмодзи — два символа).
+    """
+    visible = html.unescape(HTML_TAG_RE.sub("", text))
+    return len(visible.encode("utf-16-le")) // 2
+
+
+# Карточки и уведомления не меняются, пока на отзыв не ответили, поэтому
+# отрисовываются один раз; ответ администратора сбрасывает их из кэша.
+card_cache = RenderCache("review_cards", RENDER_CACHE_SIZE)
+notification_cache = RenderCache("review_notifications", RENDER_CACHE_SIZE)
+
+
+def invalidate_review(review_id: int):
+    card_cache.invalidate(review_id)
+    notification_cache.invalidate(review_id)
+
+
+review_db.add_answer_listener(invalidate_review)
+
+
+def rendered_card(row: tuple) -> tuple:
+    """
+    Карточка отзыва из кэша: (текст, длина по message_length, кнопка «Ответить»
+    или None для обработанного отзыва). row — строка вида get_reviews_page.
+    """
+    review_id, user_id = row[0], row[1]
+    answered = row[7]
 
+    def render():
+        text = render_review_card(*row)
+        button = None if answered else get_answer_button(review_id, user_id)
+        return text, message_length(text), button
 
-def reorder_review_text(review_text: str) -> str:
+    return card_cache.get_or_render(review_id, answered, render)
+
+
+def pack_cards(title: str, lengths: list[int], limit: int = MESSAGE_LIMIT) -> int:
+    """
+    Сколько карточек с начала списка помещается в одно сообщение вместе
+    с заголовком; lengths — длины карточек по message_length. Разрез — только
+    по границе карточки; первая карточка берётся всегда (CARD_FIELD_LIMIT
+    гарантирует, что она влезет).
     """
-    Разделяет review_text на отзыв и источник, меняет их местами для вывода.
+    length = message_length(title)
+    separator = message_length(CARD_SEPARATOR)
+    count = 0
+    for card_length in lengths:
+        length += separator + card_length
+        if count and length > limit:
+            break
+        count += 1
+    return count
 
-    Ожидается формат:
-    <текст отзыва>
 
-    Откуда узнал(а): <текст источника>
+async def build_reviews_page(scope: str, after_id: int | None = None, before_id: int | None = None):
     """
-    parts = review_text.split("\n\nОткуда узнал(а): ")
-    if len(parts) == 2:
-        free_review, source = parts
-        return f"Откуда узнали:\n{source}\n\nОтзыв:\n{free_review}"
+    Загружает страницу отзывов и возвращает (текст, клавиатура) или None, если страница пуста.
+    На странице столько карточек, сколько помещается в одно сообщение.
+
+    :param scope: "new" — только необработанные, "all" — все отзывы
+    """
+    rows, has_prev, has_next = await review_db.get_reviews_page(
+        answered=0 if scope == "new" else None,
+        after_id=after_id,
+        before_id=before_id,
+        limit=REVIEWS_DIGEST_MAX,
+    )
+    if not rows:
+        return None
+
+    title = PAGE_TITLES[scope]
+    cards = [rendered_card(row) for row in rows]
+    if before_id is None:
+        count = pack_cards(title, [length for _, length, _ in cards])
+        # Не влезшие карточки уйдут на следующую страницу
+        has_next = has_next or count < len(rows)
+        rows, cards = rows[:count], cards[:count]
     else:
-        # Если формат не совпадает, возвращаем как есть
-        return review_text
+        # Листаем назад: оставляем карточки, ближайшие к текущей странице
+        count = pack_cards(title, [length for _, length, _ in reversed(cards)])
+        has_prev = has_prev or count < len(rows)
+        rows, cards = rows[-count:], cards[-count:]
+
+    text = title + CARD_SEPARATOR + CARD_SEPARATOR.join(card for card, _, _ in cards)
+    answer_buttons = [button for _, _, button in cards if button is not None]
+    return text, get_reviews_page_kb(scope, rows, answer_buttons, has_prev, has_next)
+
+
+async def send_reviews_page(message: types.Message, scope: str):
+    page = await build_reviews_page(scope)
+    if page is None:
+        await message.answer(EMPTY_PAGE_TEXTS[scope])
+        return
+    text, kb = page
+    await message.answer(text, reply_markup=kb, parse_mode="HTML")
 
 
 @start_router.message(Command('reviews'))
 async def cmd_reviews(message: types.Message):
     """
-    Обрабатывает команду /reviews — выводит список необработанных отзывов администратору.
+    Обрабатывает команду /reviews — выводит первую страницу необработанных отзывов администратору.
     """
     user_id = message.from_user.id
     logger.info(f"Пользователь {user_id} вызвал /reviews")
-    if not is_admin(user_id):
-        await message.answer("Команда доступна только администратору.")
-        logger.warning(f"Доступ запрещён пользователю {user_id} к /reviews")
+    await send_reviews_page(message, "new")
+    logger.info(f"Отправлена страница отзывов пользователю {user_id}")
+
+
+@start_router.callback_query(lambda c: c.data and c.data.startswith("page_"))
+async def callback_reviews_page(callback: CallbackQuery):
+    """
+    Обрабатывает кнопки «назад/вперёд» в списке отзывов — редактирует то же сообщение.
+    """
+    try:
+        _, scope, direction, cursor_str = callback.data.split("_", 3)
+        cursor = int(cursor_str)
+        if scope not in PAGE_TITLES or direction not in ("prev", "next"):
+            raise ValueError("unknown page")
+    except Exception as e:
+        logger.error(f"Ошибка парсинга callback data: {callback.data} - {e}")
+        await callback.answer("Ошибка данных.", show_alert=True)
         return
 
-    reviews = review_db.get_unanswered_reviews()
-    if not reviews:
-        await message.answer("Нет новых отзывов.")
-        logger.info("Нет новых отзывов для отображения")
+    if direction == "next":
+        page = await build_reviews_page(scope, after_id=cursor)
+    else:
+        page = await build_reviews_page(scope, before_id=cursor)
+
+    if page is None:
+        await callback.answer("Больше отзывов нет.")
         return
 
-    for review_id, user_id_r, username, review_text in reviews:
-        formatted_text = reorder_review_text(review_text)
-        text = f"Отзыв #{review_id} от @{username or 'неизвестно'} (id: {user_id_r}):\n\n{formatted_text}"
-        kb = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="Ответить", callback_data=f"answer_{review_id}_{user_id_r}")]
-        ])
-        await message.answer(text, reply_markup=kb)
-    logger.info(f"Отправлены отзывы пользователю {user_id}")
+    text, kb = page
+    try:
+        await callback.message.edit_text(text, reply_markup=kb, parse_mode="HTML")
+    except TelegramBadRequest as e:
+        # Страница не изменилась (например, двойное нажатие) — это не ошибка
+        if "message is not modified" not in str(e):
+            raise
+    await callback.answer()
+
+
+async def claim_for_answer(review_id: int, admin_id: int, state: FSMContext) -> str | None:
+    """
+    Захватывает отзыв, чтобы на него отвечал только этот администратор
+    (повторный вызов продлевает захват). Возвращает текст отказа или None.
+    Захват отзыва, на который админ собирался ответить раньше, снимается.
+    """
+    status, holder, expires_at = await review_db.claim_review(review_id, admin_id, ANSWER_LEASE_MINUTES * 60)
+    if status == CLAIM_NOT_FOUND:
+        return f"Отзыв с ID {review_id} не найден."
+    if status == CLAIM_ANSWERED:
+        return f"Отзыв #{review_id} уже обработан."
+    if status == CLAIM_BUSY:
+        minutes = max(1, round((expires_at - time.time()) / 60))
+        return f"На отзыв #{review_id} уже отвечает администратор {holder} (захват истечёт через {minutes} мин)."
+
+    previous = (await state.get_data()).get("review_id")
+    if previous is not None and previous != review_id:
+        await review_db.release_claim(previous, admin_id)
+    return None
 
 
 @start_router.callback_query(lambda c: c.data and c.data.startswith("answer_"))
@@ -78,11 +251,6 @@ async def callback_answer_review(callback: CallbackQuery, state: FSMContext):
     """
     user = callback.from_user.id
     logger.info(f"Пользователь {user} нажал кнопку ответить на отзыве")
-    if not is_admin(user):
-        await callback.answer("Доступ запрещён.", show_alert=True)
-        logger.warning(f"Доступ запрещён пользователю {user} к ответу на отзыв")
-        return
-
     try:
         _, review_id_str, user_id_str = callback.data.split("_", 2)
         review_id = int(review_id_str)
@@ -92,6 +260,12 @@ async def callback_answer_review(callback: CallbackQuery, state: FSMContext):
         await callback.answer("Ошибка данных.", show_alert=True)
         return
 
+    refusal = await claim_for_answer(review_id, user, state)
+    if refusal:
+        await callback.answer(refusal, show_alert=True)
+        logger.info(f"Администратор {user} не смог взять отзыв #{review_id}: {refusal}")
+        return
+
     await state.update_data(review_id=review_id, user_id=user_id_r)
     await callback.message.answer(f"Введите ответ на отзыв #{review_id}:")
     await state.set_state(AdminAnswer.waiting_for_answer)
@@ -103,126 +277,117 @@ async def callback_answer_review(callback: CallbackQuery, state: FSMContext):
 async def process_admin_answer(message: types.Message, state: FSMContext):
     """
     Обрабатывает ответ администратора на отзыв — отправляет пользователю и помечает отзыв отвеченным.
+    Перед отправкой захват отзыва продлевается: если его успел взять другой
+    админ или отзыв уже обработан, ответ не отправляется.
     """
+    admin_id = message.from_user.id
     data = await state.get_data()
     review_id = data.get("review_id")
     user_id = data.get("user_id")
     answer_text = message.text
 
-    logger.info(f"Администратор {message.from_user.id} отвечает на отзыв #{review_id} пользователю {user_id}")
+    logger.info(f"Администратор {admin_id} отвечает на отзыв #{review_id} пользователю {user_id}")
+
+    refusal = await claim_for_answer(review_id, admin_id, state)
+    if refusal:
+        await message.answer(f"{refusal} Ответ не отправлен.")
+        await state.clear()
+        return
 
     try:
         await bot.send_message(user_id, f"Администратор ответил на ваш отзыв:\n\n{answer_text}")
     except Exception as e:
         logger.error(f"Ошибка отправки сообщения пользователю {user_id}: {e}")
         await message.answer(f"Не удалось отправить сообщение пользователю: {e}")
+        await review_db.release_claim(review_id, admin_id)
+        await state.clear()
+        return
+
+    # Захват только что продлён на ANSWER_LEASE_MINUTES, поэтому другой админ
+    # не мог ответить, пока шла отправка; False возможен, лишь если отправка
+    # заняла дольше захвата и отзыв за это время обработали
+    if not await review_db.mark_review_answered(review_id, answer_text, admin_id):
+        logger.warning(f"Отзыв #{review_id} обработан другим администратором, пока отправлялся ответ {admin_id}")
+        await message.answer(
+            f"Отзыв #{review_id} уже обработал другой администратор. "
+            f"Ваш ответ дошёл до пользователя, но в базе не сохранён."
+        )
         await state.clear()
         return
 
-    review_db.mark_review_answered(review_id, answer_text)
     await message.answer("Ответ отправлен и отзыв помечен как отвеченный.")
     await state.clear()
     logger.info(f"Отзыв #{review_id} помечен как отвеченный")
 
 
-def parse_review_text(text: str) -> dict:
+@start_router.message(Command('all_reviews'))
+async def cmd_all_reviews(message: types.Message):
     """
-    Парсит отзыв из формата:
-
-    Отзыв: <текст отзыва>
+    Обрабатывает команду /all_reviews — выводит первую страницу всех отзывов, обработанных и нет.
+    Архивные отзывы (см. services/retention.py) сюда не попадают — их находят /search и /export.
+    """
+    await send_reviews_page(message, "all")
 
-    Откуда узнал(а): <источник>
-    Темы выставок, которые хотел(а) бы видеть: <темы>
 
-    Возвращает dict с ключами 'review', 'source', 'subject'.
+async def build_search_page(query: str, offset: int = 0):
     """
-    review = ""
-    source = ""
-    subject = ""
-
-    # Разобьём на строки и найдём ключевые строки
-    lines = text.splitlines()
-    # Собираем свободный отзыв — все строки до первой строки, начинающейся с "Откуда узнал(а):"
-    review_lines = []
-    i = 0
-    while i < len(lines):
-        line = lines[i].strip()
-        if line.startswith("Откуда узнал(а):"):
-            break
-        review_lines.append(line)
-        i += 1
-    review = "\n".join(review_lines).strip()
-
-    # Теперь ищем источник
-    while i < len(lines):
-        line = lines[i].strip()
-        if line.startswith("Откуда узнал(а):"):
-            source = line[len("Откуда узнал(а):"):].strip()
-            i += 1
-            break
-        i += 1
+    Страница результатов полнотекстового поиска: (текст, клавиатура) или None, если ничего не найдено.
+    """
+    rows, has_next = await review_db.search_reviews(query, offset=offset, limit=REVIEWS_PAGE_SIZE)
+    if not rows:
+        return None
+    cards = [rendered_card(row) for row in rows]
+    title = f"🔎 <b>Поиск:</b> {html.escape(query)} (с {offset + 1})"
+    text = title + "\n\n" + "\n\n".join(card for card, _, _ in cards)
+    answer_buttons = [button for _, _, button in cards if button is not None]
+    return text, get_search_page_kb(answer_buttons, offset, REVIEWS_PAGE_SIZE, has_next)
+
+
+@start_router.message(Command('search'))
+async def cmd_search(message: types.Message, command: CommandObject, state: FSMContext):
+    """
+    Обрабатывает команду /search <запрос> — полнотекстовый поиск по отзывам и ответам.
+    """
+    user_id = message.from_user.id
+    logger.info(f"Пользователь {user_id} вызвал /search")
+    query = (command.args or "").strip()
+    if not query:
+        await message.answer("Укажите, что искать. Пример: /search Малевич")
+        return
 
-    # Теперь ищем темы выставок
-    while i < len(lines):
-        line = lines[i].strip()
-        if line.startswith("Темы выставок, которые хотел(а) бы видеть:"):
-            subject = line[len("Темы выставок, которые хотел(а) бы видеть:"):].strip()
-            break
-        i += 1
+    page = await build_search_page(query)
+    if page is None:
+        await message.answer("Ничего не найдено.")
+        return
 
-    return {
-        "review": review,
-        "source": source,
-        "subject": subject,
-    }
+    # Запрос нужен для перелистывания, в callback_data он может не поместиться
+    await state.update_data(search_query=query)
+    text, kb = page
+    await message.answer(text, reply_markup=kb, parse_mode="HTML")
 
 
-@start_router.message(Command('all_reviews'))
-async def cmd_all_reviews(message: types.Message):
-    user_id = message.from_user.id
-    if not is_admin(user_id):
-        await message.answer("Команда доступна только администратору.")
+@start_router.callback_query(lambda c: c.data and c.data.startswith("search_"))
+async def callback_search_page(callback: CallbackQuery, state: FSMContext):
+    """
+    Перелистывает результаты /search в том же сообщении.
+    """
+    query = (await state.get_data()).get("search_query")
+    if not query or not callback.data[len("search_"):].isdigit():
+        await callback.answer("Поиск устарел, повторите /search.", show_alert=True)
         return
 
-    unanswered = review_db.get_unanswered_reviews()
-    answered = review_db.get_answered_reviews()
-
-    if not unanswered and not answered:
-        await message.answer("Отзывов пока нет.")
+    page = await build_search_page(query, int(callback.data[len("search_"):]))
+    if page is None:
+        await callback.answer("Больше результатов нет.")
         return
 
-    if unanswered:
-        await message.answer("📋 *Необработанные отзывы:*", parse_mode="Markdown")
-        for review_id, user_id_r, username, review_text in unanswered:
-            parts = parse_review_text(review_text)
-            text = (
-                f"Отзыв #{review_id} от @{username or 'неизвестно'} (id: {user_id_r}):\n\n"
-                f"📢 *Откуда узнали:*\n{parts['source'] or '_не указано_'}\n\n"
-                f"📝 *Отзыв:*\n{parts['review'] or '_пустой_'}\n\n"
-                f"🎨 *Темы выставок, которые хотел(а) бы видеть:*\n{parts['subject'] or '_не указано_'}"
-            )
-            kb = InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="Ответить", callback_data=f"answer_{review_id}_{user_id_r}")]
-            ])
-            await message.answer(text, parse_mode="Markdown", reply_markup=kb)
-    else:
-        await message.answer("Нет необработанных отзывов.")
-
-    if answered:
-        await message.answer("✅ *Обработанные отзывы:*", parse_mode="Markdown")
-        for review_id, user_id_r, username, review_text, admin_answer in answered:
-            parts = parse_review_text(review_text)
-            text = (
-                f"Отзыв #{review_id} от @{username or 'неизвестно'} (id: {user_id_r}):\n\n"
-                f"📢 *Откуда узнали:*\n{parts['source'] or '_не указано_'}\n\n"
-                f"📝 *Отзыв:*\n{parts['review'] or '_пустой_'}\n\n"
-                f"🎨 *Темы выставок, которые хотел(а) бы видеть:*\n{parts['subject'] or '_не указано_'}\n\n"
-                f"💬 *Ответ администратора:*\n{admin_answer}"
-            )
-            await message.answer(text, parse_mode="Markdown")
-    else:
-        await message.answer("Нет обработанных отзывов.")
-
+    text, kb = page
+    try:
+        await callback.message.edit_text(text, reply_markup=kb, parse_mode="HTML")
+    except TelegramBadRequest as e:
+        if "message is not modified" not in str(e):
+            raise
+    await callback.answer()
 
 
 @start_router.message(Command(commands=["answer"]))
@@ -232,11 +397,6 @@ async def cmd_answer_review(message: types.Message, state: FSMContext):
     """
     user_id = message.from_user.id
     logger.info(f"Пользователь {user_id} вызвал /answer")
-    if not is_admin(user_id):
-        await message.answer("Команда доступна только администратору.")
-        logger.warning(f"Доступ запрещён пользователю {user_id} к /answer")
-        return
-
     text = message.text or ""
     parts = text.split(maxsplit=1)
     if len(parts) < 2 or not parts[1].isdigit():
@@ -245,10 +405,7 @@ async def cmd_answer_review(message: types.Message, state: FSMContext):
 
     review_id = int(parts[1])
 
-    cursor = review_db.conn.execute(
-        "SELECT user_id, answered FROM reviews WHERE id = ?", (review_id,)
-    )
-    row = cursor.fetchone()
+    row = await review_db.get_review_status(review_id)
     if not row:
         await message.answer(f"Отзыв с ID {review_id} не найден.")
         logger.warning(f"Отзыв с ID {review_id} не найден")
@@ -259,36 +416,172 @@ async def cmd_answer_review(message: types.Message, state: FSMContext):
         logger.info(f"Отзыв #{review_id} уже обработан")
         return
 
+    refusal = await claim_for_answer(review_id, user_id, state)
+    if refusal:
+        await message.answer(refusal)
+        logger.info(f"Администратор {user_id} не смог взять отзыв #{review_id}: {refusal}")
+        return
+
     await state.update_data(review_id=review_id, user_id=review_user_id)
     await message.answer(f"Введите ответ на отзыв #{review_id}:")
     await state.set_state(AdminAnswer.waiting_for_answer)
     logger.info(f"Перевод администратора {user_id} в состояние ожидания ответа на отзыв #{review_id}")
 
 
+def format_duration(seconds: int | None) -> str:
+    if seconds is None:
+        return "нет данных"
+    hours, rest = divmod(max(0, seconds), 3600)
+    minutes = rest // 60
+    return f"{hours} ч {minutes} мин" if hours else f"{minutes} мин"
+
+
 @start_router.message(Command('statistic'))
 async def cmd_statistics(message: types.Message):
     """
-    Обрабатывает команду /statistic — выводит статистику: сколько пользователей и сколько отзывов.
+    Обрабатывает команду /statistic — выводит статистику по пользователям, отзывам, источникам,
+    дням и времени ответа. Все цифры берутся из предрасчитанных таблиц.
     """
     user_id = message.from_user.id
     logger.info(f"Пользователь {user_id} вызвал /statistic")
-    if not is_admin(user_id):
-        await message.answer("Команда доступна только администратору.")
-        logger.warning(f"Доступ запрещён пользователю {user_id} к /statistic")
-        return
-
-    user_count = review_db.count_users()
-    review_count = review_db.count_reviews()
+    stats = await review_db.get_statistics()
 
     text = (
-        f"📊 *Статистика бота:*\n\n"
-        f"👥 Пользователей, воспользовавшихся ботом: {user_count}\n"
-        f"📝 Отзывов отправлено: {review_count}"
+        f"📊 <b>Статистика бота:</b>\n\n"
+        f"👥 Пользователей, воспользовавшихся ботом: {stats['users']}\n"
+        f"📝 Отзывов отправлено: {stats['reviews']}\n"
+        f"✅ Отвечено: {stats['answered']}\n"
+        f"🆕 Ждут ответа: {stats['unanswered']}\n"
+        f"⏱ Медианное время ответа: {format_duration(stats['median_response_seconds'])}"
     )
-    await message.answer(text, parse_mode="Markdown")
+    if stats["sources"]:
+        text += "\n\n📢 <b>Откуда узнали:</b>\n" + "\n".join(
+            f"{html.escape(source or 'не указано')}: {count}" for source, count in stats["sources"]
+        )
+    if stats["daily"]:
+        text += "\n\n📅 <b>По дням (отзывов / ответов):</b>\n" + "\n".join(
+            f"{day}: {reviews} / {answered}" for day, reviews, answered in stats["daily"]
+        )
+    await message.answer(text, parse_mode="HTML")
     logger.info(f"Отправлена статистика пользователю {user_id}")
 
 
+TOPICS_DEFAULT = 15
+TOPICS_MAX = 40
+# Словосочетание из одного ответа — ещё не тема
+TOPICS_MIN_BIGRAM_REVIEWS = 2
+TOPIC_FIELD_LIMIT = 40
+
+# Таблицы тем дополняются в фоне (запускается в run_bot.py), /topics их только читает
+topic_analyzer = TopicAnalyzer(TopicsDB(review_db), interval=TOPICS_INTERVAL_MINUTES * 60)
+
+
+def format_topic(number: int, form: str, reviews: int, answers: int, sources: list) -> str:
+    share = f" ({reviews * 100 // answers}%)" if answers else ""
+    line = f"{number}. {html.escape(form[:TOPIC_FIELD_LIMIT])} — {reviews}{share}"
+    if sources:
+        line += " · " + ", ".join(
+            f"{html.escape((source or 'не указано')[:TOPIC_FIELD_LIMIT])} {count}" for source, count in sources
+        )
+    return line
+
+
+@start_router.message(Command('topics'))
+async def cmd_topics(message: types.Message, command: CommandObject):
+    """
+    Обрабатывает команду /topics [N] — самые частые темы, которые посетители хотят видеть
+    на выставках, с разбивкой по источникам. Берутся из таблиц тем, которые фоном
+    дополняются новыми отзывами, поэтому ответ не зависит от числа отзывов.
+    """
+    user_id = message.from_user.id
+    logger.info(f"Пользователь {user_id} вызвал /topics")
+    args = (command.args or "").strip()
+    limit = min(int(args), TOPICS_MAX) if args.isdigit() and int(args) > 0 else TOPICS_DEFAULT
+    topics = await topic_analyzer.db.get_topics(limit)
+    answers = topics["answers"]
+    if not topics["terms"]:
+        await message.answer("Ответов о темах выставок пока нет.")
+        return
+
+    lines = [
+        "🎨 <b>Темы, которые посетители хотят видеть:</b>",
+        f"Учтено ответов: {answers} (отзывы по #{topics['last_review_id']})",
+    ]
+    bigrams = [topic for topic in topics["bigrams"] if topic[1] >= TOPICS_MIN_BIGRAM_REVIEWS]
+    for title, items in (("🔗 <b>Словосочетания:</b>", bigrams), ("🔤 <b>Слова:</b>", topics["terms"])):
+        if items:
+            lines.append("")
+            lines.append(title)
+            lines.extend(
+                format_topic(number, form, reviews, answers, sources)
+                for number, (form, reviews, sources) in enumerate(items, 1)
+            )
+
+    # Лимит Telegram считается по видимому тексту в UTF-16 (см. message_length)
+    text, length = "", 0
+    for line in lines:
+        line_length = message_length(line) + 1
+        if length + line_length > MESSAGE_LIMIT:
+            break
+        text += line + "\n"
+        length += line_length
+    await message.answer(text, parse_mode="HTML")
+    logger.info(f"Отправлены темы пользователю {user_id}")
+
+EXPORT_USAGE = (
+    "Формат: /export [csv|jsonl] [gz] [с ГГГГ-ММ-ДД] [по ГГГГ-ММ-ДД] [answered|unanswered]\n"
+    "Пример: /export jsonl gz с 2024-09-01 unanswered"
+)
+DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+def parse_export_args(args: str | None) -> dict | None:
+    """Разбирает аргументы /export; None, если в них есть что-то непонятное."""
+    options = {"fmt": "csv", "compress": False, "date_from": None, "date_to": None, "answered": None}
+    words = (args or "").lower().split()
+    while words:
+        word = words.pop(0)
+        if word in ("csv", "jsonl"):
+            options["fmt"] = word
+        elif word in ("gz", "gzip"):
+            options["compress"] = True
+        elif word in ("answered", "отвеченные"):
+            options["answered"] = 1
+        elif word in ("unanswered", "новые"):
+            options["answered"] = 0
+        elif word in ("с", "from", "по", "to") and words and DATE_RE.fullmatch(words[0]):
+            options["date_from" if word in ("с", "from") else "date_to"] = words.pop(0)
+        else:
+            return None
+    return options
+
+
+@start_router.message(Command('export'))
+async def cmd_export(message: types.Message, command: CommandObject):
+    """
+    Обрабатывает команду /export — присылает выгрузку отзывов файлом (CSV или JSONL, можно в gzip).
+    """
+    user_id = message.from_user.id
+    logger.info(f"Пользователь {user_id} вызвал /export")
+    options = parse_export_args(command.args)
+    if options is None:
+        await message.answer(EXPORT_USAGE)
+        return
+
+    filename = export_filename(options["fmt"], options["compress"])
+    fd, path = tempfile.mkstemp(suffix="-" + filename)
+    os.close(fd)
+    try:
+        total = await export_to_file(review_db, path, **options)
+        if not total:
+            await message.answer("Нет отзывов для выгрузки.")
+            return
+        await message.answer_document(FSInputFile(path, filename=filename), caption=f"Отзывов: {total}")
+        logger.info(f"Отправлена выгрузка {filename} ({total} отзывов) пользователю {user_id}")
+    finally:
+        os.remove(path)
+
+
 @start_router.message(Command(commands=["admin"]))
 async def cmd_admin(message: types.Message):
     """
@@ -296,45 +589,30 @@ async def cmd_admin(message: types.Message):
     """
     user_id = message.from_user.id
     logger.info(f"Пользователь {user_id} вызвал /admin")
-    if not is_admin(user_id):
-        await message.answer("Команда доступна только администратору.")
-        logger.warning(f"Доступ запрещён пользователю {user_id} к /admin")
-        return
-
     await message.answer("📋 *Админ команды:*\n\n\
         '/reviews' - просмотр не обработанных отзывов;\n\
         '/all_reviews' - просмотр всех отзывов обработанных (с ответами от админа) и не обработанных;\n\
         '/answer &lt;id&gt;' - ответить на отзыв с определенным id;\n\
-        '/statistic' - показать статистику использования бота.", parse_mode="HTML")
+        '/statistic' - показать статистику использования бота;\n\
+        '/topics [N]' - самые частые темы выставок, которые хотят посетители;\n\
+        '/search &lt;запрос&gt;' - поиск по отзывам и ответам;\n\
+        '/export [csv|jsonl] [gz]' - выгрузка отзывов файлом;\n\
+        '/admins', '/add_admin &lt;id&gt;', '/remove_admin &lt;id&gt;' - список администраторов;\n\
+        '/ad_post' - рассылка сообщения всем пользователям бота.", parse_mode="HTML")
 
 
-async def send_admin_new_review_notification(
-        review_id: int,
-        user_id_ms: int,
-        username: str | None,
-        free_review: str,
-        source: str,
-        subject: str,
-        admin_id: int
-    ):
-    """
-    Отправляет уведомление администратору о новом отзыве с кнопкой "Ответить".
+def render_new_review_notification(review: tuple) -> tuple:
+    """Текст и клавиатура уведомления о новом отзыве для строки get_review."""
+    review_id, user_id_ms, username, source, free_review, subject, *_ = review
 
-    :param review_id: ID отзыва
-    :param user_id_ms: ID пользователя, оставившего отзыв
-    :param username: Имя пользователя
-    :param free_review: Текст отзыва
-    :param source: Источник информации
-    :param admin_id: ID администратора для отправки сообщения
-    """
     text = (
-        f"Новый отзыв #{review_id} от @{username or 'неизвестно'}:\n\n"
+        f"Новый отзыв #{review_id} от @{html.escape(username or 'неизвестно')}:\n\n"
         f"📢 Вопрос 1: Откуда вы узнали о выставке?\n"
-        f"Ответ: {source}\n\n"
+        f"Ответ: {html.escape(source or '')}\n\n"
         f"📝 Вопрос 2: В свободной форме расскажите, как вам выставка? Какие произведения понравились больше всего?\n"
-        f"Ответ: {free_review}\n\n"
+        f"Ответ: {html.escape(free_review or '')}\n\n"
         f"🎨 Вопрос 3: Темы выставок, которые хотел(а) бы видеть:\n"
-        f"Ответ: {subject}"
+        f"Ответ: {html.escape(subject or '')}"
     )
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [
@@ -344,9 +622,28 @@ async def send_admin_new_review_notification(
             )
         ]
     ])
-    try:
-        await bot.send_message(admin_id, text, reply_markup=keyboard)
-        logger.info(f"Отправлено уведомление админу {admin_id} о отзыве #{review_id}")
-    except Exception as e:
-        logger.error(f"Ошибка отправки уведомления админу {admin_id}: {e}")
+    return text, keyboard
+
+
+async def send_admin_new_review_notification(review_id: int, admin_id: int):
+    """
+    Отправляет уведомление администратору о новом отзыве с кнопкой "Ответить".
+    Вызывается диспетчером outbox; исключение означает, что отправку нужно повторить.
+    Одно и то же уведомление получают все админы, поэтому оно берётся из кэша.
+
+    :param review_id: ID отзыва
+    :param admin_id: ID администратора для отправки сообщения
+    """
+    review = await review_db.get_review(review_id)
+    if review is None:
+        logger.warning(f"Отзыв #{review_id} для уведомления не найден")
+        return
+
+    text, keyboard = notification_cache.get_or_render(
+        review_id, review[7], lambda: render_new_review_notification(review)
+    )
+    await bot.send_message(admin_id, text, reply_markup=keyboard, parse_mode="HTML")
+
 
+# Уведомления о новых отзывах рассылаются из outbox в фоне
+admin_notifier = AdminNotifier(OutboxDB(review_db), send_admin_new_review_notification)
@@ -1,11 +1,12 @@
 from aiogram.fsm.state import State, StatesGroup
 
-class ReviewStates(StatesGroup):
-    waiting_for_source_choice = State()
-    waiting_for_custom_source = State()
-    waiting_for_free_review = State()
-    waiting_for_source_subject = State()  # последний вопрос - тема выставок
+# Состояния опросов посетителей создаются из config/surveys.json (services/surveys.py)
 
 
 class AdminAnswer(StatesGroup):
     waiting_for_answer = State()
+
+
+class AdPost(StatesGroup):
+    waiting_for_post = State()
+    waiting_for_confirm = State()
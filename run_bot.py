@@ -1,10 +1,29 @@
 import asyncio
-from config.create_bot import bot, dp, ADMIN
+from aiohttp import web
+from config.create_bot import (
+    bot, dp, survey_catalog, ADMIN, BOT_MODE, WEBHOOK_BASE_URL, WEBHOOK_PATH, WEBHOOK_SECRET,
+    WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_MAX_CONCURRENCY, WEBHOOK_MAX_CONNECTIONS,
+    METRICS_HOST, METRICS_PORT, PENDING_UPDATES, CATCH_UP_CONCURRENCY, CATCH_UP_MAX_AGE_HOURS,
+    ARCHIVE_AFTER_DAYS, MAINTENANCE_INTERVAL_HOURS, VACUUM_INTERVAL_DAYS, review_db,
+)
 import logging
 from config.all_routers import all_routers
+from routers.broadcast_router.broadcast_r import broadcaster
+from routers.start_router.start_r import admin_notifier, topic_analyzer
+from routers.review_router.review_router import cancel_follow_ups, media_cache
+from services.catch_up import CatchUp
+from services.metrics import start_metrics_server
+from services.retention import RetentionJob
+from services.webhook import WebhookHandler, build_webhook_app
 
 admin_id = ADMIN
-logging.basicConfig(level=logging.INFO)
+
+retention_job = RetentionJob(
+    review_db,
+    archive_after_days=ARCHIVE_AFTER_DAYS,
+    interval=MAINTENANCE_INTERVAL_HOURS * 3600,
+    vacuum_interval=VACUUM_INTERVAL_DAYS * 24 * 3600,
+)
 
 
 
@@ -24,19 +43,93 @@ async def on_shutdown(dp):
         logging.error(f'Не удалось отправить сообщение админу: {exc}')
 
 
+async def process_pending_updates():
+    """
+    Обрабатывает обновления, пришедшие пока бот был выключен (отзывы,
+    отправленные во время перезапуска), или выбрасывает их при PENDING_UPDATES=drop.
+    """
+    if PENDING_UPDATES == "drop":
+        await bot.delete_webhook(drop_pending_updates=True)
+        return
+
+    # getUpdates работает только без webhook
+    await bot.delete_webhook(drop_pending_updates=False)
+    catch_up = CatchUp(bot, dp, concurrency=CATCH_UP_CONCURRENCY, max_age=CATCH_UP_MAX_AGE_HOURS * 3600)
+    stats = await catch_up.run()
+    if not (stats["processed"] or stats["skipped"] or stats["failed"]):
+        return
+    try:
+        await bot.send_message(
+            admin_id,
+            f"Обработаны обновления, накопившиеся за время перезапуска: {stats['processed']} "
+            f"за {stats['duration']:.1f} с (устаревших пропущено: {stats['skipped']}, ошибок: {stats['failed']})"
+        )
+    except Exception as exc:
+        logging.error(f'Не удалось отправить сообщение админу: {exc}')
+
+
+async def run_webhook():
+    """
+    Принимает обновления через webhook: регистрирует адрес в Telegram
+    и держит aiohttp-сервер, пока бота не остановят.
+    """
+    handler = WebhookHandler(dp, bot, secret=WEBHOOK_SECRET, max_concurrency=WEBHOOK_MAX_CONCURRENCY)
+    runner = web.AppRunner(build_webhook_app(handler, WEBHOOK_PATH))
+    await runner.setup()
+    site = web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT)
+    await site.start()
+
+    await process_pending_updates()
+    await bot.set_webhook(
+        url=f"{WEBHOOK_BASE_URL}{WEBHOOK_PATH}",
+        secret_token=WEBHOOK_SECRET,
+        max_connections=WEBHOOK_MAX_CONNECTIONS,
+    )
+    logging.info(f'Webhook слушает {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}')
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        await handler.drain()
+
+
 async def main():
 
     await on_startup(dp)
-    await bot.delete_webhook(drop_pending_updates=True)
 
     for router in all_routers:
         dp.include_router(router)
+    # В режиме polling сессия бота закрывается сразу после shutdown, поэтому
+    # отложенные вопросы отменяются в нём; в режиме webhook — в finally ниже
+    dp.shutdown.register(cancel_follow_ups)
+
+    # Рассылки, прерванные перезапуском, продолжаются с места остановки
+    await broadcaster.resume()
+    admin_notifier.start()
+    retention_job.start()
+    topic_analyzer.start()
+    await media_cache.prewarm(bot, admin_id, survey_catalog.photo_paths())
+    metrics_runner = await start_metrics_server(METRICS_HOST, METRICS_PORT) if METRICS_PORT else None
 
     try:
-        await dp.start_polling(bot, on_startup=on_startup, on_shutdown=on_shutdown)
+        if BOT_MODE == "webhook":
+            await run_webhook()
+        else:
+            await process_pending_updates()
+            await dp.start_polling(bot, on_startup=on_startup, on_shutdown=on_shutdown)
     except Exception as exc:
         logging.error(f'Ошибка во время работы бота: {exc}')
         await on_shutdown(dp)
+    finally:
+        await cancel_follow_ups()
+        await broadcaster.stop()
+        await admin_notifier.stop()
+        await retention_job.stop()
+        await topic_analyzer.stop()
+        await dp.storage.close()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
 
 
 if __name__ == '__main__':
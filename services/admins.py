@@ -0,0 +1,97 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Iterable, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, Message, TelegramObject
+
+from database.admin_db import AdminDB
+
+logger = logging.getLogger(__name__)
+
+
+class AdminRegistry:
+    """
+    Список администраторов из базы с кэшем в памяти.
+
+    Список читается из базы один раз и дальше проверяется по памяти;
+    add()/remove() меняют таблицу и сбрасывают кэш, поэтому изменения
+    действуют сразу, без перезапуска. Владельцы (админы из переменных
+    окружения) заносятся в таблицу при первой загрузке и не удаляются.
+    """
+
+    def __init__(self, db: AdminDB, owners: Iterable[int] = ()):
+        self.db = db
+        self.owners: FrozenSet[int] = frozenset(owners)
+        self._ids: Optional[FrozenSet[int]] = None
+        self._generation = 0
+        self._seeded = False
+        self._lock = asyncio.Lock()
+
+    async def ids(self) -> FrozenSet[int]:
+        ids = self._ids
+        if ids is not None:
+            return ids
+        async with self._lock:
+            if self._ids is None:
+                generation = self._generation
+                if not self._seeded and self.owners:
+                    await self.db.add_admins(self.owners)
+                    self._seeded = True
+                loaded = frozenset(await self.db.get_admin_ids()) | self.owners
+                # Если пока шло чтение список поменяли, кэшировать устаревшее нельзя
+                if generation != self._generation:
+                    return loaded
+                self._ids = loaded
+            return self._ids
+
+    async def is_admin(self, user_id: int) -> bool:
+        return user_id in await self.ids()
+
+    def invalidate(self):
+        self._generation += 1
+        self._ids = None
+
+    async def add(self, user_id: int, added_by: Optional[int] = None) -> bool:
+        """Добавляет админа. False — он уже был в списке."""
+        added = await self.db.add_admins([user_id], added_by) > 0
+        self.invalidate()
+        return added
+
+    async def remove(self, user_id: int) -> bool:
+        """Удаляет админа. False — его не было в списке или это владелец."""
+        if user_id in self.owners:
+            return False
+        removed = await self.db.remove_admin(user_id)
+        self.invalidate()
+        return removed
+
+
+class AdminMiddleware(BaseMiddleware):
+    """
+    Пропускает к хендлерам роутера только администраторов. Регистрируется
+    на наблюдателях админского роутера и действует во всех вложенных в него
+    роутерах; остальным пользователям отвечает отказом до запуска хендлера.
+    """
+
+    def __init__(self, registry: AdminRegistry):
+        self.registry = registry
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+        ) -> Any:
+        user = data.get("event_from_user")
+        if user is not None and await self.registry.is_admin(user.id):
+            return await handler(event, data)
+
+        handler_object = data.get("handler")
+        handler_name = getattr(getattr(handler_object, "callback", None), "__name__", "unknown")
+        logger.warning(f"Доступ запрещён пользователю {user.id if user else None} к {handler_name}")
+        if isinstance(event, CallbackQuery):
+            await event.answer("Доступ запрещён.", show_alert=True)
+        elif isinstance(event, Message):
+            await event.answer("Команда доступна только администратору.")
+        return None
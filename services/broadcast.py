@@ -0,0 +1,189 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramRetryAfter,
+)
+
+from database.broadcast_db import BroadcastDB
+from services.flood_control import bulk_traffic
+
+logger = logging.getLogger(__name__)
+
+
+class Broadcaster:
+    """
+    Рассылка сообщения всем пользователям бота.
+
+    Аудитория фиксируется в базе при создании рассылки, статус доставки
+    хранится по каждому получателю, поэтому после перезапуска рассылка
+    продолжается с того места, где остановилась. Отправку выполняют
+    несколько воркеров; скорость и TelegramRetryAfter целиком на
+    FloodControlMiddleware сессии бота (services/flood_control.py):
+    сообщения рассылки идут как фоновые (bulk_traffic) и не задерживают
+    ответы посетителям.
+    """
+
+    def __init__(
+            self,
+            bot: Bot,
+            db: BroadcastDB,
+            workers: int = 8,
+            max_attempts: int = 3,
+            chunk_size: int = 500,
+            progress_interval: float = 5.0
+        ):
+        self.bot = bot
+        self.db = db
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.chunk_size = chunk_size
+        self.progress_interval = progress_interval
+        self._tasks: Dict[int, asyncio.Task] = {}
+
+    async def start(self, from_chat_id: int, message_id: int, admin_id: int) -> Tuple[int, int]:
+        """
+        Создаёт рассылку копии сообщения (from_chat_id, message_id) и запускает её в фоне.
+        Возвращает (id рассылки, число получателей).
+        """
+        broadcast_id, total = await self.db.create_broadcast(from_chat_id, message_id, admin_id)
+        progress = await self.bot.send_message(admin_id, f"📣 Рассылка #{broadcast_id}: 0 из {total}")
+        await self.db.set_progress_message(broadcast_id, progress.chat.id, progress.message_id)
+        self._spawn(broadcast_id)
+        logger.info(f"Запущена рассылка #{broadcast_id} на {total} получателей")
+        return broadcast_id, total
+
+    async def resume(self):
+        """Продолжает рассылки, прерванные перезапуском бота."""
+        for broadcast_id in await self.db.get_running_broadcasts():
+            if broadcast_id not in self._tasks:
+                logger.info(f"Продолжаем рассылку #{broadcast_id} после перезапуска")
+                self._spawn(broadcast_id)
+
+    async def stop(self):
+        """Останавливает воркеры; недоставленные получатели останутся в очереди."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def wait(self):
+        """Ждёт завершения всех запущенных рассылок."""
+        await asyncio.gather(*self._tasks.values())
+
+    def _spawn(self, broadcast_id: int):
+        task = asyncio.create_task(self._run(broadcast_id))
+        self._tasks[broadcast_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(broadcast_id, None))
+
+    async def _run(self, broadcast_id: int):
+        broadcast = await self.db.get_broadcast(broadcast_id)
+        if broadcast is None:
+            return
+        _, from_chat_id, message_id, _, total, progress_chat_id, progress_message_id = broadcast
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.chunk_size * 2)
+        results: List[Tuple[int, str, int, Optional[str]]] = []
+        started = time.monotonic()
+
+        async def producer():
+            last_user_id = 0
+            while True:
+                chunk = await self.db.get_pending_recipients(broadcast_id, last_user_id, self.chunk_size)
+                if not chunk:
+                    break
+                for recipient in chunk:
+                    await queue.put(recipient)
+                last_user_id = chunk[-1][0]
+            for _ in range(self.workers):
+                await queue.put(None)
+
+        async def worker():
+            while True:
+                recipient = await queue.get()
+                if recipient is None:
+                    return
+                results.append(await self._deliver(from_chat_id, message_id, *recipient))
+                if len(results) >= 100:
+                    await flush()
+
+        async def flush():
+            if results:
+                batch = results[:]
+                results.clear()
+                await self.db.mark_recipients(broadcast_id, batch)
+
+        async def report():
+            while True:
+                await asyncio.sleep(self.progress_interval)
+                await self._report(broadcast_id, total, progress_chat_id, progress_message_id, started)
+
+        reporter = asyncio.create_task(report())
+        try:
+            while True:
+                await asyncio.gather(producer(), *(worker() for _ in range(self.workers)))
+                await flush()
+                # Получатели с временными ошибками остались 'pending' —
+                # делаем по ним ещё один проход после паузы. Проходов не больше
+                # max_attempts: каждый засчитывает попытку, после последней
+                # получатель помечается 'failed' с последней ошибкой.
+                counts = await self.db.get_counts(broadcast_id)
+                if not counts.get("pending"):
+                    break
+                await asyncio.sleep(self.progress_interval)
+        finally:
+            reporter.cancel()
+            await flush()
+
+        await self.db.finish_broadcast(broadcast_id)
+        await self._report(broadcast_id, total, progress_chat_id, progress_message_id, started, done=True)
+        logger.info(f"Рассылка #{broadcast_id} завершена: {counts}")
+
+    async def _deliver(self, from_chat_id: int, message_id: int, user_id: int, attempts: int
+                       ) -> Tuple[int, str, int, Optional[str]]:
+        """Отправляет копию сообщения одному получателю. Возвращает (user_id, status, attempts, error)."""
+        attempts += 1
+        try:
+            with bulk_traffic():
+                await self.bot.copy_message(chat_id=user_id, from_chat_id=from_chat_id, message_id=message_id)
+            return user_id, "sent", attempts, None
+        except TelegramRetryAfter as e:
+            # Middleware уже выждал и повторил запрос max_retries раз — оставляем
+            # получателя на следующий проход. Попытка засчитывается, иначе при
+            # затяжном flood control проходы рассылки не закончатся.
+            logger.warning(f"Рассылка: flood control для {user_id} не снят повторами: {e}")
+            status = "failed" if attempts >= self.max_attempts else "pending"
+            return user_id, status, attempts, str(e)
+        except (TelegramForbiddenError, TelegramBadRequest) as e:
+            # Пользователь заблокировал бота или чат недоступен — повтор не поможет
+            return user_id, "failed", attempts, str(e)
+        except Exception as e:
+            logger.error(f"Рассылка: ошибка отправки пользователю {user_id}: {e}")
+            status = "failed" if attempts >= self.max_attempts else "pending"
+            return user_id, status, attempts, str(e)
+
+    async def _report(self, broadcast_id: int, total: int, chat_id: Optional[int], message_id: Optional[int],
+                      started: float, done: bool = False):
+        if chat_id is None or message_id is None:
+            return
+        counts = await self.db.get_counts(broadcast_id)
+        sent = counts.get("sent", 0)
+        failed = counts.get("failed", 0)
+        elapsed = time.monotonic() - started
+        text = (
+            f"📣 Рассылка #{broadcast_id}{' завершена' if done else ''}: {sent + failed} из {total}\n"
+            f"✅ Доставлено: {sent}\n"
+            f"⛔️ Не доставлено: {failed}\n"
+            f"⏱ {elapsed:.0f} с"
+        )
+        try:
+            await self.bot.edit_message_text(text, chat_id=chat_id, message_id=message_id)
+        except TelegramBadRequest:
+            pass
+        except Exception as e:
+            logger.error(f"Не удалось обновить прогресс рассылки #{broadcast_id}: {e}")
@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Hashable, List, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+logger = logging.getLogger(__name__)
+
+
+def _chat_key(update: Update) -> Hashable:
+    """Ключ очерёдности: обновления одного чата (или пользователя) обрабатываются строго по порядку."""
+    try:
+        event = update.event
+    except Exception:
+        return None
+    chat = getattr(event, "chat", None) or getattr(getattr(event, "message", None), "chat", None)
+    if chat is not None:
+        return chat.id
+    user = getattr(event, "from_user", None)
+    return user.id if user is not None else None
+
+
+class CatchUp:
+    """
+    Обработка обновлений, накопившихся в Telegram, пока бот был выключен.
+
+    Обновления забираются через getUpdates пачками до batch_size и
+    обрабатываются параллельно (не больше concurrency одновременно), но
+    обновления одного чата — строго по очереди, чтобы шаги опроса в FSM
+    не перепутались. Следующая пачка запрашивается только после обработки
+    текущей: её offset подтверждает Telegram получение предыдущих, и
+    перезапуск посреди догонялки ничего не теряет. Сообщения старше
+    max_age секунд пропускаются — отвечать на них уже поздно.
+    """
+
+    def __init__(
+            self,
+            bot: Bot,
+            dp: Dispatcher,
+            concurrency: int = 50,
+            batch_size: int = 100,
+            max_age: Optional[float] = 24 * 60 * 60,
+            progress_interval: float = 5.0
+        ):
+        self.bot = bot
+        self.dp = dp
+        self.concurrency = concurrency
+        self.batch_size = min(100, batch_size)
+        self.max_age = max_age
+        self.progress_interval = progress_interval
+
+    def _too_old(self, update: Update) -> bool:
+        if self.max_age is None or update.message is None:
+            return False
+        age = (datetime.now(timezone.utc) - update.message.date).total_seconds()
+        return age > self.max_age
+
+    async def _process_batch(self, updates: List[Update], semaphore: asyncio.Semaphore, stats: Dict[str, Any]):
+        # Последняя задача каждого чата: следующая задача того же чата ждёт её
+        tails: Dict[Hashable, asyncio.Task] = {}
+
+        async def process(update: Update, previous: Optional[asyncio.Task]):
+            if previous is not None:
+                await asyncio.gather(previous, return_exceptions=True)
+            async with semaphore:
+                try:
+                    await self.dp.feed_update(self.bot, update)
+                    stats["processed"] += 1
+                except Exception as e:
+                    stats["failed"] += 1
+                    logger.error(f"Ошибка обработки накопившегося обновления {update.update_id}: {e}")
+
+        tasks = []
+        for update in updates:
+            if self._too_old(update):
+                stats["skipped"] += 1
+                continue
+            key = _chat_key(update)
+            previous = tails.get(key) if key is not None else None
+            task = asyncio.create_task(process(update, previous))
+            if key is not None:
+                tails[key] = task
+            tasks.append(task)
+        await asyncio.gather(*tasks)
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        Обрабатывает все накопившиеся обновления.
+        Возвращает {processed, skipped, failed, duration}.
+        """
+        started = time.monotonic()
+        stats: Dict[str, Any] = {"processed": 0, "skipped": 0, "failed": 0, "duration": 0.0}
+        pending = (await self.bot.get_webhook_info()).pending_update_count
+        if not pending:
+            return stats
+        logger.info(f"Догоняем накопившиеся обновления: около {pending}")
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        offset: Optional[int] = None
+        last_report = started
+        while True:
+            updates = await self.bot.get_updates(offset=offset, limit=self.batch_size, timeout=0)
+            if not updates:
+                break
+            await self._process_batch(updates, semaphore, stats)
+            offset = updates[-1].update_id + 1
+
+            now = time.monotonic()
+            if now - last_report >= self.progress_interval:
+                done = stats["processed"] + stats["skipped"] + stats["failed"]
+                rate = done / (now - started)
+                logger.info(f"Догоняем: {done} из ~{pending}, {rate:.0f} обновлений/с")
+                last_report = now
+
+        stats["duration"] = time.monotonic() - started
+        logger.info(
+            f"Накопившиеся обновления обработаны за {stats['duration']:.1f} с: обработано {stats['processed']}, "
+            f"пропущено устаревших {stats['skipped']}, с ошибкой {stats['failed']}"
+        )
+        return stats
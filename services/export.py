@@ -0,0 +1,115 @@
+"""
+Выгрузка отзывов в CSV или JSONL (по желанию — в gzip).
+
+Строки читаются из базы порциями через курсор и сразу пишутся в файл
+в потоке чтения базы, поэтому память не растёт с числом отзывов,
+а event loop не блокируется. Используется командой /export и из
+командной строки:
+
+    python -m services.export --format jsonl --gzip --from 2024-09-01 --answered -o reviews.jsonl.gz
+"""
+import argparse
+import asyncio
+import csv
+import gzip
+import io
+import json
+import os
+from datetime import datetime
+from typing import IO, List, Optional
+
+from database.db import EXPORT_COLUMNS, ReviewDB
+
+FORMATS = ("csv", "jsonl")
+
+
+class ExportFile:
+    """Файл выгрузки: принимает порции строк из ReviewDB.export_reviews."""
+
+    def __init__(self, path: str, fmt: str = "csv", compress: bool = False):
+        if fmt not in FORMATS:
+            raise ValueError(f"Неизвестный формат выгрузки: {fmt}")
+        self.path = path
+        self.fmt = fmt
+        self.compress = compress
+        self._file: Optional[IO[str]] = None
+        self._csv = None
+
+    def __enter__(self) -> "ExportFile":
+        # utf-8-sig, чтобы Excel открыл CSV с кириллицей без танцев с кодировкой
+        # (и после распаковки .csv.gz)
+        encoding = "utf-8-sig" if self.fmt == "csv" else "utf-8"
+        if self.compress:
+            self._file = io.TextIOWrapper(gzip.open(self.path, "wb"), encoding=encoding, newline="")
+        else:
+            self._file = open(self.path, "w", encoding=encoding, newline="")
+        if self.fmt == "csv":
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(EXPORT_COLUMNS)
+        return self
+
+    def __exit__(self, *exc_info):
+        self._file.close()
+
+    def __call__(self, rows: List[tuple]):
+        if self.fmt == "csv":
+            self._csv.writerows(rows)
+        else:
+            self._file.writelines(
+                json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False) + "\n" for row in rows
+            )
+
+
+def export_filename(fmt: str, compress: bool) -> str:
+    name = f"reviews-{datetime.now().strftime('%Y%m%d-%H%M')}.{fmt}"
+    return name + ".gz" if compress else name
+
+
+async def export_to_file(
+        db: ReviewDB,
+        path: str,
+        fmt: str = "csv",
+        compress: bool = False,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        answered: Optional[int] = None
+    ) -> int:
+    """Записывает отзывы в path и возвращает их количество."""
+    with ExportFile(path, fmt, compress) as sink:
+        return await db.export_reviews(sink, date_from=date_from, date_to=date_to, answered=answered)
+
+
+def _date(value: str) -> str:
+    datetime.strptime(value, "%Y-%m-%d")
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=os.getenv("DB_PATH", "reviews.db"), help="путь к базе (по умолчанию DB_PATH)")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--gzip", action="store_true", help="сжать выгрузку")
+    parser.add_argument("--from", dest="date_from", type=_date, help="с даты YYYY-MM-DD (UTC)")
+    parser.add_argument("--to", dest="date_to", type=_date, help="по дату YYYY-MM-DD включительно (UTC)")
+    status = parser.add_mutually_exclusive_group()
+    status.add_argument("--answered", dest="answered", action="store_const", const=1, help="только обработанные")
+    status.add_argument("--unanswered", dest="answered", action="store_const", const=0, help="только необработанные")
+    parser.add_argument("-o", "--output", help="файл выгрузки (по умолчанию reviews-<дата>.<формат>)")
+    args = parser.parse_args()
+
+    output = args.output or export_filename(args.format, args.gzip)
+    db = ReviewDB(args.db)
+    try:
+        total = asyncio.run(export_to_file(
+            db, output, args.format, args.gzip,
+            date_from=args.date_from, date_to=args.date_to, answered=args.answered,
+        ))
+    finally:
+        db.close()
+    print(f"Выгружено отзывов: {total} -> {output}")
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    main()
@@ -0,0 +1,112 @@
+import contextvars
+import logging
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from services.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Приоритеты исходящих сообщений: ответы посетителям и админам идут раньше фоновых
+INTERACTIVE = 0
+BULK = 1
+
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar("send_priority", default=INTERACTIVE)
+
+# Методы, на которые распространяются лимиты Telegram на отправку в чат
+LIMITED_PREFIXES = ("Send", "Copy", "Forward", "Edit")
+
+
+@contextmanager
+def bulk_traffic():
+    """Запросы к Bot API внутри блока считаются фоновыми и пропускают вперёд интерактивные."""
+    token = _priority.set(BULK)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class FloodControlMiddleware(BaseRequestMiddleware):
+    """
+    Middleware сессии Bot, соблюдающий лимиты Telegram на отправку.
+
+    Каждое сообщение берёт токен из общего bucket (по умолчанию 28 в секунду
+    на бота) и из bucket своего чата (около 1 в секунду в личке и 20 в минуту
+    в группах). Фоновые рассылки ждут общий токен после интерактивных ответов.
+    На TelegramRetryAfter отправка ставится на паузу на указанное время,
+    и запрос повторяется до max_retries раз — местам отправки не нужно
+    обрабатывать flood control самим.
+    """
+
+    def __init__(
+            self,
+            global_rate: float = 28,
+            chat_rate: float = 1,
+            chat_burst: float = 3,
+            group_rate: float = 20 / 60,
+            group_burst: float = 5,
+            max_retries: int = 3,
+            max_chats: int = 10_000
+        ):
+        # Без запаса на всплеск: Telegram считает сообщения в скользящем окне,
+        # и всплеск поверх полной скорости сразу упирается в лимит.
+        self.global_bucket = TokenBucket(global_rate, capacity=1)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.group_burst = group_burst
+        self.max_retries = max_retries
+        self.max_chats = max_chats
+        self._chats: Dict[int | str, TokenBucket] = {}
+
+    def _chat_bucket(self, chat_id: int | str) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= self.max_chats:
+                # Выбрасываем чаты, которые давно молчат: их bucket снова полон
+                for key in [k for k, b in self._chats.items() if b.idle]:
+                    del self._chats[key]
+            is_group = isinstance(chat_id, str) or chat_id < 0
+            bucket = TokenBucket(
+                self.group_rate if is_group else self.chat_rate,
+                self.group_burst if is_group else self.chat_burst,
+            )
+            self._chats[chat_id] = bucket
+        return bucket
+
+    async def __call__(
+            self,
+            make_request: NextRequestMiddlewareType[TelegramType],
+            bot: Bot,
+            method: TelegramMethod[TelegramType]
+        ) -> Response[TelegramType]:
+        name = type(method).__name__
+        chat_id: Optional[int | str] = getattr(method, "chat_id", None)
+        if not name.startswith(LIMITED_PREFIXES) or name == "SendChatAction":
+            return await make_request(bot, method)
+
+        priority = _priority.get()
+        chat_bucket = self._chat_bucket(chat_id) if chat_id is not None else None
+        attempt = 0
+        while True:
+            if chat_bucket is not None:
+                await chat_bucket.acquire(priority=priority)
+            await self.global_bucket.acquire(priority=priority)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                logger.warning(f"Flood control на {name} (чат {chat_id}), повтор через {e.retry_after} с")
+                # Из ответа не понять, превышен лимит чата или общий, поэтому ждут все
+                self.global_bucket.pause(e.retry_after)
+                if chat_bucket is not None:
+                    chat_bucket.pause(e.retry_after)
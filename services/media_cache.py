@@ -0,0 +1,111 @@
+import asyncio
+import hashlib
+import logging
+import os
+from typing import Dict, Iterable, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import FSInputFile, Message
+
+from database.media_db import MediaDB
+
+logger = logging.getLogger(__name__)
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class MediaCache:
+    """
+    Кэш file_id статических картинок.
+
+    Файл загружается в Telegram один раз, полученный file_id сохраняется
+    в базе по хэшу содержимого и дальше отправляется вместо самого файла.
+    Если файл на диске изменился, у него другой хэш и он будет загружен
+    заново; если Telegram отверг file_id — тоже. Одновременные отправки
+    ещё не загруженного файла ждут одну загрузку и используют её file_id.
+    """
+
+    def __init__(self, db: MediaDB):
+        self.db = db
+        # path -> (mtime_ns, size, sha256): хэш пересчитывается только при изменении файла
+        self._hashes: Dict[str, Tuple[int, int, str]] = {}
+        # sha256 -> file_id
+        self._file_ids: Dict[str, str] = {}
+        # sha256 -> блокировка загрузки; картинок немного, блокировки не удаляются
+        self._upload_locks: Dict[str, asyncio.Lock] = {}
+
+    async def _hash(self, path: str) -> str:
+        """Хэш содержимого файла. Бросает FileNotFoundError, если файла нет."""
+        stat = os.stat(path)
+        cached = self._hashes.get(path)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+        sha = await asyncio.to_thread(_sha256, path)
+        self._hashes[path] = (stat.st_mtime_ns, stat.st_size, sha)
+        return sha
+
+    async def _get_file_id(self, sha: str) -> str | None:
+        file_id = self._file_ids.get(sha)
+        if file_id is None:
+            file_id = await self.db.get_file_id(sha)
+            if file_id is not None:
+                self._file_ids[sha] = file_id
+        return file_id
+
+    async def _remember(self, sha: str, message: Message):
+        file_id = message.photo[-1].file_id
+        self._file_ids[sha] = file_id
+        await self.db.set_file_id(sha, file_id)
+
+    async def send_photo(self, bot: Bot, chat_id: int, path: str, **kwargs) -> Message:
+        """
+        Отправляет картинку по file_id, а если его ещё нет или он недействителен —
+        загружает файл и запоминает новый file_id.
+        """
+        sha = await self._hash(path)
+        file_id = await self._get_file_id(sha)
+        if file_id is not None:
+            try:
+                return await bot.send_photo(chat_id=chat_id, photo=file_id, **kwargs)
+            except TelegramBadRequest as e:
+                logger.warning(f"file_id для {path} отклонён, загружаем файл заново: {e}")
+                if self._file_ids.get(sha) == file_id:
+                    self._file_ids.pop(sha, None)
+                    await self.db.delete_file_id(sha)
+        rejected = file_id
+
+        async with self._upload_locks.setdefault(sha, asyncio.Lock()):
+            # Пока ждали блокировку, файл мог загрузить другой обработчик
+            file_id = self._file_ids.get(sha)
+            if file_id is not None and file_id != rejected:
+                return await bot.send_photo(chat_id=chat_id, photo=file_id, **kwargs)
+
+            message = await bot.send_photo(chat_id=chat_id, photo=FSInputFile(path), **kwargs)
+            await self._remember(sha, message)
+        logger.info(f"Файл {path} загружен в Telegram, file_id сохранён")
+        return message
+
+    async def prewarm(self, bot: Bot, chat_id: int, paths: Iterable[str]):
+        """
+        Загружает заранее файлы, для которых ещё нет file_id: отправляет их
+        в служебный чат (обычно админу) без звука и сразу удаляет сообщение.
+        """
+        for path in paths:
+            try:
+                sha = await self._hash(path)
+                async with self._upload_locks.setdefault(sha, asyncio.Lock()):
+                    if await self._get_file_id(sha) is not None:
+                        continue
+                    message = await bot.send_photo(chat_id=chat_id, photo=FSInputFile(path), disable_notification=True)
+                    await self._remember(sha, message)
+                await bot.delete_message(chat_id=chat_id, message_id=message.message_id)
+                logger.info(f"Файл {path} заранее загружен в Telegram")
+            except Exception as e:
+                logger.error(f"Не удалось заранее загрузить {path}: {e}")
@@ -0,0 +1,306 @@
+import bisect
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject, Update
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    """
+    Метрика с метками в духе prometheus_client. Значения обновляются из
+    event loop и из потоков базы, поэтому изменения идут под общей блокировкой.
+    """
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Sequence[str]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name}: ожидались метки {self.labelnames}, получено {labels}")
+        return tuple(str(v) for v in labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key: Tuple[str, ...], value: Any) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Текущее значение. Если задан collect, значения берутся из него в момент выдачи метрик."""
+    kind = "gauge"
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: Sequence[str] = (),
+            collect: Optional[Callable[[], Iterable[Tuple[Sequence[str], float]]]] = None
+        ):
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+
+    def set(self, value: float, *labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def render(self) -> List[str]:
+        if self.collect is not None:
+            try:
+                values = {self._key(labels): value for labels, value in self.collect()}
+            except Exception as e:
+                logger.error(f"Не удалось собрать метрику {self.name}: {e}")
+                values = {}
+            with self._lock:
+                self._values = values
+        return super().render()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: Sequence[str] = (),
+            buckets: Sequence[float] = DEFAULT_BUCKETS
+        ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [счётчики по корзинам..., сумма, количество]
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            if index < len(self.buckets):
+                state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def _render_value(self, key: Tuple[str, ...], state: list) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, state):
+            cumulative += count
+            le = 'le="' + _number(bound) + '"'
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+        le = 'le="+Inf"'
+        lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {state[-1]}")
+        lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(state[-2])}")
+        lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {state[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Регистрирует метрику; метрики объявляются один раз на уровне модуля."""
+        if any(existing.name == metric.name for existing in self._metrics):
+            raise ValueError(f"Метрика {metric.name} уже зарегистрирована")
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+UPDATE_LATENCY = registry.register(Histogram(
+    "bot_update_duration_seconds", "Полное время обработки обновления", ("event_type",)))
+UPDATE_ERRORS = registry.register(Counter(
+    "bot_update_errors_total", "Обновления, обработка которых завершилась исключением", ("event_type",)))
+HANDLER_LATENCY = registry.register(Histogram(
+    "bot_handler_duration_seconds", "Время работы хендлера", ("router", "handler")))
+HANDLER_ERRORS = registry.register(Counter(
+    "bot_handler_errors_total", "Исключения в хендлерах", ("router", "handler", "error")))
+ROUTER_LATENCY = registry.register(Histogram(
+    "bot_router_duration_seconds", "Время работы хендлеров роутера", ("router",)))
+DB_QUERY_LATENCY = registry.register(Histogram(
+    "bot_db_query_duration_seconds", "Время выполнения запросов к базе", ("query",)))
+API_LATENCY = registry.register(Histogram(
+    "bot_api_request_duration_seconds", "Время запросов к Telegram Bot API", ("method",)))
+API_ERRORS = registry.register(Counter(
+    "bot_api_request_errors_total", "Ошибки запросов к Telegram Bot API", ("method", "error")))
+
+# Хранилище FSM, которое подключил setup_metrics; метрики ниже читают его при выдаче
+_fsm_storage: Any = None
+
+
+def _storage_values(method: str) -> Iterable[Tuple[Sequence[str], float]]:
+    collect = getattr(_fsm_storage, method, None)
+    if collect is None:
+        return []
+    return [((key,), value) for key, value in collect().items()]
+
+
+FSM_STATES = registry.register(Gauge(
+    "bot_fsm_states", "Посетители в каждом состоянии FSM (по кэшу хранилища)", ("state",),
+    collect=lambda: _storage_values("state_counts"),
+))
+FSM_STORAGE_RECORDS = registry.register(Gauge(
+    "bot_fsm_storage_records", "Записи FSM в памяти: cached — всего, dirty — ещё не в базе", ("kind",),
+    collect=lambda: _storage_values("stats"),
+))
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """
+    Outer-middleware на dp.update: полное время обработки обновления
+    (фильтры, хранилище FSM, хендлер) и число упавших обновлений.
+    """
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+        ) -> Any:
+        event_type = event.event_type if isinstance(event, Update) else type(event).__name__
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            UPDATE_ERRORS.inc(event_type)
+            raise
+        finally:
+            UPDATE_LATENCY.observe(time.perf_counter() - started, event_type)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """
+    Middleware хендлеров: время и ошибки по каждому хендлеру и роутеру.
+    Регистрируется на наблюдателях диспетчера и действует во всех
+    вложенных роутерах.
+    """
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+        ) -> Any:
+        handler_object = data.get("handler")
+        router = data.get("event_router")
+        router_name = router.name if router is not None else "unknown"
+        handler_name = getattr(getattr(handler_object, "callback", None), "__name__", "unknown")
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception as e:
+            HANDLER_ERRORS.inc(router_name, handler_name, type(e).__name__)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            HANDLER_LATENCY.observe(elapsed, router_name, handler_name)
+            ROUTER_LATENCY.observe(elapsed, router_name)
+
+
+class ApiMetricsMiddleware(BaseRequestMiddleware):
+    """Middleware сессии Bot: время и ошибки каждого запроса к Bot API."""
+
+    async def __call__(
+            self,
+            make_request: NextRequestMiddlewareType[TelegramType],
+            bot: Bot,
+            method: TelegramMethod[TelegramType]
+        ) -> Response[TelegramType]:
+        name = type(method).__name__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            API_ERRORS.inc(name, type(e).__name__)
+            raise
+        finally:
+            API_LATENCY.observe(time.perf_counter() - started, name)
+
+
+def setup_metrics(dp: Dispatcher, bot: Bot, db) -> None:
+    """Подключает сбор метрик к диспетчеру, сессии бота, базе и FSM-хранилищу."""
+    dp.update.outer_middleware(UpdateMetricsMiddleware())
+    handler_middleware = HandlerMetricsMiddleware()
+    for observer in (dp.message, dp.callback_query):
+        observer.middleware(handler_middleware)
+    bot.session.middleware(ApiMetricsMiddleware())
+    db.add_query_listener(lambda name, seconds: DB_QUERY_LATENCY.observe(seconds, name))
+
+    global _fsm_storage
+    _fsm_storage = dp.storage
+
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(
+        body=registry.render().encode("utf-8"),
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+    )
+
+
+async def start_metrics_server(host: str, port: int) -> web.AppRunner:
+    """Поднимает HTTP-сервер с GET /metrics в формате Prometheus."""
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"Метрики доступны на http://{host}:{port}/metrics")
+    return runner
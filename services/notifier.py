@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+
+from database.outbox_db import OutboxDB
+from services.flood_control import bulk_traffic
+
+logger = logging.getLogger(__name__)
+
+
+class AdminNotifier:
+    """
+    Фоновый диспетчер outbox-уведомлений.
+
+    Забирает из notification_outbox уведомления, срок которых наступил,
+    отправляет их всем админам параллельно и удаляет отправленные.
+    При временной ошибке попытка откладывается с экспоненциальной задержкой,
+    поэтому уведомление не теряется, пока его не удастся доставить.
+    Ошибки, которые повтор не исправит (бот заблокирован, чат не найден,
+    некорректное сообщение), и уведомления, не доставленные за
+    max_attempts попыток, помечаются failed и больше не отправляются.
+    """
+
+    def __init__(
+            self,
+            db: OutboxDB,
+            send: Callable[[int, int], Awaitable[None]],
+            poll_interval: float = 5.0,
+            backoff_base: float = 2.0,
+            backoff_max: float = 600.0,
+            batch_size: int = 50,
+            max_attempts: int = 20
+        ):
+        """
+        :param db: Хранилище outbox
+        :param send: Корутина send(review_id, admin_id), бросающая исключение при неудаче
+        :param poll_interval: Как часто проверять очередь, если никто не разбудил
+        :param max_attempts: После скольких неудачных попыток уведомление помечается failed
+        """
+        self.db = db
+        self.send = send
+        self.poll_interval = poll_interval
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def wake(self):
+        """Сообщает диспетчеру, что в outbox появились новые записи."""
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                due = await self.db.get_due(self.batch_size)
+                if due:
+                    await asyncio.gather(*(self._deliver(*row) for row in due))
+                    continue
+                timeout = self.poll_interval
+                next_due = await self.db.next_due_at()
+                if next_due is not None:
+                    timeout = min(timeout, max(0.0, next_due - time.time()))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка диспетчера уведомлений: {e}")
+                timeout = self.poll_interval
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _deliver(self, outbox_id: int, review_id: int, admin_id: int, attempts: int):
+        attempts += 1
+        try:
+            with bulk_traffic():
+                await self.send(review_id, admin_id)
+        except TelegramRetryAfter as e:
+            await self.db.reschedule(outbox_id, attempts, e.retry_after, str(e))
+        except (TelegramForbiddenError, TelegramBadRequest) as e:
+            logger.error(f"Telegram отклонил уведомление админу {admin_id} о отзыве #{review_id}, повтора не будет: {e}")
+            await self.db.mark_failed(outbox_id, attempts, str(e))
+        except Exception as e:
+            if attempts >= self.max_attempts:
+                logger.error(
+                    f"Уведомление админу {admin_id} о отзыве #{review_id} не доставлено "
+                    f"за {attempts} попыток: {e}"
+                )
+                await self.db.mark_failed(outbox_id, attempts, str(e))
+                return
+            delay = min(self.backoff_max, self.backoff_base ** attempts)
+            logger.warning(
+                f"Ошибка уведомления админа {admin_id} о отзыве #{review_id} "
+                f"(попытка {attempts}), повтор через {delay:.0f} с: {e}"
+            )
+            await self.db.reschedule(outbox_id, attempts, delay, str(e))
+        else:
+            await self.db.mark_sent(outbox_id)
+            logger.info(f"Отправлено уведомление админу {admin_id} о отзыве #{review_id}")
@@ -0,0 +1,81 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import List, Tuple
+
+
+class TokenBucket:
+    """
+    Асинхронный token bucket: не больше rate операций в секунду
+    с допустимым всплеском capacity.
+
+    Ожидающие получают токены по приоритету (меньше — раньше), а при
+    равном приоритете — в порядке обращения. pause() останавливает
+    выдачу токенов всем ожидающим — так выполняется требование
+    Telegram подождать после TelegramRetryAfter.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._waiters: List[Tuple[int, int, float, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._dispatcher: asyncio.Task | None = None
+
+    def _refill(self, now: float):
+        if now > self._updated:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def pause(self, seconds: float):
+        """Запрещает выдачу токенов на seconds секунд."""
+        now = time.monotonic()
+        self._paused_until = max(self._paused_until, now + seconds)
+        self._tokens = 0
+        self._updated = max(self._updated, self._paused_until)
+
+    @property
+    def idle(self) -> bool:
+        """Никто не ждёт и запас токенов полный — такой bucket можно выбросить."""
+        self._refill(time.monotonic())
+        return not self._waiters and self._tokens >= self.capacity
+
+    async def acquire(self, tokens: float = 1, priority: int = 0):
+        now = time.monotonic()
+        if not self._waiters and now >= self._paused_until:
+            self._refill(now)
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), tokens, future))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        await future
+
+    async def _dispatch(self):
+        """Выдаёт токены ожидающим, пока очередь не опустеет."""
+        while self._waiters:
+            _, _, tokens, future = self._waiters[0]
+            if future.done():
+                # Ожидание отменили
+                heapq.heappop(self._waiters)
+                continue
+            now = time.monotonic()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            self._refill(now)
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                heapq.heappop(self._waiters)
+                future.set_result(None)
+                continue
+            # Пока ждём, в очередь может встать кто-то с более высоким
+            # приоритетом — после сна снова смотрим на голову очереди.
+            await asyncio.sleep((tokens - self._tokens) / self.rate)
@@ -0,0 +1,71 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List
+
+from services.metrics import Counter, Gauge, registry
+
+# Все созданные кэши — для метрики числа записей
+_caches: List["RenderCache"] = []
+
+RENDER_CACHE_HITS = registry.register(Counter(
+    "bot_render_cache_hits_total", "Представления отзывов, выданные из кэша", ("cache",),
+))
+RENDER_CACHE_MISSES = registry.register(Counter(
+    "bot_render_cache_misses_total", "Представления отзывов, отрисованные заново", ("cache",),
+))
+RENDER_CACHE_ENTRIES = registry.register(Gauge(
+    "bot_render_cache_entries", "Записей в кэше отрисованных отзывов", ("cache",),
+    collect=lambda: [((cache.name,), cache.stats()["entries"]) for cache in all_caches()],
+))
+
+
+class RenderCache:
+    """
+    LRU-кэш готовых к отправке представлений отзывов (текст карточки,
+    клавиатура уведомления и т.п.).
+
+    Запись ищется по id отзыва и версии: отзыв меняется только при ответе
+    администратора, поэтому версией служит признак answered, и устаревшая
+    запись никогда не будет выдана, даже если её забыли сбросить.
+    invalidate() вызывается при ответе на отзыв и сразу освобождает память.
+    Хранится не больше maxsize записей, вытесняются давно не запрошенные.
+    """
+
+    def __init__(self, name: str, maxsize: int = 2000):
+        self.name = name
+        self.maxsize = maxsize
+        # review_id -> (version, value); используется только из event loop, без блокировок
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        _caches.append(self)
+
+    def get_or_render(self, review_id: Hashable, version: Hashable, render: Callable[[], Any]) -> Any:
+        """Готовое представление из кэша или результат render(), который кэшируется."""
+        entry = self._entries.get(review_id)
+        if entry is not None and entry[0] == version:
+            self._entries.move_to_end(review_id)
+            self.hits += 1
+            RENDER_CACHE_HITS.inc(self.name)
+            return entry[1]
+        self.misses += 1
+        RENDER_CACHE_MISSES.inc(self.name)
+
+        value = render()
+        self._entries[review_id] = (version, value)
+        self._entries.move_to_end(review_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, review_id: Hashable):
+        self._entries.pop(review_id, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+def all_caches() -> List[RenderCache]:
+    return list(_caches)
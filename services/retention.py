@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from database.db import ReviewDB
+
+logger = logging.getLogger(__name__)
+
+
+class RetentionJob:
+    """
+    Фоновое обслуживание таблицы отзывов.
+
+    Раз в interval секунд переносит в архив (reviews_archive) отзывы, на
+    которые ответили больше archive_after дней назад, — так /reviews,
+    /all_reviews и уведомления работают с небольшой таблицей, а поиск
+    и выгрузка по-прежнему видят все отзывы. Перенос идёт порциями по
+    batch_size, каждая — отдельная транзакция, поэтому запись отзывов
+    посетителей не ждёт весь перенос. После переноса выполняются ANALYZE
+    и checkpoint WAL, а раз в vacuum_interval секунд — VACUUM; всё это
+    в потоке записи базы, не в event loop.
+    """
+
+    def __init__(
+            self,
+            db: ReviewDB,
+            archive_after_days: float = 90,
+            interval: float = 6 * 60 * 60,
+            batch_size: int = 500,
+            vacuum_interval: Optional[float] = 7 * 24 * 60 * 60
+        ):
+        """
+        :param archive_after_days: Через сколько дней после ответа отзыв уходит в архив (0 — не архивировать)
+        :param vacuum_interval: Как часто делать VACUUM, секунд (None или 0 — никогда)
+        """
+        self.db = db
+        self.archive_after_days = archive_after_days
+        self.interval = interval
+        self.batch_size = batch_size
+        self.vacuum_interval = vacuum_interval
+        # Первый VACUUM — не сразу после запуска, а через vacuum_interval
+        self._last_vacuum = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def run_once(self) -> Dict[str, Any]:
+        """Один проход: архивирование и обслуживание базы. Возвращает отчёт."""
+        archived = 0
+        if self.archive_after_days > 0:
+            cutoff = datetime.now(timezone.utc) - timedelta(days=self.archive_after_days)
+            answered_before = cutoff.strftime("%Y-%m-%d %H:%M:%S")
+            while True:
+                moved = await self.db.archive_answered(answered_before, self.batch_size)
+                archived += moved
+                if moved < self.batch_size:
+                    break
+
+        vacuum = bool(self.vacuum_interval) and time.monotonic() - self._last_vacuum >= self.vacuum_interval
+        report = await self.db.maintenance(vacuum=vacuum)
+        if vacuum:
+            self._last_vacuum = time.monotonic()
+        report["archived"] = archived
+
+        logger.info(
+            f"Обслуживание базы: в архив перенесено {archived}, ANALYZE {report['analyze']:.2f} с, "
+            f"checkpoint {report['checkpoint']:.2f} с"
+            + (f", VACUUM {report['vacuum']:.2f} с" if vacuum else "")
+        )
+        if report["checkpoint_busy"]:
+            logger.warning("Checkpoint WAL выполнен не полностью: базу в этот момент читали")
+        return report
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка обслуживания базы: {e}")
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,266 @@
+"""
+Опросы посетителей, описанные в JSON (config/surveys.json).
+
+Файл читается и компилируется один раз при старте: для каждого вопроса
+заранее создаются состояние FSM, текст и клавиатура, а для кнопок —
+готовые callback_data. Во время опроса хендлеры только ищут шаг по
+состоянию или по нажатой кнопке в словарях каталога, ничего не собирая
+заново. Одновременно может идти несколько опросов (например, по разным
+выставкам) — нужный выбирается параметром ссылки t.me/<бот>?start=<id>.
+
+Формат файла:
+
+    {
+      "default": "<id опроса для /start без параметра>",
+      "surveys": [{
+        "id": "<латиница, цифры, _ и ->",
+        "title": "...",
+        "state_group": "<необязательно, префикс состояний FSM>",
+        "welcome": {"photo": "<путь от корня проекта, необязательно>", "text": "..."},
+        "questions": [
+          {"field": "source", "text": "...", "options": [
+              {"text": "...", "value": "<необязательно, по умолчанию text>"},
+              {"text": "Свой вариант", "custom": {"text": "<просьба ввести ответ>"}}
+          ]},
+          {"field": "free_review", "text": "..."}
+        ],
+        "finish": "..."
+      }]
+    }
+
+Тексты отправляются с parse_mode HTML, поэтому символы <, > и & в них
+нужно экранировать. Ответ на вопрос сохраняется в одноимённую колонку отзыва, поэтому field —
+одно из REVIEW_FIELDS, и каждое поле спрашивается в опросе не больше раза.
+Префикс callback_data кнопок (callback_prefix вопроса, по умолчанию
+«<id опроса>_q<номер>») не может начинаться с RESERVED_CALLBACK_PREFIXES.
+"""
+import json
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from aiogram.fsm.state import State
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+# Колонки отзыва, которые заполняются ответами на вопросы опроса
+REVIEW_FIELDS = ("source", "free_review", "subject")
+
+# Параметр deep-link: до 64 символов из A-Z, a-z, 0-9, _ и -
+SURVEY_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+CALLBACK_DATA_LIMIT = 64
+# Префиксы callback_data админских кнопок (routers/start_router/start_r.py):
+# кнопки опроса с такими префиксами перехватывались бы хендлерами админов
+RESERVED_CALLBACK_PREFIXES = ("answer_", "page_", "search_")
+
+
+class SurveyStep:
+    """Шаг опроса: состояние, в котором бот ждёт ответа, и готовое сообщение с вопросом."""
+
+    __slots__ = ("survey", "index", "field", "state", "text", "reply_markup", "options")
+
+    def __init__(
+            self,
+            survey: "Survey",
+            index: int,
+            field: str,
+            state: State,
+            text: str,
+            reply_markup: Optional[InlineKeyboardMarkup] = None
+        ):
+        self.survey = survey
+        # Номер вопроса в опросе; у шага «свой вариант» — номер вопроса, к которому он относится
+        self.index = index
+        self.field = field
+        self.state = state
+        self.text = text
+        self.reply_markup = reply_markup
+        self.options: Tuple["SurveyOption", ...] = ()
+
+
+class SurveyOption:
+    """Вариант ответа на кнопке. custom — шаг, на котором посетитель вводит свой вариант."""
+
+    __slots__ = ("step", "value", "callback_data", "custom")
+
+    def __init__(self, step: SurveyStep, value: str, callback_data: str, custom: Optional[SurveyStep] = None):
+        self.step = step
+        self.value = value
+        self.callback_data = callback_data
+        self.custom = custom
+
+
+class Survey:
+
+    __slots__ = ("id", "title", "welcome_photo", "welcome_text", "finish_text", "steps")
+
+    def __init__(
+            self,
+            survey_id: str,
+            title: str,
+            welcome_photo: Optional[str],
+            welcome_text: str,
+            finish_text: str
+        ):
+        self.id = survey_id
+        self.title = title
+        self.welcome_photo = welcome_photo
+        self.welcome_text = welcome_text
+        self.finish_text = finish_text
+        self.steps: Tuple[SurveyStep, ...] = ()
+
+    def next_step(self, step: SurveyStep) -> Optional[SurveyStep]:
+        """Следующий вопрос после step или None, если опрос закончен."""
+        index = step.index + 1
+        return self.steps[index] if index < len(self.steps) else None
+
+
+class SurveyCatalog:
+    """Скомпилированные опросы и индексы для хендлеров."""
+
+    def __init__(self, surveys: Iterable[Survey], default_id: str):
+        self.surveys: Dict[str, Survey] = {survey.id: survey for survey in surveys}
+        self.default = self.surveys[default_id]
+        self._steps: Dict[str, SurveyStep] = {}
+        self._options: Dict[str, SurveyOption] = {}
+        text_states: List[State] = []
+
+        for survey in self.surveys.values():
+            for step in survey.steps:
+                self._add_step(step)
+                if not step.options:
+                    text_states.append(step.state)
+                for option in step.options:
+                    if option.callback_data in self._options:
+                        raise ValueError(f"Повторяется callback_data «{option.callback_data}» в опросе {survey.id}")
+                    self._options[option.callback_data] = option
+                    if option.custom is not None:
+                        self._add_step(option.custom)
+                        text_states.append(option.custom.state)
+
+        # Состояния, в которых ждём текстовый ответ, — для фильтра хендлера
+        self.text_states: Tuple[State, ...] = tuple(text_states)
+
+    def _add_step(self, step: SurveyStep):
+        if step.state.state in self._steps:
+            raise ValueError(f"Повторяется состояние {step.state.state} в опросе {step.survey.id}")
+        self._steps[step.state.state] = step
+
+    def get(self, survey_id: Optional[str]) -> Survey:
+        """Опрос по параметру /start; неизвестный или пустой параметр — опрос по умолчанию."""
+        return self.surveys.get(survey_id or "", self.default)
+
+    def step(self, raw_state: Optional[str]) -> Optional[SurveyStep]:
+        return self._steps.get(raw_state) if raw_state else None
+
+    def option(self, callback_data: Optional[str]) -> Optional[SurveyOption]:
+        return self._options.get(callback_data) if callback_data else None
+
+    def is_option(self, callback_data: Optional[str]) -> bool:
+        return callback_data in self._options
+
+    def photo_paths(self) -> List[str]:
+        return sorted({survey.welcome_photo for survey in self.surveys.values() if survey.welcome_photo})
+
+
+def _required_text(config: dict, key: str, where: str) -> str:
+    value = config.get(key)
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError(f"{where}: не задан текст «{key}»")
+    return value
+
+
+def _compile_question(survey: Survey, state_group: str, index: int, question: dict) -> SurveyStep:
+    where = f"Опрос {survey.id}, вопрос {index + 1}"
+    field = question.get("field")
+    if field not in REVIEW_FIELDS:
+        raise ValueError(f"{where}: field должно быть одним из {', '.join(REVIEW_FIELDS)}, а не {field!r}")
+
+    step = SurveyStep(
+        survey, index, field,
+        State(question.get("state") or f"q{index + 1}", group_name=state_group),
+        _required_text(question, "text", where),
+    )
+
+    options = []
+    prefix = question.get("callback_prefix") or f"{survey.id}_q{index + 1}"
+    if f"{prefix}_".startswith(RESERVED_CALLBACK_PREFIXES):
+        raise ValueError(
+            f"{where}: префикс callback_data «{prefix}» занят командами админов "
+            f"({', '.join(RESERVED_CALLBACK_PREFIXES)}), задайте другой callback_prefix"
+        )
+    for number, option in enumerate(question.get("options") or (), start=1):
+        text = _required_text(option, "text", f"{where}, вариант {number}")
+        callback_data = f"{prefix}_{number}"
+        if len(callback_data.encode()) > CALLBACK_DATA_LIMIT:
+            raise ValueError(f"{where}: callback_data «{callback_data}» длиннее {CALLBACK_DATA_LIMIT} байт")
+        custom = None
+        if option.get("custom"):
+            custom_config = option["custom"]
+            custom = SurveyStep(
+                survey, index, field,
+                State(custom_config.get("state") or f"q{index + 1}_custom", group_name=state_group),
+                _required_text(custom_config, "text", f"{where}, вариант {number}"),
+            )
+        options.append(SurveyOption(step, option.get("value") or text, callback_data, custom))
+
+    if options:
+        step.options = tuple(options)
+        step.reply_markup = InlineKeyboardMarkup(inline_keyboard=[
+            [InlineKeyboardButton(text=option["text"], callback_data=compiled.callback_data)]
+            for option, compiled in zip(question["options"], options)
+        ])
+    return step
+
+
+def compile_survey(config: dict, base_dir: str) -> Survey:
+    """Собирает опрос из его описания; ошибки в описании — ValueError."""
+    survey_id = config.get("id")
+    if not isinstance(survey_id, str) or not SURVEY_ID_RE.match(survey_id):
+        raise ValueError(f"Некорректный id опроса {survey_id!r}: нужны 1-64 символа A-Z, a-z, 0-9, _ и -")
+
+    welcome = config.get("welcome") or {}
+    photo = welcome.get("photo")
+    survey = Survey(
+        survey_id,
+        config.get("title") or survey_id,
+        os.path.join(base_dir, photo) if photo else None,
+        _required_text(welcome, "text", f"Опрос {survey_id}, приветствие"),
+        _required_text(config, "finish", f"Опрос {survey_id}"),
+    )
+
+    questions = config.get("questions") or ()
+    if not questions:
+        raise ValueError(f"Опрос {survey_id}: нет вопросов")
+    fields = [question.get("field") for question in questions]
+    if len(set(fields)) != len(fields):
+        raise ValueError(f"Опрос {survey_id}: одно поле спрашивается несколько раз")
+
+    state_group = config.get("state_group") or f"survey_{survey_id}"
+    survey.steps = tuple(
+        _compile_question(survey, state_group, index, question)
+        for index, question in enumerate(questions)
+    )
+    return survey
+
+
+def compile_surveys(config: dict, base_dir: str) -> SurveyCatalog:
+    surveys = [compile_survey(survey, base_dir) for survey in config.get("surveys") or ()]
+    if not surveys:
+        raise ValueError("Не описано ни одного опроса")
+    ids = [survey.id for survey in surveys]
+    if len(set(ids)) != len(ids):
+        raise ValueError("Повторяется id опроса")
+    default_id = config.get("default") or ids[0]
+    if default_id not in ids:
+        raise ValueError(f"Опрос по умолчанию {default_id!r} не описан")
+    return SurveyCatalog(surveys, default_id)
+
+
+def load_surveys(path: str, base_dir: str) -> SurveyCatalog:
+    """
+    Читает и компилирует файл опросов. Пути к фото в нём указываются
+    относительно base_dir (корня проекта).
+    """
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    return compile_surveys(config, base_dir)
@@ -0,0 +1,176 @@
+"""
+Разбор русских ответов посетителей для аналитики тем (services/topics.py).
+
+Без внешних зависимостей: токенизация регулярным выражением, стоп-слова
+и стеммер Портера для русского языка (алгоритм Snowball), который сводит
+«современное», «современного» и «современному» к одной основе «современ».
+"""
+import re
+from typing import Dict, List, Optional, Tuple
+
+VOWELS = "аеиоуыэюя"
+
+# Окончания алгоритма Snowball. Окончания групп *_AFTER_A_YA удаляются,
+# только если перед ними стоит «а» или «я» (сама буква остаётся).
+PERFECTIVE_GERUND_AFTER_A_YA = ("вшись", "вши", "в")
+PERFECTIVE_GERUND = ("ившись", "ывшись", "ивши", "ывши", "ив", "ыв")
+ADJECTIVE = (
+    "ими", "ыми", "его", "ого", "ему", "ому", "ее", "ие", "ые", "ое", "ей", "ий", "ый", "ой",
+    "ем", "им", "ым", "ом", "их", "ых", "ую", "юю", "ая", "яя", "ою", "ею",
+)
+PARTICIPLE_AFTER_A_YA = ("ем", "нн", "вш", "ющ", "щ")
+PARTICIPLE = ("ивш", "ывш", "ующ")
+REFLEXIVE = ("ся", "сь")
+VERB_AFTER_A_YA = ("ете", "йте", "ешь", "нно", "ла", "на", "ли", "ем", "ло", "но", "ет", "ют", "ны", "ть", "й", "л", "н")
+VERB = (
+    "ейте", "уйте", "ила", "ыла", "ена", "ите", "или", "ыли", "ило", "ыло", "ено", "ует", "уют",
+    "ены", "ить", "ыть", "ишь", "ей", "уй", "ил", "ыл", "им", "ым", "ен", "ят", "ит", "ыт", "ую", "ю",
+)
+NOUN = (
+    "иями", "ями", "ами", "ией", "иям", "ием", "иях", "ев", "ов", "ие", "ье", "еи", "ии", "ей", "ой",
+    "ий", "ям", "ем", "ам", "ом", "ах", "ях", "ию", "ью", "ия", "ья", "а", "е", "и", "й", "о", "у",
+    "ы", "ь", "ю", "я",
+)
+SUPERLATIVE = ("ейше", "ейш")
+DERIVATIONAL = ("ость", "ост")
+
+STOP_WORDS = frozenset("""
+а без более бы был была были было быть в вам вас весь во вот все всего всех вы где да даже для до его
+ее ей ему если есть еще же за здесь и из или им их к как какие какой когда кто ли либо мне много может
+можно мой мы на над надо наш не него нее нет ни них но ну о об однако он она они оно от очень по под
+после при про раз с со так также такие такой там те тем то того тоже той только том ты у уже хотя чего
+чей чем что чтобы чье эта эти это этого этой этом этот я
+больше меньше хотел хотела хотелось хотели хочу хотим интересно интересные интересная
+интересный разные разных любые любой какие-нибудь какую-нибудь например тема темы тему темах
+выставка выставки выставку выставок выставках выставкой будущем незнаю не-знаю знаю затрудняюсь
+ничего нечего всякое разное побольше поменьше что-нибудь что-то какой-нибудь какая-нибудь
+""".split())
+
+TOKEN_RE = re.compile(r"[а-яa-z0-9]+(?:-[а-яa-z0-9]+)*")
+CYRILLIC_RE = re.compile(r"[а-я]+$")
+# Разделители фраз: словосочетание не может их пересекать
+CLAUSE_RE = re.compile(r"[.,;:!?()\[\]\"«»„“”/\\|\n—–]+|\s-\s")
+MIN_TOKEN_LENGTH = 3
+
+
+def _regions(word: str) -> Tuple[int, int]:
+    """Начало RV и R2 (индексы в слове) по определению Snowball."""
+    rv = len(word)
+    for i, char in enumerate(word):
+        if char in VOWELS:
+            rv = i + 1
+            break
+
+    def next_region(start: int) -> int:
+        for i in range(start + 1, len(word)):
+            if word[i] not in VOWELS and word[i - 1] in VOWELS:
+                return i + 1
+        return len(word)
+
+    r1 = next_region(0)
+    return rv, next_region(r1)
+
+
+def _strip(rv: str, endings: Tuple[str, ...], after_a_ya: Tuple[str, ...] = ()) -> Optional[str]:
+    """
+    Удаляет самое длинное окончание из endings/after_a_ya, найденное в конце rv.
+    None — подходящего окончания нет (или перед окончанием группы after_a_ya не «а»/«я»).
+    """
+    best, needs_a_ya = "", False
+    for ending in endings:
+        if len(ending) > len(best) and rv.endswith(ending):
+            best, needs_a_ya = ending, False
+    for ending in after_a_ya:
+        if len(ending) > len(best) and rv.endswith(ending):
+            best, needs_a_ya = ending, True
+    if not best:
+        return None
+    if needs_a_ya and (len(rv) == len(best) or rv[-len(best) - 1] not in "ая"):
+        return None
+    return rv[:-len(best)]
+
+
+def stem(word: str) -> str:
+    """Основа русского слова по алгоритму Snowball; слово должно быть в нижнем регистре, «ё» → «е»."""
+    rv_start, r2_start = _regions(word)
+    prefix, rv = word[:rv_start], word[rv_start:]
+
+    # Шаг 1
+    stripped = _strip(rv, PERFECTIVE_GERUND, PERFECTIVE_GERUND_AFTER_A_YA)
+    if stripped is not None:
+        rv = stripped
+    else:
+        stripped = _strip(rv, REFLEXIVE)
+        if stripped is not None:
+            rv = stripped
+        stripped = _strip(rv, ADJECTIVE)
+        if stripped is not None:
+            # Прилагательное может быть окончанием причастия: «-ующ-ий»
+            participle = _strip(stripped, PARTICIPLE, PARTICIPLE_AFTER_A_YA)
+            rv = stripped if participle is None else participle
+        else:
+            stripped = _strip(rv, VERB, VERB_AFTER_A_YA)
+            if stripped is None:
+                stripped = _strip(rv, NOUN)
+            if stripped is not None:
+                rv = stripped
+
+    # Шаг 2
+    if rv.endswith("и"):
+        rv = rv[:-1]
+
+    # Шаг 3: словообразовательное окончание — только в R2
+    r2 = max(0, r2_start - rv_start)
+    stripped = _strip(rv[r2:], DERIVATIONAL) if r2 <= len(rv) else None
+    if stripped is not None:
+        rv = rv[:r2] + stripped
+
+    # Шаг 4
+    if rv.endswith("нн"):
+        rv = rv[:-1]
+    else:
+        stripped = _strip(rv, SUPERLATIVE)
+        if stripped is not None:
+            rv = stripped[:-1] if stripped.endswith("нн") else stripped
+        elif rv.endswith("ь"):
+            rv = rv[:-1]
+
+    return prefix + rv
+
+
+def normalize(text: str) -> str:
+    return text.lower().replace("ё", "е")
+
+
+def tokenize(text: str) -> List[List[str]]:
+    """Фразы текста (по знакам препинания), каждая — список слов в нижнем регистре."""
+    clauses = []
+    for clause in CLAUSE_RE.split(normalize(text)):
+        words = TOKEN_RE.findall(clause)
+        if words:
+            clauses.append(words)
+    return clauses
+
+
+def extract_terms(text: str) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    Термины ответа: ({основа: словоформа}, {«основа1 основа2»: «форма1 форма2»}).
+    Словосочетание — два значимых слова подряд в одной фразе; стоп-слово
+    между ними («природа и город») разрывает пару. Каждый термин
+    учитывается один раз на ответ.
+    """
+    terms: Dict[str, str] = {}
+    bigrams: Dict[str, str] = {}
+    for words in tokenize(text):
+        previous: Optional[Tuple[str, str]] = None
+        for word in words:
+            if word in STOP_WORDS or len(word) < MIN_TOKEN_LENGTH or word.isdigit():
+                previous = None
+                continue
+            # Латиница и слова через дефис («поп-арт») не стеммируются
+            term = stem(word) if "-" not in word and CYRILLIC_RE.match(word) else word
+            terms.setdefault(term, word)
+            if previous is not None and previous[0] != term:
+                bigrams.setdefault(f"{previous[0]} {term}", f"{previous[1]} {word}")
+            previous = (term, word)
+    return terms, bigrams
@@ -0,0 +1,139 @@
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import CallbackQuery, Message, TelegramObject
+
+from services.metrics import Counter, registry
+
+logger = logging.getLogger(__name__)
+
+THROTTLED_UPDATES = registry.register(Counter(
+    "bot_throttled_updates_total",
+    "Обновления, отброшенные антифлудом: dropped — сверх лимита, merged — повтор того же действия",
+    ("handler", "action"),
+))
+
+
+class _UserWindow:
+    """Скользящее окно одного пользователя: стоимость принятых обновлений за последние window секунд."""
+
+    __slots__ = ("events", "used", "last_key", "last_at", "seen_at", "warned_at")
+
+    def __init__(self):
+        self.events: Deque[Tuple[float, float]] = deque()
+        self.used = 0.0
+        self.last_key: Optional[tuple] = None
+        self.last_at = 0.0
+        self.seen_at = 0.0
+        self.warned_at: Optional[float] = None
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Антифлуд для точек входа посетителей.
+
+    У каждого пользователя скользящее окно window секунд, в котором суммарная
+    стоимость принятых обновлений не больше limit. Стоимость задаётся флагом
+    хендлера throttling_cost (по умолчанию 1): дорогой /start с фото стоит
+    больше, чем нажатие кнопки. Обновление сверх лимита отбрасывается
+    (пользователь один раз за окно получает предупреждение). У хендлеров
+    с флагом throttling_merge повтор того же действия (та же команда или
+    кнопка) чаще чем раз в merge_interval секунд сливается с предыдущим
+    и не обрабатывается; текстовые ответы не сливаются никогда. Окна пользователей, которые
+    молчат дольше idle_ttl секунд, удаляются; одновременно хранится не больше
+    max_users окон.
+    """
+
+    def __init__(
+            self,
+            limit: float = 20,
+            window: float = 60.0,
+            merge_interval: float = 2.0,
+            idle_ttl: float = 600.0,
+            max_users: int = 100_000
+        ):
+        self.limit = limit
+        self.window = window
+        self.merge_interval = merge_interval
+        self.idle_ttl = idle_ttl
+        self.max_users = max_users
+        # user_id -> окно; порядок — по времени последнего обновления
+        self._users: "OrderedDict[int, _UserWindow]" = OrderedDict()
+        self.dropped = 0
+        self.merged = 0
+
+    def _evict(self, now: float):
+        while self._users:
+            user_id, user_window = next(iter(self._users.items()))
+            if now - user_window.seen_at <= self.idle_ttl and len(self._users) <= self.max_users:
+                break
+            del self._users[user_id]
+
+    def _user_window(self, user_id: int, now: float) -> _UserWindow:
+        user_window = self._users.get(user_id)
+        if user_window is None:
+            user_window = self._users[user_id] = _UserWindow()
+        else:
+            self._users.move_to_end(user_id)
+        user_window.seen_at = now
+
+        while user_window.events and now - user_window.events[0][0] >= self.window:
+            _, cost = user_window.events.popleft()
+            user_window.used -= cost
+        return user_window
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+        ) -> Any:
+        user = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+
+        now = time.monotonic()
+        self._evict(now)
+        user_window = self._user_window(user.id, now)
+
+        handler_object = data.get("handler")
+        handler_name = getattr(getattr(handler_object, "callback", None), "__name__", "unknown")
+        key = None
+        if get_flag(data, "throttling_merge", default=False):
+            payload = event.data if isinstance(event, CallbackQuery) else getattr(event, "text", None)
+            key = (handler_name, payload)
+
+        if key is not None and key == user_window.last_key and now - user_window.last_at < self.merge_interval:
+            self.merged += 1
+            THROTTLED_UPDATES.inc(handler_name, "merged")
+            if isinstance(event, CallbackQuery):
+                await event.answer()
+            return None
+
+        cost = get_flag(data, "throttling_cost", default=1)
+        if user_window.used + cost > self.limit:
+            self.dropped += 1
+            THROTTLED_UPDATES.inc(handler_name, "dropped")
+            if user_window.warned_at is None or now - user_window.warned_at >= self.window:
+                user_window.warned_at = now
+                logger.warning(f"Пользователь {user.id} превысил лимит запросов ({handler_name})")
+                if isinstance(event, CallbackQuery):
+                    await event.answer("Слишком много нажатий, подождите немного.", show_alert=True)
+                elif isinstance(event, Message):
+                    await event.answer("Слишком много запросов, подождите немного.")
+            elif isinstance(event, CallbackQuery):
+                await event.answer()
+            return None
+
+        user_window.events.append((now, cost))
+        user_window.used += cost
+        user_window.last_key = key
+        user_window.last_at = now
+        return await handler(event, data)
+
+    def stats(self) -> Dict[str, int]:
+        return {"users": len(self._users), "dropped": self.dropped, "merged": self.merged}
@@ -0,0 +1,152 @@
+"""
+Аналитика тем, которые посетители хотят видеть на выставках.
+
+Таблицы тем пополняются в боте фоновым TopicAnalyzer, а читаются командой
+/topics. Их можно обновить и посмотреть из командной строки:
+
+    python -m services.topics --limit 30
+    python -m services.topics --rebuild    # пересчитать по всем отзывам
+"""
+import argparse
+import asyncio
+import logging
+import os
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from database.db import ReviewDB
+from database.topics_db import TopicsDB
+from services.text_analysis import extract_terms
+
+logger = logging.getLogger(__name__)
+
+
+def count_topics(rows: List[Tuple[int, str, str]]) -> Dict[str, Any]:
+    """
+    Счётчики порции отзывов (id, источник, темы) для TopicsDB.apply:
+    каждый термин учитывается один раз на ответ. Чистая функция —
+    выполняется в отдельном потоке, не в event loop.
+    """
+    terms: Counter = Counter()
+    bigrams: Counter = Counter()
+    forms: Counter = Counter()
+    term_sources: Counter = Counter()
+    answers = 0
+    for _, source, subject in rows:
+        review_terms, review_bigrams = extract_terms(subject)
+        if not review_terms:
+            continue
+        answers += 1
+        for counter, found in ((terms, review_terms), (bigrams, review_bigrams)):
+            for term, form in found.items():
+                counter[term] += 1
+                forms[term, form] += 1
+                term_sources[term, source] += 1
+    return {
+        "answers": answers,
+        "terms": dict(terms),
+        "bigrams": dict(bigrams),
+        "forms": dict(forms),
+        "term_sources": dict(term_sources),
+    }
+
+
+class TopicAnalyzer:
+    """
+    Инкрементальная аналитика тем, которые посетители хотят видеть на
+    выставках (ответ subject опроса).
+
+    Раз в interval секунд разбирает только отзывы, пришедшие после
+    прошлого прохода (topic_state.last_review_id), порциями по batch_size:
+    токенизация и стемминг (services/text_analysis.py) — в отдельном потоке,
+    счётчики порции прибавляются к таблицам topic_* одной транзакцией вместе
+    со сдвигом last_review_id. Команда /topics только читает готовые таблицы.
+    """
+
+    def __init__(self, db: TopicsDB, interval: float = 10 * 60, batch_size: int = 1000):
+        self.db = db
+        self.interval = interval
+        self.batch_size = batch_size
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def run_once(self) -> int:
+        """Учитывает все новые отзывы. Возвращает число разобранных отзывов."""
+        async with self._lock:
+            return await self._process()
+
+    async def rebuild(self) -> int:
+        """Пересчитывает таблицы тем по всем отзывам (например, после изменения стоп-слов)."""
+        async with self._lock:
+            await self.db.reset()
+            return await self._process()
+
+    async def _process(self) -> int:
+        processed = 0
+        last_id = await self.db.get_last_review_id()
+        while True:
+            rows = await self.db.get_new_answers(last_id, self.batch_size)
+            if not rows:
+                break
+            counts = await asyncio.to_thread(count_topics, rows)
+            if not await self.db.apply(last_id, rows[-1][0], **counts):
+                logger.warning("Темы: порцию уже учёл другой процесс, проход прерван")
+                break
+            processed += len(rows)
+            last_id = rows[-1][0]
+            if len(rows) < self.batch_size:
+                break
+        if processed:
+            logger.info(f"Темы: разобрано отзывов {processed}, последний id {last_id}")
+        return processed
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка аналитики тем: {e}")
+            await asyncio.sleep(self.interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=os.getenv("DB_PATH", "reviews.db"), help="путь к базе (по умолчанию DB_PATH)")
+    parser.add_argument("--rebuild", action="store_true", help="пересчитать таблицы тем по всем отзывам")
+    parser.add_argument("--limit", type=int, default=20, help="сколько тем показать")
+    args = parser.parse_args()
+
+    db = ReviewDB(args.db)
+    analyzer = TopicAnalyzer(TopicsDB(db))
+
+    async def run() -> Tuple[int, dict]:
+        processed = await (analyzer.rebuild() if args.rebuild else analyzer.run_once())
+        return processed, await analyzer.db.get_topics(args.limit)
+
+    try:
+        processed, topics = asyncio.run(run())
+    finally:
+        db.close()
+    print(f"Разобрано новых отзывов: {processed}; всего ответов с темами: {topics['answers']}")
+    for title, key in (("Словосочетания", "bigrams"), ("Слова", "terms")):
+        print(f"\n{title}:")
+        for form, reviews, _ in topics[key]:
+            print(f"{reviews:>8}  {form}")
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    main()
@@ -0,0 +1,75 @@
+import asyncio
+import hmac
+import logging
+from typing import Optional, Set
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookHandler:
+    """
+    Приём обновлений от Telegram через webhook.
+
+    Запрос проверяется по секретному токену и сразу получает ответ 200,
+    а само обновление обрабатывается в фоновой задаче. Одновременно
+    обрабатывается не больше max_concurrency обновлений; если в очереди
+    накопилось больше max_pending, новые запросы получают 503 и Telegram
+    повторит их позже.
+    """
+
+    def __init__(
+            self,
+            dp: Dispatcher,
+            bot: Bot,
+            secret: Optional[str] = None,
+            max_concurrency: int = 100,
+            max_pending: int = 10_000
+        ):
+        self.dp = dp
+        self.bot = bot
+        self.secret = secret
+        self.max_pending = max_pending
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if self.secret and not hmac.compare_digest(request.headers.get(SECRET_HEADER, ""), self.secret):
+            return web.Response(status=401)
+        if len(self._tasks) >= self.max_pending:
+            logger.warning("Webhook: очередь обновлений переполнена, просим Telegram повторить позже")
+            return web.Response(status=503)
+
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": self.bot})
+        except Exception as e:
+            logger.error(f"Webhook: некорректное обновление: {e}")
+            return web.Response(status=400)
+
+        task = asyncio.create_task(self._process(update))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return web.Response()
+
+    async def _process(self, update: Update):
+        async with self._semaphore:
+            try:
+                await self.dp.feed_update(self.bot, update)
+            except Exception as e:
+                logger.error(f"Webhook: ошибка обработки обновления {update.update_id}: {e}")
+
+    async def drain(self):
+        """Дожидается обработки всех уже принятых обновлений."""
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+def build_webhook_app(handler: WebhookHandler, path: str) -> web.Application:
+    app = web.Application()
+    app.router.add_post(path, handler.handle)
+    return app